@@ -1,20 +1,62 @@
 import numpy as np
 
+from env.avellaneda_stoikov import quote_terms, quotes, rolling_variance, time_to_horizon
+
 
 class ASAgent:
-    def __init__(self, env, gamma = 0.1, sigma = 0, kappa = 1.5, T = 0):
+    """
+    Avellaneda-Stoikov market maker.
+
+    Quotes around the reservation price midpoint - q * gamma * sigma^2 * (T - t)
+    with the optimal spread gamma * sigma^2 * (T - t) + 2 / gamma * ln(1 + gamma / kappa),
+    q being the env's inventory. sigma is estimated online from the
+    midpoint changes of the last ``window`` steps unless given, and T is
+    the horizon in steps (the episode by default), the time term being the
+    fraction of it left at the env's step within its episode.
+    """
+    def __init__(self, env, gamma = 0.1, sigma = None, kappa = 1.5, T = None, window = 300):
+        if env._stream is not None and (sigma is None or T is None):
+            raise ValueError("estimating sigma and T needs the whole tape, give them for a LOBStream")
+        self.env = env
         self.gamma = gamma
         self.kappa = kappa
+        self.sigma = sigma
+        self.window = window
+        self.T = T if T is not None else env.episode_length()
+        self.variance = rolling_variance(env.midpoints, window) if sigma is None else float(sigma) ** 2
+
+    def variance_at(self, t):
+        if np.ndim(self.variance) == 0:
+            return np.full(np.shape(t), self.variance)
+        return self.variance[t]
+
+    def quote_terms(self, t, elapsed=None):
+        """Inventory risk and half spread at tape row(s) t, ``elapsed`` steps into the episode (t by default)."""
+        elapsed = t if elapsed is None else elapsed
+        return quote_terms(self.gamma, self.kappa, self.variance_at(t), time_to_horizon(elapsed, self.T))
 
-        self.T = T
-    def compute_spread(self, inventory):
-        ret = (2 / self.gamma) * np.log(1 + self.gamma * inventory / self.kappa)
-        return ret
-    
     def take_action(self, observation):
-        midpoint = observation[0]
-        inventory = observation[2]
-        spread = self.compute_spread(inventory)
-        bid_price = midpoint - spread / 2
-        ask_price = midpoint + spread / 2
-        return bid_price, ask_price
\ No newline at end of file
+        midpoint = float(observation[0])
+        risk, half_spread = self.quote_terms(self.env.t, self.env.episode_time())
+        bid_price, ask_price = quotes(midpoint, self.env.inventory, risk, half_spread)
+        return float(bid_price), float(ask_price)
+
+    @classmethod
+    def batch_quote_terms(cls, agents, observations, t):
+        """
+        Inventory-independent parts of the quotes of several agents over a
+        block of observations seen at env steps ``t``: the midpoint, the
+        inventory risk and the half spread, each of shape (rows, len(agents)).
+        The quotes then follow from the inventory with quotes_from_terms.
+        """
+        midpoint = observations[:, 0:1].astype(np.float64)
+        risk = np.empty((len(t), len(agents)))
+        half_spread = np.empty((len(t), len(agents)))
+        for i, agent in enumerate(agents):
+            risk[:, i], half_spread[:, i] = agent.quote_terms(t)
+        return midpoint, risk, half_spread
+
+    @staticmethod
+    def quotes_from_terms(terms, inventory):
+        midpoint, risk, half_spread = terms
+        return quotes(midpoint, inventory, risk, half_spread)
@@ -0,0 +1,26 @@
+import importlib
+
+
+# Agents are imported on first access, so that code using only the rule-based
+# agents never loads torch / stable_baselines3
+_LAZY = {
+    "SimpleAgent": "agent.simple_agent",
+    "ASAgent": "agent.AS_agent",
+    "RLAgent": "agent.rl_agent",
+    "PPOAgent": "agent.ppo_agent",
+    "DQNAgent": "agent.dqn_agent",
+    "NumpyPolicy": "agent.inference",
+    "PolicyServer": "agent.inference",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
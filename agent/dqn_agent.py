@@ -1,12 +1,19 @@
 from stable_baselines3 import DQN
 from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.utils import configure_logger, polyak_update
 
+from agent.rl_agent import RLAgent
 
-class DQNAgent:
-    def __init__(self, env):
-        train_env = make_vec_env(lambda: env, n_envs=1)
-        
-        self.model = DQN(
+
+class DQNAgent(RLAgent):
+    algorithm = DQN
+    deterministic = True
+
+    def _single_env(self, env):
+        return make_vec_env(lambda: env, n_envs=1)
+
+    def _make_model(self, train_env, seed):
+        return DQN(
             policy="MlpPolicy",           # Use a multi-layer perceptron policy
             env=train_env,                # Your custom environment
             learning_rate=1e-3,           # Learning rate
@@ -17,10 +24,36 @@ class DQNAgent:
             gamma=0.99,                   # Discount factor
             train_freq=4,                 # Train every 4 steps
             target_update_interval=500,   # Update target network every 500 steps
+            seed=seed,                    # Seed for the model, env and torch RNGs
         )
-        self.model.learn(total_timesteps=100_000)
-        env.reset()
-        
-    def take_action(self, observation):
-        action, _ = self.model.predict(observation, deterministic=True)
-        return action
\ No newline at end of file
+
+    def pretrain(self, logs, gradient_steps, batch_size=None, seed=None):
+        """
+        Offline pretraining on recorded transition logs (paths or
+        TransitionLogs, see env/recording.py), e.g. from SimpleAgent or
+        ASAgent behaviour policies, before or between online training.
+
+        Runs ``gradient_steps`` DQN updates on batches sampled from the
+        logs, updating the target network at the same rate per update as
+        online training does. The online replay buffer is left untouched.
+        """
+        from agent.offline import OfflineReplayBuffer
+
+        model = self.model
+        buffer = OfflineReplayBuffer(logs, model.observation_space, model.action_space, device=model.device,
+                                     normalizer=self.normalizer, seed=seed)
+        if getattr(model, "_logger", None) is None:
+            model.set_logger(configure_logger(verbose=0))
+        target_every = max(model.target_update_interval // model.train_freq.frequency, 1)
+
+        online_buffer = model.replay_buffer
+        model.replay_buffer = buffer
+        try:
+            for done in range(0, gradient_steps, target_every):
+                model.train(gradient_steps=min(target_every, gradient_steps - done),
+                            batch_size=batch_size or model.batch_size)
+                polyak_update(model.q_net.parameters(), model.q_net_target.parameters(), model.tau)
+                polyak_update(model.batch_norm_stats, model.batch_norm_stats_target, 1.0)
+        finally:
+            model.replay_buffer = online_buffer
+        return self
@@ -0,0 +1,247 @@
+import asyncio
+import collections
+import time
+
+import numpy as np
+
+
+# In-place activations of the SB3 MLP policies
+_ACTIVATIONS = {
+    "ReLU": lambda x: np.maximum(x, 0, out=x),
+    "Tanh": lambda x: np.tanh(x, out=x),
+}
+
+
+def _mlp_layers(modules):
+    """(weight, bias, activation) of each Linear of a torch Sequential, activations folded in."""
+    layers = []
+    for module in modules:
+        name = type(module).__name__
+        if name == "Linear":
+            weight = module.weight.detach().cpu().numpy().T.astype(np.float32)
+            bias = module.bias.detach().cpu().numpy().astype(np.float32)
+            layers.append([np.ascontiguousarray(weight), bias, None])
+        elif name in _ACTIVATIONS and layers and layers[-1][2] is None:
+            layers[-1][2] = name
+        elif name not in ("Identity", "Flatten"):
+            raise ValueError("cannot export a policy with a {} layer".format(name))
+    return [tuple(layer) for layer in layers]
+
+
+class NumpyPolicy:
+    """
+    A trained DQNAgent / PPOAgent policy network as a plain NumPy forward
+    pass, for evaluation and serving without PyTorch dispatch.
+
+    predict() takes one observation or a (batch, obs) array and returns
+    the greedy DQN action or the PPO action (the argmax, or a sample of
+    each sub-action with deterministic=False, as PPOAgent.take_action
+    does). For a Box action space the PPO action is the Gaussian mean,
+    or a sample around it with the policy's std, clipped to the bounds
+    as SB3 does. The agent's ObservationNormalizer, if any, is applied
+    first. A NumpyPolicy is itself an agent with take_action for
+    test_agent.
+    """
+    def __init__(self, layers, nvec=None, normalizer=None, deterministic=True, seed=None, box=None):
+        self.layers = layers
+        self.nvec = None if nvec is None else np.asarray(nvec)
+        # (low, high, log_std) of a continuous action space
+        self.box = None if box is None else tuple(np.asarray(part, dtype=np.float32) for part in box)
+        self.normalizer = normalizer
+        self.deterministic = deterministic
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_model(cls, model, normalizer=None, deterministic=None, seed=None):
+        policy = model.policy
+        extractor = policy.q_net.features_extractor if hasattr(policy, "q_net") else policy.features_extractor
+        if type(extractor).__name__ != "FlattenExtractor":
+            raise ValueError("only MlpPolicy models can be exported")
+        space = type(model.action_space).__name__
+        if space not in ("Discrete", "MultiDiscrete", "Box"):
+            raise ValueError("cannot export a policy over a {} action space".format(space))
+        if hasattr(policy, "q_net"):
+            layers = _mlp_layers(policy.q_net.q_net)
+            deterministic = True if deterministic is None else deterministic
+        else:
+            layers = _mlp_layers(policy.mlp_extractor.policy_net) + _mlp_layers([policy.action_net])
+            deterministic = False if deterministic is None else deterministic
+        nvec = getattr(model.action_space, "nvec", None)
+        box = None
+        if space == "Box":
+            if getattr(policy, "squash_output", False):
+                raise ValueError("cannot export a policy with squashed (gSDE) actions")
+            log_std = policy.log_std.detach().cpu().numpy()
+            box = (model.action_space.low, model.action_space.high, log_std)
+        return cls(layers, nvec, normalizer, deterministic, seed, box)
+
+    @classmethod
+    def from_agent(cls, agent, deterministic=None, seed=None):
+        """Exports agent.model; PPO keeps sampling its actions like PPOAgent.take_action unless told otherwise."""
+        return cls.from_model(agent.model, getattr(agent, "normalizer", None), deterministic, seed)
+
+    def logits(self, observations):
+        """Output layer (Q-values, action logits or Gaussian means) for a (batch, obs) array."""
+        x = np.asarray(observations, dtype=np.float32)
+        if self.normalizer is not None:
+            x = self.normalizer.transform(x)
+        for weight, bias, activation in self.layers:
+            x = x @ weight
+            x += bias
+            if activation is not None:
+                _ACTIVATIONS[activation](x)
+        return x
+
+    def predict(self, observations, deterministic=None):
+        deterministic = self.deterministic if deterministic is None else deterministic
+        single = np.ndim(observations) == 1
+        logits = self.logits(np.atleast_2d(observations))
+        if self.box is not None:
+            low, high, log_std = self.box
+            if not deterministic:
+                logits += np.exp(log_std) * self.rng.standard_normal(logits.shape).astype(np.float32)
+            actions = np.clip(logits, low, high)
+            return actions[0] if single else actions
+        if not deterministic:
+            # Gumbel-max: the argmax of the perturbed logits samples the categorical
+            logits = logits - np.log(-np.log(self.rng.random(logits.shape)))
+        if self.nvec is None:
+            actions = logits.argmax(axis=1)
+        else:
+            splits = np.cumsum(self.nvec)[:-1]
+            actions = np.stack([part.argmax(axis=1) for part in np.split(logits, splits, axis=1)], axis=1)
+        return actions[0] if single else actions
+
+    def take_action(self, observation):
+        return self.predict(observation)
+
+    def save(self, path):
+        arrays = {"n_layers": np.array(len(self.layers))}
+        for i, (weight, bias, activation) in enumerate(self.layers):
+            arrays["weight_{}".format(i)] = weight
+            arrays["bias_{}".format(i)] = bias
+            arrays["activation_{}".format(i)] = np.array(activation or "")
+        if self.nvec is not None:
+            arrays["nvec"] = self.nvec
+        if self.box is not None:
+            arrays["box_low"], arrays["box_high"], arrays["box_log_std"] = self.box
+        arrays["deterministic"] = np.array(self.deterministic)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path, normalizer=None, seed=None):
+        with np.load(path) as arrays:
+            layers = [(arrays["weight_{}".format(i)], arrays["bias_{}".format(i)],
+                       str(arrays["activation_{}".format(i)]) or None)
+                      for i in range(int(arrays["n_layers"]))]
+            nvec = arrays["nvec"] if "nvec" in arrays else None
+            box = (arrays["box_low"], arrays["box_high"], arrays["box_log_std"]) if "box_low" in arrays else None
+            return cls(layers, nvec, normalizer, bool(arrays["deterministic"]), seed, box)
+
+
+class PolicyServer:
+    """
+    Asyncio micro-batching front of a NumpyPolicy.
+
+    Concurrent ``await server.predict(obs)`` calls, e.g. one per instrument
+    or per episode, are queued and answered by one batched forward pass
+    once ``max_batch_size`` requests are waiting or the oldest has waited
+    ``max_delay`` seconds. Request latencies (queueing included) are kept
+    for latency_stats().
+    """
+    def __init__(self, policy, max_batch_size=64, max_delay=0.0005, history=100_000):
+        self.policy = policy
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.latencies = collections.deque(maxlen=history)
+        self.batch_sizes = collections.deque(maxlen=history)
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._serve())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def predict(self, observation):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((observation, future, time.perf_counter()))
+        return await future
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                if self._queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                actions = self.policy.predict(np.stack([observation for observation, _, _ in batch]))
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            now = time.perf_counter()
+            for (_, future, start), action in zip(batch, actions):
+                if not future.done():
+                    future.set_result(action)
+                self.latencies.append(now - start)
+            self.batch_sizes.append(len(batch))
+
+    def latency_stats(self):
+        """p50 / p99 / mean / max request latency in microseconds and the batching achieved."""
+        latencies = np.array(self.latencies) * 1e6
+        if len(latencies) == 0:
+            return {"requests": 0}
+        return {
+            "requests": len(latencies),
+            "p50_us": float(np.percentile(latencies, 50)),
+            "p99_us": float(np.percentile(latencies, 99)),
+            "mean_us": float(latencies.mean()),
+            "max_us": float(latencies.max()),
+            "mean_batch_size": float(np.mean(self.batch_sizes)),
+        }
+
+
+async def run_local_clients(server, observations):
+    """
+    Drives ``server`` from one in-process client per row of
+    ``observations`` (clients, steps, obs), each sending its steps one
+    after the other. Returns the actions as an array (clients, steps, ...).
+    """
+    async def client(rows):
+        return [await server.predict(row) for row in rows]
+
+    results = await asyncio.gather(*(client(rows) for rows in observations))
+    return np.array(results)
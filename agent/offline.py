@@ -0,0 +1,54 @@
+import numpy as np
+from stable_baselines3.common.buffers import ReplayBuffer
+from stable_baselines3.common.type_aliases import ReplayBufferSamples
+
+from env.recording import TransitionLog
+
+
+class OfflineReplayBuffer(ReplayBuffer):
+    """
+    Read-only SB3 replay buffer over recorded transition logs
+    (env/recording.py), so that an off-policy model trains on experience
+    far larger than RAM: batches are gathered from the memory-mapped
+    chunks on each sample(). ``normalizer``, if given, is applied to the
+    sampled observations, the logs holding the raw ones.
+    """
+    def __init__(self, logs, observation_space, action_space, device="auto", normalizer=None, seed=None):
+        logs = [log if isinstance(log, TransitionLog) else TransitionLog(log) for log in logs]
+        for log in logs:
+            if log.obs_shape != tuple(observation_space.shape):
+                raise ValueError("{} holds observations of shape {}, the model expects {}".format(
+                    log.path, log.obs_shape, observation_space.shape))
+        # The base buffer only keeps its spaces and device, the transitions stay in the logs
+        super().__init__(1, observation_space, action_space, device=device)
+        self.logs = logs
+        self.normalizer = normalizer
+        self.rng = np.random.default_rng(seed)
+        self._log_offsets = np.cumsum([0] + [len(log) for log in logs])
+        self.full = True
+
+    def size(self):
+        return int(self._log_offsets[-1])
+
+    def add(self, *args, **kwargs):
+        raise TypeError("an OfflineReplayBuffer is read-only")
+
+    def sample(self, batch_size, env=None):
+        indices = self.rng.integers(0, self.size(), batch_size)
+        log_ids = np.searchsorted(self._log_offsets, indices, side="right") - 1
+        parts = [self.logs[i].get(indices[log_ids == i] - self._log_offsets[i]) for i in np.unique(log_ids)]
+        batch = {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+
+        obs = batch["obs"]
+        next_obs = batch["next_obs"]
+        if self.normalizer is not None:
+            obs = self.normalizer.transform(obs, out=obs)
+            next_obs = self.normalizer.transform(next_obs, out=next_obs)
+        data = (
+            obs,
+            batch["action"].reshape(batch_size, self.action_dim).astype(self._maybe_cast_dtype(self.action_space.dtype)),
+            next_obs,
+            batch["done"].astype(np.float32).reshape(-1, 1),
+            batch["reward"].reshape(-1, 1),
+        )
+        return ReplayBufferSamples(*tuple(map(self.to_torch, data)))
@@ -0,0 +1,161 @@
+import glob
+import json
+import os
+import re
+
+import numpy as np
+from stable_baselines3.common.callbacks import CheckpointCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper
+
+from env.normalization import ObservationNormalizer
+from env.vec_env import BatchEnv
+
+
+class NormalizedVecEnv(VecEnvWrapper):
+    """
+    VecEnv wrapper applying a fitted ObservationNormalizer to the
+    observations the model trains on, terminal observations included.
+    The wrapped envs keep returning raw observations to everyone else.
+    """
+    def __init__(self, venv, normalizer):
+        super().__init__(venv)
+        self.normalizer = normalizer
+
+    def reset(self):
+        obs = self.venv.reset()
+        return self.normalizer.transform(obs, out=obs)
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+        for info in infos:
+            if "terminal_observation" in info:
+                info["terminal_observation"] = self.normalizer.transform(info["terminal_observation"])
+        return self.normalizer.transform(obs, out=obs), rewards, dones, infos
+
+
+class RLAgent:
+    """
+    Lifecycle shared by the SB3 agents.
+
+    The constructor builds the model and, unless timesteps=0, trains it
+    like before. train() continues training (on a new env for fine-tuning
+    on newly arrived LOB days), writing periodic checkpoints of the
+    policy, optimizer and replay buffer when given a checkpoint_dir.
+    save() / load() store and restore a trained agent without training;
+    load() also resumes from the latest checkpoint of a checkpoint_dir.
+
+    Subclasses set ``algorithm`` and implement _make_model and
+    _single_env.
+    """
+    algorithm = None
+    deterministic = False
+
+    def __init__(self, env, n_envs=1, seed=None, timesteps=100_000, normalizer=None,
+                 checkpoint_dir=None, checkpoint_every=10_000):
+        # Observations are normalized by a NormalizedVecEnv while training, the env itself
+        # stays raw and take_action applies the same transform
+        if normalizer is not None and not normalizer.fitted:
+            normalizer.fit(env)
+        self.normalizer = normalizer
+        self.n_envs = n_envs
+        self.env = env
+        self._obs_buffer = None
+
+        self.model = self._make_model(self._vec_env(env), seed)
+        self.train(timesteps, checkpoint_dir=checkpoint_dir, checkpoint_every=checkpoint_every)
+
+    def _make_model(self, train_env, seed):
+        raise NotImplementedError("_make_model(self, train_env, seed) has to be implemented")
+
+    def _single_env(self, env):
+        raise NotImplementedError("_single_env(self, env) has to be implemented")
+
+    def _vec_env(self, env):
+        venv = BatchEnv(env, n_envs=self.n_envs) if self.n_envs > 1 else self._single_env(env)
+        if self.normalizer is not None:
+            venv = NormalizedVecEnv(venv, self.normalizer)
+        return venv
+
+    def train(self, timesteps, env=None, checkpoint_dir=None, checkpoint_every=10_000):
+        """
+        Trains for ``timesteps`` more steps, on ``env`` if given (it then
+        replaces the training env) and checkpointing every
+        ``checkpoint_every`` steps into ``checkpoint_dir`` if given.
+        """
+        if env is not None:
+            self.model.set_env(self._vec_env(env))
+            self.env = env
+
+        callback = None
+        if checkpoint_dir is not None:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            self._save_meta(checkpoint_dir)
+            callback = CheckpointCallback(
+                save_freq=max(checkpoint_every // self.model.n_envs, 1),
+                save_path=checkpoint_dir,
+                name_prefix=type(self).__name__,
+                save_replay_buffer=True,
+            )
+
+        self.model.learn(total_timesteps=timesteps, callback=callback,
+                         reset_num_timesteps=self.model.num_timesteps == 0)
+        self.env.reset()
+        return self
+
+    def fine_tune(self, env, timesteps, **kwargs):
+        """Continues training on new LOB data, keeping the weights, optimizer, replay buffer and normalizer."""
+        return self.train(timesteps, env=env, **kwargs)
+
+    def take_action(self, observation):
+        if self.normalizer is not None:
+            if self._obs_buffer is None or self._obs_buffer.shape != np.shape(observation):
+                self._obs_buffer = np.empty(np.shape(observation), dtype=np.float32)
+            observation = self.normalizer.transform(observation, out=self._obs_buffer)
+        action, _ = self.model.predict(observation, deterministic=self.deterministic)
+        return action
+
+    def _save_meta(self, path):
+        with open(os.path.join(path, "agent.json"), "w") as f:
+            json.dump({"agent": type(self).__name__, "n_envs": self.n_envs}, f)
+        if self.normalizer is not None:
+            self.normalizer.save(os.path.join(path, "normalizer.json"))
+
+    def save(self, path):
+        """Saves the model (policy and optimizer), the replay buffer if any and the normalizer under ``path``."""
+        os.makedirs(path, exist_ok=True)
+        self._save_meta(path)
+        self.model.save(os.path.join(path, "model.zip"))
+        if getattr(self.model, "replay_buffer", None) is not None:
+            self.model.save_replay_buffer(os.path.join(path, "replay_buffer.pkl"))
+
+    @classmethod
+    def load(cls, path, env, n_envs=None):
+        """
+        An agent saved in ``path`` by save(), or the latest checkpoint
+        written there by train(), ready to act or train further on ``env``.
+        """
+        with open(os.path.join(path, "agent.json")) as f:
+            meta = json.load(f)
+        if meta["agent"] != cls.__name__:
+            raise ValueError("{} holds a {}, not a {}".format(path, meta["agent"], cls.__name__))
+
+        model_path = os.path.join(path, "model.zip")
+        replay_path = os.path.join(path, "replay_buffer.pkl")
+        if not os.path.exists(model_path):
+            checkpoints = glob.glob(os.path.join(path, "{}_*_steps.zip".format(cls.__name__)))
+            if not checkpoints:
+                raise FileNotFoundError("no saved model or checkpoint in {}".format(path))
+            steps = max(int(re.search(r"_(\d+)_steps\.zip$", p).group(1)) for p in checkpoints)
+            model_path = os.path.join(path, "{}_{}_steps.zip".format(cls.__name__, steps))
+            replay_path = os.path.join(path, "{}_replay_buffer_{}_steps.pkl".format(cls.__name__, steps))
+
+        agent = cls.__new__(cls)
+        normalizer_path = os.path.join(path, "normalizer.json")
+        agent.normalizer = ObservationNormalizer.load(normalizer_path) if os.path.exists(normalizer_path) else None
+        agent.n_envs = n_envs or meta["n_envs"]
+        agent.env = env
+        agent._obs_buffer = None
+        agent.model = cls.algorithm.load(model_path, env=agent._vec_env(env))
+        if os.path.exists(replay_path) and hasattr(agent.model, "load_replay_buffer"):
+            agent.model.load_replay_buffer(replay_path)
+        return agent
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class SimpleAgent:
     def __init__(self, env, bid_spread_fraction=0.5, ask_spread_fraction=0.5):
         self.bid_spread_fraction = bid_spread_fraction
@@ -8,4 +11,14 @@ class SimpleAgent:
         spread = observation[1]
         bid_price = midpoint - (spread * self.bid_spread_fraction)
         ask_price = midpoint + (spread * self.ask_spread_fraction)
-        return bid_price, ask_price
\ No newline at end of file
+        return bid_price, ask_price
+
+    @classmethod
+    def batch_quotes(cls, agents, observations):
+        """Quotes of several agents over a block of observations, each of shape (rows, len(agents))."""
+        # Parameters in the observation dtype so the arithmetic matches take_action exactly
+        bid_fraction = np.array([a.bid_spread_fraction for a in agents]).astype(observations.dtype)
+        ask_fraction = np.array([a.ask_spread_fraction for a in agents]).astype(observations.dtype)
+        midpoint = observations[:, 0:1]
+        spread = observations[:, 1:2]
+        return midpoint - (spread * bid_fraction), midpoint + (spread * ask_fraction)
@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from env.as_env import ASEnv
+from env.dqn_env import DQNEnv
+from env.models import TypeOfReward
+from env.ppo_env import PPOEnv
+from env.simple_env import SimpleEnv
+from env.synthetic import SyntheticLOB
+from agent.AS_agent import ASAgent
+from agent.simple_agent import SimpleAgent
+from utils.functions import test_agent
+
+
+ENVS = {"DQN": DQNEnv, "PPO": PPOEnv, "Simple": SimpleEnv, "A-S": ASEnv}
+
+# Modules of the lightweight path (envs, rule-based agents, evaluation, market stats),
+# which must not load any of HEAVY_MODULES when imported
+STARTUP_MODULES = [
+    "env", "agent", "env.models", "env.simple_env", "env.as_env", "env.portfolio_env", "env.synthetic", "env.live", "env.sampling",
+    "agent.simple_agent", "agent.AS_agent", "agent.inference", "utils.functions", "utils.backtest",
+    "utils.param_search", "utils.experiments", "utils.walk_forward", "analyze_market",
+]
+HEAVY_MODULES = ["torch", "stable_baselines3", "matplotlib", "seaborn"]
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+# Full run and --quick run sizes
+SIZES = {
+    False: {"rows": 50_000, "steps": 20_000, "resets": 2_000, "learn_steps": 8_192, "widths": [1, 4, 16], "repeats": 3},
+    True: {"rows": 5_000, "steps": 2_000, "resets": 200, "learn_steps": 1_024, "widths": [1, 4], "repeats": 1},
+}
+
+
+def synthetic_lob(rows=50_000, depth=15, seed=0):
+    """LOB tape in the column layout of the Kaggle 1-second files, for benchmarking."""
+    return SyntheticLOB(depth=depth, seed=seed).to_frame(rows)
+
+
+def _best_rate(run, count, repeats):
+    """Best count/second over the repeats, the least noisy estimate of the achievable rate."""
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+def bench_env_step(data, sizes):
+    results = {}
+    for env_name, env_cls in ENVS.items():
+        for reward_type in TypeOfReward:
+            env = env_cls(data, initial_cash=5_000_000, initial_inventory=100, reward_type=reward_type)
+            env.action_space.seed(0)
+            if env_name in ("Simple", "A-S"):
+                # Quotes around the book so that the fill paths are exercised
+                midpoints = env.midpoints[:sizes["steps"]]
+                offsets = np.random.default_rng(0).normal(0, 1, (len(midpoints), 2))
+                actions = list(np.stack([midpoints - np.abs(offsets[:, 0]), midpoints + np.abs(offsets[:, 1])], axis=1))
+            else:
+                actions = [env.action_space.sample() for _ in range(sizes["steps"])]
+
+            def run():
+                env.reset()
+                for action in actions:
+                    env.step(action)
+
+            results[f"step/{env_name}/{reward_type.name}"] = _best_rate(run, len(actions), sizes["repeats"])
+    return results
+
+
+def bench_env_reset(data, sizes):
+    results = {}
+    for env_name, env_cls in ENVS.items():
+        env = env_cls(data)
+
+        def run():
+            for _ in range(sizes["resets"]):
+                env.reset()
+
+        results[f"reset/{env_name}"] = _best_rate(run, sizes["resets"], sizes["repeats"])
+    return results
+
+
+def bench_evaluate(data, sizes):
+    import torch
+    from agent.dqn_agent import DQNAgent
+    from agent.ppo_agent import PPOAgent
+
+    torch.set_num_threads(1)
+    makers = {
+        "Simple": lambda env: SimpleAgent(env),
+        "A-S": lambda env: ASAgent(env),
+        # Untrained policies, the evaluation cost does not depend on the weights
+        "PPO": lambda env: PPOAgent(env, seed=0, timesteps=0),
+        "DQN": lambda env: DQNAgent(env, seed=0, timesteps=0),
+    }
+    results = {}
+    for agent_name, make in makers.items():
+        env = ENVS[agent_name](data, initial_cash=5_000_000, initial_inventory=100)
+        agent = make(env)
+        steps = sizes["steps"] if agent_name in ("Simple", "A-S") else sizes["steps"] // 10
+        results[f"test_agent/{agent_name}"] = _best_rate(
+            lambda: test_agent(env, agent, steps=steps, keep_history=False), steps, sizes["repeats"]
+        )
+    return results
+
+
+def bench_learn(data, sizes):
+    import torch
+    from agent.dqn_agent import DQNAgent
+    from agent.ppo_agent import PPOAgent
+
+    torch.set_num_threads(1)
+    results = {}
+    for agent_name, agent_cls in (("PPO", PPOAgent), ("DQN", DQNAgent)):
+        for width in sizes["widths"]:
+            env = ENVS[agent_name](data)
+            model = agent_cls(env, n_envs=width, seed=0, timesteps=0).model
+            start = time.perf_counter()
+            # PPO always collects whole rollouts, so count the timesteps actually taken
+            model.learn(total_timesteps=sizes["learn_steps"])
+            results[f"learn/{agent_name}/n_envs={width}"] = model.num_timesteps / (time.perf_counter() - start)
+    return results
+
+
+def bench_startup(data, sizes):
+    """
+    Imports per second of each STARTUP_MODULES module, each timed in a
+    fresh interpreter. Raises if one of them loads a heavy dependency.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    for module in STARTUP_MODULES:
+        best = float("inf")
+        for _ in range(sizes["repeats"]):
+            output = subprocess.run(
+                [sys.executable, "-c", _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                cwd=root, capture_output=True, text=True, check=True,
+            ).stdout
+            probe = json.loads(output.splitlines()[-1])
+            if probe["heavy"]:
+                raise RuntimeError(f"importing {module} loads {', '.join(probe['heavy'])}")
+            best = min(best, probe["seconds"])
+        results[f"startup/{module}"] = 1 / best
+    return results
+
+
+BENCHMARKS = {
+    "step": bench_env_step,
+    "reset": bench_env_reset,
+    "test_agent": bench_evaluate,
+    "learn": bench_learn,
+    "startup": bench_startup,
+}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(only=None, quick=False, seed=0):
+    """Runs the benchmarks (all, or the groups in ``only``) and returns their rates in units per second."""
+    sizes = SIZES[quick]
+    data = synthetic_lob(sizes["rows"], seed=seed)
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if only is None or name in only:
+            results.update(bench(data, sizes))
+    return {
+        "meta": {
+            "commit": _commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": quick,
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Rates of two benchmark runs side by side. A benchmark is flagged as a
+    regression when its rate dropped by more than ``threshold``.
+    """
+    rows = []
+    for name, rate in current["results"].items():
+        before = baseline["results"].get(name)
+        change = rate / before - 1 if before else float("nan")
+        rows.append({"benchmark": name, "baseline": before, "current": rate, "change": change,
+                     "regression": bool(change < -threshold)})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the environments and agents on synthetic LOB data.")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a smoke run")
+    parser.add_argument("--compare", help="an earlier benchmark JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    report = run_benchmarks(only=args.only, quick=args.quick)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, rate in report["results"].items():
+        print(f"{name:40s} {rate:12,.0f} /s")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        table = compare(baseline, report, args.threshold)
+        print(table.to_string(index=False))
+        sys.exit(1 if table["regression"].any() else 0)
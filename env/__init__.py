@@ -0,0 +1,37 @@
+import importlib
+
+
+# Environments are imported on first access; BatchEnv is the only one that
+# loads stable_baselines3 (and torch with it)
+_LAZY = {
+    "TypeOfReward": "env.models",
+    "BaseEnv": "env.models",
+    "SimpleEnv": "env.simple_env",
+    "ASEnv": "env.as_env",
+    "ASParamEnv": "env.as_env",
+    "PPOEnv": "env.ppo_env",
+    "DQNEnv": "env.dqn_env",
+    "PortfolioEnv": "env.portfolio_env",
+    "BatchEnv": "env.vec_env",
+    "LOBStore": "env.lob_store",
+    "LOBStream": "env.lob_stream",
+    "SyntheticLOB": "env.synthetic",
+    "LiveSession": "env.live",
+    "EpisodeSampler": "env.sampling",
+    "BestPriceFill": "env.fill_models",
+    "QueueFill": "env.fill_models",
+    "FeaturePipeline": "env.features",
+    "ObservationNormalizer": "env.normalization",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,6 +1,7 @@
 import gymnasium as gym
 import numpy as np
 
+from env.avellaneda_stoikov import avellaneda_stoikov_quotes, rolling_variance, time_to_horizon
 from env.models import BaseEnv
 
 
@@ -14,4 +15,61 @@ class ASEnv(BaseEnv):
 
     def get_bid_ask_prices(self, action):
         bid_price, ask_price = action
-        return bid_price, ask_price, False
\ No newline at end of file
+        # Plain floats keep cash in float64 whatever dtype the agent quotes in
+        return float(bid_price), float(ask_price), False
+
+    def get_bid_ask_prices_batch(self, actions, t, rolling_avg, inventory, episode=None):
+        actions = np.asarray(actions, dtype=np.float64)
+        return actions[:, 0], actions[:, 1], np.zeros(len(t), dtype=bool)
+
+    def quote_action(self, bid_price, ask_price):
+        return np.array([bid_price, ask_price], dtype=np.float32)
+
+
+class ASParamEnv(BaseEnv):
+    """
+    Avellaneda-Stoikov parameterization of the quotes: the action is
+    (gamma, kappa) and the env quotes the A-S bid and ask for them (see
+    env/avellaneda_stoikov.py), with its own inventory, sigma estimated
+    online over the last ``window`` steps and the episode as horizon.
+
+    Each action component in [-1, 1] maps log-uniformly onto
+    ``gamma_range`` / ``kappa_range``, so an RL agent learns the A-S
+    parameters instead of raw prices.
+    """
+    name="AS-Param"
+    gamma_range = (1e-3, 10.0)
+    kappa_range = (0.1, 100.0)
+    window = 300
+    # Quotes depend on the history of this env's own tape
+    uses_tape_history = True
+
+    def declare_action_space(self):
+        if self._stream is not None:
+            raise ValueError("ASParamEnv estimates sigma over the whole tape, it needs a DataFrame or LOBStore")
+        self._variance = rolling_variance(self.midpoints, self.window)
+        self.action_space = gym.spaces.Box(low=-1.0, high=1.0, shape=(2,), dtype=np.float32)
+
+    def as_parameters(self, actions):
+        """(gamma, kappa) of one action or of a (batch, 2) array of actions."""
+        actions = np.clip(np.asarray(actions, dtype=np.float64), -1.0, 1.0)
+        log_low = np.log([self.gamma_range[0], self.kappa_range[0]])
+        log_high = np.log([self.gamma_range[1], self.kappa_range[1]])
+        params = np.exp(log_low + (actions + 1) / 2 * (log_high - log_low))
+        return params[..., 0], params[..., 1]
+
+    def get_bid_ask_prices(self, action):
+        gamma, kappa = self.as_parameters(action)
+        bid_price, ask_price = avellaneda_stoikov_quotes(
+            self.midpoints[self.t], self.inventory, gamma, kappa,
+            self._variance[self.t], time_to_horizon(self.episode_time(), self.episode_length()),
+        )
+        return float(bid_price), float(ask_price), False
+
+    def get_bid_ask_prices_batch(self, actions, t, rolling_avg, inventory, episode=None):
+        gamma, kappa = self.as_parameters(actions)
+        elapsed, length = episode if episode is not None else (self.episode_time(t), self.episode_length())
+        bid_price, ask_price = avellaneda_stoikov_quotes(
+            self.midpoints[t], inventory, gamma, kappa, self._variance[t], time_to_horizon(elapsed, length),
+        )
+        return bid_price, ask_price, np.zeros(len(t), dtype=bool)
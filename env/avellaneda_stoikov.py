@@ -0,0 +1,75 @@
+import collections
+
+import numpy as np
+
+
+# Variance paths already computed, keyed by tape and window, so that a sweep of
+# many agents over one env keeps a single copy
+_VARIANCE_CACHE = collections.OrderedDict()
+_VARIANCE_CACHE_SIZE = 8
+
+
+def rolling_variance(midpoints, window=300):
+    """
+    Online variance per step of the midpoint changes.
+
+    Entry t only uses the changes up to row t (the last ``window`` of
+    them, fewer at the start of the tape), so it is what an estimator
+    running along the tape would know at t. Computed for the whole tape
+    at once from cumulative sums.
+    """
+    if not isinstance(midpoints, np.ndarray):
+        midpoints = np.asarray(midpoints, dtype=np.float64)
+    key = (id(midpoints), len(midpoints), window)
+    cached = _VARIANCE_CACHE.get(key)
+    if cached is not None and cached[0] is midpoints:
+        return cached[1]
+
+    changes = np.diff(midpoints, prepend=midpoints[:1])
+    sums = np.cumsum(changes)
+    squares = np.cumsum(changes * changes)
+    t = np.arange(len(midpoints))
+    start = np.maximum(t - window, 0)
+    count = t - start
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (sums - sums[start]) / count
+        variance = (squares - squares[start]) / count - mean * mean
+    variance[count == 0] = 0.0
+    np.maximum(variance, 0.0, out=variance)
+
+    _VARIANCE_CACHE[key] = (midpoints, variance)
+    if len(_VARIANCE_CACHE) > _VARIANCE_CACHE_SIZE:
+        _VARIANCE_CACHE.popitem(last=False)
+    return variance
+
+
+def time_to_horizon(t, horizon):
+    """Fraction (T - t) / T of the horizon left at step(s) t, the horizon restarting every ``horizon`` steps."""
+    return (horizon - np.mod(t, horizon)) / horizon
+
+
+def quote_terms(gamma, kappa, variance, tau):
+    """
+    Inventory risk gamma * sigma^2 * (T - t), by which the reservation
+    price moves per unit of inventory, and half the optimal spread
+    gamma * sigma^2 * (T - t) + 2 / gamma * ln(1 + gamma / kappa).
+    """
+    risk = gamma * variance * tau
+    half_spread = (risk + 2 / gamma * np.log1p(gamma / kappa)) / 2
+    return risk, half_spread
+
+
+def quotes(midpoint, inventory, risk, half_spread):
+    """Bid and ask around the reservation price midpoint - inventory * risk."""
+    reservation = midpoint - inventory * risk
+    return reservation - half_spread, reservation + half_spread
+
+
+def avellaneda_stoikov_quotes(midpoint, inventory, gamma, kappa, variance, tau):
+    """
+    Avellaneda-Stoikov bid and ask. Every argument broadcasts, so one call
+    quotes a whole episode (arrays over time) or a batch of parameter
+    settings (arrays over gamma / kappa) at once.
+    """
+    risk, half_spread = quote_terms(gamma, kappa, variance, tau)
+    return quotes(midpoint, inventory, risk, half_spread)
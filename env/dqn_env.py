@@ -22,11 +22,12 @@ class DQNEnv(BaseEnv):
     def get_bid_ask_prices(self, action):
         bid_action, ask_action = divmod(action, self.n)
         
-        current_row = self.lob_data.iloc[self.t]
+        midpoint = self.midpoints[self.t]
+        spread = self.spreads[self.t]
         
         if self.reward_type == TypeOfReward.REWARD_1:
-            upper_spread = (current_row['midpoint'] + current_row['spread']) - self.rolling_avg
-            lower_spread = self.rolling_avg - (current_row['midpoint'] - current_row['spread'])
+            upper_spread = (midpoint + spread) - self.rolling_avg
+            lower_spread = self.rolling_avg - (midpoint - spread)
             
             invalid = False
             if lower_spread < 0 or upper_spread < 0:
@@ -38,7 +39,34 @@ class DQNEnv(BaseEnv):
             return bid_price, ask_price, invalid
         
         else:
-            bid_price = current_row['midpoint'] - current_row['spread']*(bid_action/(self.n-1))
-            ask_price = current_row['midpoint'] + current_row['spread']*(bid_action/(self.n-1))
+            bid_price = midpoint - spread*(bid_action/(self.n-1))
+            ask_price = midpoint + spread*(bid_action/(self.n-1))
 
             return bid_price, ask_price, False
+
+    def get_bid_ask_prices_batch(self, actions, t, rolling_avg, inventory, episode=None):
+        bid_action, ask_action = np.divmod(np.asarray(actions).reshape(-1), self.n)
+
+        midpoint = self.midpoints[t]
+        spread = self.spreads[t]
+
+        if self.reward_type == TypeOfReward.REWARD_1:
+            upper_spread = (midpoint + spread) - rolling_avg
+            lower_spread = rolling_avg - (midpoint - spread)
+
+            invalid = (lower_spread < 0) | (upper_spread < 0)
+
+            bid_price = rolling_avg - lower_spread*(ask_action/(self.n-1))
+            ask_price = rolling_avg + upper_spread*(ask_action/(self.n-1))
+
+            return bid_price, ask_price, invalid
+
+        else:
+            bid_price = midpoint - spread*(bid_action/(self.n-1))
+            ask_price = midpoint + spread*(bid_action/(self.n-1))
+
+            return bid_price, ask_price, np.zeros(len(t), dtype=bool)
+
+    def quote_action(self, bid_price, ask_price):
+        level = self._quote_level(bid_price, ask_price, self.n - 1)
+        return level * self.n + level
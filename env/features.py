@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Used when a FeaturePipeline is built without a feature list
+DEFAULT_FEATURES = [
+    {"name": "ema", "column": "midpoint", "span": 100},
+    {"name": "ema", "column": "midpoint", "span": 1000},
+    {"name": "volatility", "window": 1000},
+    {"name": "relative_spread", "window": 1000},
+    {"name": "flow_imbalance", "window": 100},
+    {"name": "returns", "horizons": [1, 10, 100]},
+]
+
+
+def _column(data, column):
+    try:
+        return np.asarray(data[column], dtype=np.float64)
+    except KeyError:
+        raise ValueError("feature input column {} is missing from the LOB data".format(column)) from None
+
+
+def _ema(data, column="midpoint", span=100):
+    values = pd.Series(_column(data, column)).ewm(span=span, adjust=False).mean()
+    return {"ema_{}_{}".format(column, span): values.to_numpy()}
+
+
+def _volatility(data, window=1000):
+    returns = pd.Series(_column(data, "midpoint")).pct_change()
+    return {"volatility_{}".format(window): returns.rolling(window, min_periods=2).std().to_numpy()}
+
+
+def _relative_spread(data, window=1000):
+    relative_spread = pd.Series(_column(data, "spread") / _column(data, "midpoint"))
+    return {"relative_spread_{}".format(window): relative_spread.rolling(window, min_periods=1).mean().to_numpy()}
+
+
+def _flow_imbalance(data, window=100):
+    buys = pd.Series(_column(data, "buys")).rolling(window, min_periods=1).sum().to_numpy()
+    sells = pd.Series(_column(data, "sells")).rolling(window, min_periods=1).sum().to_numpy()
+    total = buys + sells
+    imbalance = np.divide(buys - sells, total, out=np.zeros_like(total), where=total > 0)
+    return {"flow_imbalance_{}".format(window): imbalance}
+
+
+def _depth_imbalance(data, levels=5):
+    bids = sum(_column(data, "bids_notional_{}".format(level)) for level in range(levels))
+    asks = sum(_column(data, "asks_notional_{}".format(level)) for level in range(levels))
+    total = bids + asks
+    imbalance = np.divide(bids - asks, total, out=np.zeros_like(total), where=total > 0)
+    return {"depth_imbalance_{}".format(levels): imbalance}
+
+
+def _returns(data, horizons=(1, 10, 100)):
+    midpoint = pd.Series(_column(data, "midpoint"))
+    return {"return_{}".format(h): (midpoint / midpoint.shift(h) - 1).to_numpy() for h in horizons}
+
+
+# Feature name -> function of (data, **params) returning {column name: values}
+FEATURES = {
+    "ema": _ema,
+    "volatility": _volatility,
+    "relative_spread": _relative_spread,
+    "flow_imbalance": _flow_imbalance,
+    "depth_imbalance": _depth_imbalance,
+    "returns": _returns,
+}
+
+# Input columns of each feature, hashed into the cache key
+_INPUTS = {
+    "ema": lambda spec: [spec.get("column", "midpoint")],
+    "volatility": lambda spec: ["midpoint"],
+    "relative_spread": lambda spec: ["midpoint", "spread"],
+    "flow_imbalance": lambda spec: ["buys", "sells"],
+    "depth_imbalance": lambda spec: ["{}_notional_{}".format(side, level)
+                                     for side in ("bids", "asks") for level in range(spec.get("levels", 5))],
+    "returns": lambda spec: ["midpoint"],
+}
+
+
+class FeaturePipeline:
+    """
+    Windowed observation features precomputed for a whole LOB tape.
+
+    ``features`` is a list of {"name": <FEATURES key>, **params} specs.
+    Every feature only looks backwards, and the whole tape is computed in
+    one vectorized pass into a float32 (rows, features) matrix, the
+    warm-up rows of the windows being 0. With a ``cache_dir`` the matrix
+    is saved there, keyed by a hash of the input columns and the feature
+    config, and later runs memory-map it instead of recomputing.
+    """
+    def __init__(self, features=None, cache_dir=None, chunk_rows=1_000_000):
+        self.features = [dict(spec) for spec in (features if features is not None else DEFAULT_FEATURES)]
+        for spec in self.features:
+            if spec.get("name") not in FEATURES:
+                raise ValueError("unknown feature {!r}, expected one of {}".format(spec.get("name"), list(FEATURES)))
+        self.cache_dir = cache_dir
+        self.chunk_rows = chunk_rows
+
+    def cache_key(self, data):
+        digest = hashlib.sha1(json.dumps(self.features, sort_keys=True).encode())
+        columns = sorted({column for spec in self.features for column in _INPUTS[spec["name"]](spec)})
+        digest.update(json.dumps([len(data), columns]).encode())
+        for column in columns:
+            values = _column(data, column)
+            for start in range(0, len(values), self.chunk_rows):
+                digest.update(np.ascontiguousarray(values[start:start + self.chunk_rows]).tobytes())
+        return digest.hexdigest()
+
+    def compute(self, data):
+        """The feature matrix of ``data`` and its column names."""
+        columns = {}
+        for spec in self.features:
+            params = {key: value for key, value in spec.items() if key != "name"}
+            columns.update(FEATURES[spec["name"]](data, **params))
+        names = list(columns)
+        matrix = np.empty((len(data), len(names)), dtype=np.float32)
+        for i, name in enumerate(names):
+            matrix[:, i] = columns[name]
+        np.nan_to_num(matrix, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        return matrix, names
+
+    def transform(self, data):
+        """compute(), through the on-disk cache when there is one."""
+        if self.cache_dir is None:
+            return self.compute(data)
+
+        key = self.cache_key(data)
+        matrix_path = os.path.join(self.cache_dir, key + ".npy")
+        names_path = os.path.join(self.cache_dir, key + ".json")
+        if os.path.exists(matrix_path) and os.path.exists(names_path):
+            with open(names_path) as f:
+                names = json.load(f)
+            return np.load(matrix_path, mmap_mode="r"), names
+
+        matrix, names = self.compute(data)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Written under temporary names first so concurrent runs never read a partial file
+        tmp = "{}.{}.tmp".format(matrix_path, os.getpid())
+        with open(tmp, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp, matrix_path)
+        tmp = "{}.{}.tmp".format(names_path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(names, f)
+        os.replace(tmp, names_path)
+        return matrix, names
+
+    def online(self, columns):
+        """OnlineFeatures computing the same features tick by tick over rows in ``columns`` order."""
+        return OnlineFeatures(self.features, columns)
+
+
+class _RollingSum:
+    """Sum and count of the non-NaN values among the last ``window`` ones, in O(1) per update."""
+    def __init__(self, window):
+        self.values = np.zeros(window)
+        self.valid = np.zeros(window, dtype=bool)
+        self.position = 0
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, value):
+        i = self.position % len(self.values)
+        if self.valid[i]:
+            self.total -= self.values[i]
+            self.count -= 1
+        self.valid[i] = not np.isnan(value)
+        self.values[i] = value if self.valid[i] else 0.0
+        if self.valid[i]:
+            self.total += value
+            self.count += 1
+        self.position += 1
+        # Re-summed once per window so that the running total does not drift
+        if self.position % len(self.values) == 0:
+            self.total = float(self.values.sum())
+        return self.total
+
+
+class OnlineFeatures:
+    """
+    Incremental counterpart of a FeaturePipeline for live feeds: update()
+    takes one LOB row at a time and returns that row's feature vector, in
+    O(1) per feature, equal to the row of FeaturePipeline.compute over the
+    ticks seen so far (up to float rounding).
+    """
+    def __init__(self, features, columns):
+        self.columns = {name: i for i, name in enumerate(columns)}
+        self.features = [dict(spec) for spec in features]
+        self.names = []
+        self._updates = []
+        for spec in self.features:
+            params = {key: value for key, value in spec.items() if key != "name"}
+            for column in _INPUTS[spec["name"]](spec):
+                if column not in self.columns:
+                    raise ValueError("feature input column {} is missing from the LOB data".format(column))
+            names, update = getattr(self, "_" + spec["name"])(**params)
+            self.names += names
+            self._updates.append(update)
+        self._out = np.zeros(len(self.names), dtype=np.float32)
+        self._midpoints = np.full(max([h for spec in self.features if spec["name"] == "returns"
+                                       for h in spec.get("horizons", (1, 10, 100))] + [1]) + 1, np.nan)
+        self.ticks = 0
+
+    def update(self, row):
+        mid = self.columns.get("midpoint")
+        if mid is not None:
+            self._midpoints[self.ticks % len(self._midpoints)] = row[mid]
+        values = []
+        for update in self._updates:
+            values += update(row)
+        self.ticks += 1
+        self._out[:] = values
+        return np.nan_to_num(self._out, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def _midpoint_back(self, h):
+        """Midpoint ``h`` ticks before the current one, NaN before the first tick."""
+        if h > self.ticks:
+            return np.nan
+        return self._midpoints[(self.ticks - h) % len(self._midpoints)]
+
+    def _ema(self, column="midpoint", span=100):
+        col = self.columns[column]
+        alpha = 2 / (span + 1)
+        state = [np.nan]
+
+        def update(row):
+            state[0] = row[col] if np.isnan(state[0]) else state[0] + alpha * (row[col] - state[0])
+            return [state[0]]
+        return ["ema_{}_{}".format(column, span)], update
+
+    def _volatility(self, window=1000):
+        sums = _RollingSum(window)
+        squares = _RollingSum(window)
+
+        def update(row):
+            ret = row[self.columns["midpoint"]] / self._midpoint_back(1) - 1
+            total = sums.update(ret)
+            total_squares = squares.update(ret * ret)
+            n = sums.count
+            if n < 2:
+                return [np.nan]
+            return [np.sqrt(max(total_squares - total * total / n, 0.0) / (n - 1))]
+        return ["volatility_{}".format(window)], update
+
+    def _relative_spread(self, window=1000):
+        sums = _RollingSum(window)
+
+        def update(row):
+            total = sums.update(row[self.columns["spread"]] / row[self.columns["midpoint"]])
+            return [total / sums.count if sums.count else np.nan]
+        return ["relative_spread_{}".format(window)], update
+
+    def _flow_imbalance(self, window=100):
+        buys = _RollingSum(window)
+        sells = _RollingSum(window)
+
+        def update(row):
+            total_buys = buys.update(row[self.columns["buys"]])
+            total_sells = sells.update(row[self.columns["sells"]])
+            total = total_buys + total_sells
+            return [(total_buys - total_sells) / total if total > 0 else 0.0]
+        return ["flow_imbalance_{}".format(window)], update
+
+    def _depth_imbalance(self, levels=5):
+        bid_cols = [self.columns["bids_notional_{}".format(level)] for level in range(levels)]
+        ask_cols = [self.columns["asks_notional_{}".format(level)] for level in range(levels)]
+
+        def update(row):
+            bids = row[bid_cols].sum()
+            asks = row[ask_cols].sum()
+            total = bids + asks
+            return [(bids - asks) / total if total > 0 else 0.0]
+        return ["depth_imbalance_{}".format(levels)], update
+
+    def _returns(self, horizons=(1, 10, 100)):
+        def update(row):
+            midpoint = row[self.columns["midpoint"]]
+            return [midpoint / self._midpoint_back(h) - 1 for h in horizons]
+        return ["return_{}".format(h) for h in horizons], update
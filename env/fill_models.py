@@ -0,0 +1,164 @@
+import bisect
+import operator
+
+import numpy as np
+
+
+class BestPriceFill:
+    """
+    The original fill rule: a quote is filled for the whole trade_volume
+    when it is better than the next tick's best price on its side, rebuilt
+    as midpoint -/+ spread / 2, and the cash or inventory covers it.
+    """
+    def bind(self, env):
+        return self
+
+    def reset(self):
+        pass
+
+    def fill(self, env, bid_price, ask_price, invalid):
+        """Volumes bought and sold at the new timestep env.t."""
+        if invalid:
+            return 0, 0
+        midpoint = env.midpoints[env.t]
+        spread = env.spreads[env.t]
+        volume = env.trade_volume
+        buy = volume if bid_price > midpoint - spread / 2 and env.cash >= bid_price * volume else 0
+        sell = volume if ask_price < midpoint + spread / 2 and env.inventory + buy >= volume else 0
+        return buy, sell
+
+
+class QueueFill:
+    """
+    Queue-position fills from the depth and order-flow columns of the
+    Kaggle LOB files ({bids,asks}_{distance,notional,market_notional,
+    cancel_notional}_<level>).
+
+    Each side keeps one resting order of trade_volume. When its price
+    changes it joins the back of the queue at that price, behind the
+    volume resting there in the book it was posted in (none when the
+    price is not a book level). Every tick, market orders executed at the
+    order's price first consume the queue ahead and then fill the order,
+    and cancellations at that price shorten the queue ahead pro rata. The
+    order fills completely when market orders traded through its price or
+    when the opposite best price crosses it. Fills can be partial, an
+    order keeps its queue position and remaining volume while its price
+    is unchanged and is renewed once fully filled.
+
+    Prices within ``tolerance`` (relative to the midpoint) of a book level
+    are at that level. The order is located among the depth levels with
+    one binary search per side, so a tick costs a handful of array calls
+    whatever the depth.
+    """
+    kinds = ("distance", "notional", "market_notional", "cancel_notional")
+    sides = ("bids", "asks")
+
+    def __init__(self, tolerance=1e-6):
+        self.tolerance = tolerance
+
+    def bind(self, env):
+        columns = {name: i for i, name in enumerate(env.observation_columns)}
+        depth = 0
+        while "bids_distance_{}".format(depth) in columns:
+            depth += 1
+        if depth == 0:
+            raise ValueError("QueueFill needs the LOB depth columns, bids_distance_0 is missing")
+
+        self.depth = depth
+        # Row positions of every level, per side and kind. The distances and market
+        # flows are also read as whole rows: a slice when the levels are contiguous
+        self._columns = []
+        self._levels = []
+        for side in self.sides:
+            side_columns = {}
+            for kind in self.kinds:
+                try:
+                    side_columns[kind] = [columns["{}_{}_{}".format(side, kind, level)] for level in range(depth)]
+                except KeyError as e:
+                    raise ValueError("QueueFill needs the LOB depth columns, {} is missing".format(e)) from None
+            self._columns.append(side_columns)
+            self._levels.append({kind: self._row_index(side_columns[kind]) for kind in ("distance", "market_notional")})
+        self.reset()
+        return self
+
+    def reset(self):
+        # [price, remaining volume, queue ahead] of the resting bid and ask
+        self._orders = [[None, 0.0, 0.0], [None, 0.0, 0.0]]
+
+    @staticmethod
+    def _row_index(index):
+        if index == list(range(index[0], index[0] + len(index))):
+            return slice(index[0], index[0] + len(index))
+        return np.array(index)
+
+    def _locate(self, row, side, distance):
+        """
+        Level of the book row at ``distance`` from the midpoint on ``side``
+        (None when no level is there) and the first level worse than it.
+        """
+        levels = row[self._levels[side]["distance"]]
+        if side == 0:
+            # Bid distances fall with the level: search them negated
+            first = bisect.bisect_left(levels, -distance - self.tolerance, key=operator.neg)
+            at_level = first < self.depth and -levels[first] <= -distance + self.tolerance
+        else:
+            first = bisect.bisect_left(levels, distance - self.tolerance)
+            at_level = first < self.depth and levels[first] <= distance + self.tolerance
+        if at_level:
+            return first, first + 1
+        return None, first
+
+    def _level_volume(self, row, side, kind, level, midpoint):
+        columns = self._columns[side]
+        return row[columns[kind][level]] / (midpoint * (1 + row[columns["distance"][level]]))
+
+    def fill(self, env, bid_price, ask_price, invalid):
+        """Volumes bought and sold at the new timestep env.t."""
+        if invalid:
+            # No quotes this tick, the resting orders are cancelled
+            self.reset()
+            return 0, 0
+
+        t = env.t
+        posted_row = env._obs_matrix[t - 1]
+        row = env._obs_matrix[t]
+        posted_midpoint = env.midpoints[t - 1]
+        midpoint = env.midpoints[t]
+        spread = env.spreads[t]
+        crossed = (bid_price >= midpoint + spread / 2, ask_price <= midpoint - spread / 2)
+
+        filled = [0.0, 0.0]
+        for side, price in enumerate((bid_price, ask_price)):
+            order = self._orders[side]
+            if order[0] is None or abs(order[0] - price) > self.tolerance * midpoint or order[1] <= 0:
+                # Join the back of the queue in the book the quote was posted in
+                level, _ = self._locate(posted_row, side, price / posted_midpoint - 1)
+                queue = 0.0 if level is None else self._level_volume(posted_row, side, "notional", level, posted_midpoint)
+                order[:] = [price, env.trade_volume, queue]
+
+            level, first_worse = self._locate(row, side, price / midpoint - 1)
+            if crossed[side] or (first_worse < self.depth
+                                 and row[self._levels[side]["market_notional"]][first_worse:].any()):
+                filled[side] = order[1]
+                continue
+            if level is None:
+                # The price left the book: whatever was ahead has gone if it is inside the visible levels
+                if first_worse < self.depth:
+                    order[2] = 0.0
+                continue
+
+            queue = order[2]
+            executed = self._level_volume(row, side, "market_notional", level, midpoint)
+            cancelled = self._level_volume(row, side, "cancel_notional", level, midpoint)
+            resting = self._level_volume(row, side, "notional", level, midpoint)
+            filled[side] = min(max(executed - queue, 0.0), order[1])
+            # Cancellations are spread evenly over the level, the queue ahead loses its share
+            before = resting + executed + cancelled
+            share_ahead = queue / before if before > 0 else 0.0
+            order[2] = max(queue - executed - cancelled * share_ahead, 0.0)
+
+        buy = min(filled[0], env.cash / bid_price) if filled[0] > 0 else 0
+        sell = min(filled[1], env.inventory + buy) if filled[1] > 0 else 0
+        self._orders[0][1] -= buy
+        self._orders[1][1] -= sell
+        return buy, sell
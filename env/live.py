@@ -0,0 +1,339 @@
+import asyncio
+import collections
+import inspect
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from env.lob_store import LOBStore
+
+
+# Columns holding flows over a tick rather than a book state, summed when ticks are coalesced
+ADDITIVE_PREFIXES = ("buys", "sells", "bids_market_notional", "asks_market_notional",
+                     "bids_cancel_notional", "asks_cancel_notional", "bids_limit_notional", "asks_limit_notional")
+
+
+def _feed_rows(source, columns=None):
+    """(rows, columns) float64 matrix of a DataFrame or LOBStore, and its nanosecond system_time if any."""
+    if isinstance(source, LOBStore):
+        values = source.values if columns is None else source.values[:, [source.columns.index(c) for c in columns]]
+        times = None if source.system_time is None else np.asarray(source.system_time).view(np.int64)
+        return values, times
+    columns = columns if columns is not None else [col for col in source.columns if col != 'system_time']
+    times = None
+    if 'system_time' in source.columns:
+        times = pd.to_datetime(source['system_time']).to_numpy(dtype="datetime64[ns]").view(np.int64)
+    return np.ascontiguousarray(source[columns].to_numpy(dtype=np.float64)), times
+
+
+async def replay_feed(source, columns=None, rate=None, speed=None):
+    """
+    Async iterator over the rows of a recorded DataFrame or LOBStore, as a
+    stand-in for a live feed. Ticks are paced at ``rate`` per second, or
+    by their system_time gaps divided by ``speed``, or one per turn of the
+    event loop when neither is given. A consumer that falls behind gets
+    the overdue ticks back to back, as it would from a socket buffer.
+    """
+    values, times = _feed_rows(source, columns)
+    if speed is not None and times is None:
+        raise ValueError("replaying at a speed needs the system_time of the ticks")
+    start = time.perf_counter()
+    for i in range(len(values)):
+        if rate is not None:
+            due = start + i / rate
+        elif speed is not None:
+            due = start + (times[i] - times[0]) / 1e9 / speed
+        else:
+            due = None
+        if due is None:
+            await asyncio.sleep(0)
+        else:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield values[i]
+
+
+async def serve_feed(source, host="127.0.0.1", port=0, columns=None, rate=None, speed=None):
+    """
+    TCP replay server of a recorded tape: every client gets a JSON header
+    line with the column names, then the replay_feed rows as raw float64.
+    Returns the asyncio.Server; its sockets give the port bound.
+    """
+    columns = columns if columns is not None else (
+        list(source.columns) if isinstance(source, LOBStore) else [col for col in source.columns if col != 'system_time'])
+
+    async def handle(reader, writer):
+        try:
+            writer.write((json.dumps({"columns": columns}) + "\n").encode())
+            async for row in replay_feed(source, columns, rate=rate, speed=speed):
+                writer.write(row.tobytes())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def socket_feed(host, port):
+    """Async iterator over the rows sent by a serve_feed server."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        columns = json.loads(await reader.readline())["columns"]
+        row_bytes = 8 * len(columns)
+        while True:
+            try:
+                data = await reader.readexactly(row_bytes)
+            except asyncio.IncompleteReadError:
+                return
+            yield np.frombuffer(data, dtype=np.float64)
+    finally:
+        writer.close()
+
+
+class TickRing:
+    """The last ``capacity`` ticks of a feed in a preallocated (capacity, columns) array."""
+    def __init__(self, capacity, n_columns):
+        self.values = np.empty((capacity, n_columns))
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, len(self.values))
+
+    def append(self, row):
+        self.values[self.count % len(self.values)] = row
+        self.count += 1
+
+    def last(self, n=None):
+        """The last ``n`` ticks (all the ring holds by default), oldest first."""
+        n = len(self) if n is None else min(n, len(self))
+        positions = np.arange(self.count - n, self.count) % len(self.values)
+        return self.values[positions]
+
+
+class LiveSession:
+    """
+    Drives an env and an agent from an async feed of LOB rows instead of a
+    static tape.
+
+    ``env`` is any BaseEnv built on a DataFrame or LOBStore with the feed's
+    columns (it only provides the column layout, action decoding, fill
+    model and features, the session replaces its tape). Each
+    tick is appended to a bounded TickRing, the features are updated
+    incrementally (OnlineFeatures) and the agent's last quotes are matched
+    against it with env.step, then the agent quotes on the new
+    observation. The agent needs no tape history: a NumpyPolicy, a
+    SimpleAgent, an ASAgent given sigma and T, or a PolicyServer, whose
+    predict is awaited for at most ``latency_budget`` seconds (the
+    previous quotes stay on past it).
+
+    Ticks wait in a queue of ``max_pending``, the oldest being dropped
+    when it is full. When several ticks are waiting the agent only quotes
+    on the newest: with overflow="coalesce" the others still update the
+    ring, the features and rolling_avg, and their flows (buys, sells,
+    market, cancel and limit notionals) are added to those of the newest
+    one for the fills; with overflow="drop" they are discarded.
+
+    The latency of a quote is the time from the receipt of its tick to
+    the action being ready; latency_stats() reports its distribution.
+    """
+    def __init__(self, env, agent, latency_budget=0.001, max_pending=1024, overflow="coalesce", ring_size=10_000,
+                 history=100_000):
+        if overflow not in ("coalesce", "drop"):
+            raise ValueError("overflow must be 'coalesce' or 'drop', not {!r}".format(overflow))
+        if env._stream is not None:
+            raise ValueError("a live session needs an env built on a DataFrame or LOBStore, not a LOBStream")
+        if env.episode_sampler is not None:
+            raise ValueError("a live session follows the feed, it cannot sample episodes")
+        self.env = env
+        self.agent = agent
+        self.latency_budget = latency_budget
+        self.max_pending = max_pending
+        self.overflow = overflow
+        columns = env.observation_columns
+        self.ticks = TickRing(ring_size, len(columns))
+        self.features = env.feature_pipeline.online(columns) if env.feature_pipeline is not None else None
+        self._midpoint_col = columns.index('midpoint')
+        self._additive = np.array([col.startswith(ADDITIVE_PREFIXES) for col in columns])
+        self._async_agent = inspect.iscoroutinefunction(getattr(agent, "predict", None))
+
+        self.latencies = collections.deque(maxlen=history)
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.quotes = 0
+        self.budget_misses = 0
+        self.total_reward = 0.0
+        self._action = None
+        self._window = None
+
+    def _install(self):
+        """Points the env at a two-row window (previous tick, new tick) the session rewrites in place."""
+        env = self.env
+        n_columns = len(env.observation_columns)
+        self._window = np.zeros((2, n_columns))
+        env._obs_matrix = self._window
+        env.midpoints = self._window[:, self._midpoint_col]
+        env.spreads = self._window[:, env.observation_columns.index('spread')]
+        if self.features is not None:
+            self._feature_window = np.zeros((2, len(self.features.names)), dtype=np.float32)
+            env._features = self._feature_window
+        env._last_t = sys.maxsize
+        env._window_end = -1
+
+    def _follow(self, midpoint, index):
+        """rolling_avg update of the env's step for a tick at global ``index``."""
+        if index < 5:
+            self.env.rolling_avg = midpoint
+        self.env.rolling_avg += 0.001 * (midpoint - self.env.rolling_avg)
+
+    def _absorb(self, row):
+        """Ring, features and rolling_avg update of a tick the agent does not quote on."""
+        self._follow(row[self._midpoint_col], self.ticks.count)
+        self.ticks.append(row)
+        if self.features is not None:
+            self.features.update(row)
+
+    def _advance(self, row, fill_row=None):
+        """
+        Matches the standing quotes against the new tick ``row`` and returns
+        the new observation. ``fill_row`` is the row the env steps on in its
+        place, the tick with the flows of the ticks coalesced into it.
+        """
+        env = self.env
+        index = self.ticks.count
+        self.ticks.append(row)
+        # Features see each tick once, the coalesced flows went through _absorb already
+        features = self.features.update(row) if self.features is not None else None
+        row = row if fill_row is None else fill_row
+        if self._window is None:
+            self._install()
+            self._window[:] = row
+            if features is not None:
+                self._feature_window[:] = features
+            env._reset_state()
+            env.t = 1
+            env._episode_start = 1 - index
+            self._follow(row[self._midpoint_col], index)
+            return env._get_obs()
+
+        self._window[0] = self._window[1]
+        self._window[1] = row
+        # The episode is the whole feed: env.episode_time() is the global index of the tick at env.t
+        env._episode_start = 1 - index
+        if features is not None:
+            self._feature_window[0] = self._feature_window[1]
+            self._feature_window[1] = features
+        if self._action is None:
+            self._follow(row[self._midpoint_col], index)
+            return env._get_obs()
+        # Global index of the window's first row, for the warm-up of rolling_avg
+        env._warmup_t = 5 - (index - 1)
+        env.t = 0
+        obs, reward, _, _, _ = env.step(self._action)
+        self.total_reward += reward
+        return obs
+
+    async def _quote(self, obs):
+        if not self._async_agent:
+            return self.agent.take_action(obs)
+        try:
+            return await asyncio.wait_for(self.agent.predict(obs), self.latency_budget)
+        except asyncio.TimeoutError:
+            return self._action
+
+    def _on_ticks(self, items):
+        """
+        Folds the ticks waiting in the queue into the newest one. Returns
+        its arrival, the tick itself and the row to fill on (the tick with
+        the flows of the coalesced ones added, None when there are none).
+        """
+        arrival, row = items[-1]
+        if len(items) == 1:
+            return arrival, row, None
+        if self.overflow == "drop":
+            self.dropped += len(items) - 1
+            return arrival, row, None
+        fill_row = row.copy()
+        for _, stale in items[:-1]:
+            self._absorb(stale)
+            fill_row[self._additive] += stale[self._additive]
+        self.coalesced += len(items) - 1
+        return arrival, row, fill_row
+
+    async def run(self, feed, max_ticks=None):
+        """Consumes ``feed`` (an async iterable of rows) until it ends or ``max_ticks`` ticks were received."""
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        done = object()
+
+        def put(item):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(item)
+
+        async def produce():
+            try:
+                async for row in feed:
+                    put((time.perf_counter(), np.asarray(row, dtype=np.float64)))
+                    self.received += 1
+                    if max_ticks is not None and self.received >= max_ticks:
+                        break
+            finally:
+                put(done)
+
+        producer = asyncio.get_running_loop().create_task(produce())
+        try:
+            finished = False
+            while not finished:
+                items = [await queue.get()]
+                while not queue.empty():
+                    items.append(queue.get_nowait())
+                if items[-1] is done:
+                    finished = True
+                    items.pop()
+                if not items:
+                    break
+                arrival, row, fill_row = self._on_ticks(items)
+                obs = self._advance(row, fill_row)
+                action = await self._quote(obs)
+                latency = time.perf_counter() - arrival
+                if latency > self.latency_budget:
+                    self.budget_misses += 1
+                self.latencies.append(latency)
+                self._action = action
+                self.quotes += 1
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+            if hasattr(feed, "aclose"):
+                await feed.aclose()
+        return self
+
+    def latency_stats(self):
+        """Tick-to-quote latency percentiles in microseconds and how many ticks were coalesced or dropped."""
+        latencies = np.array(self.latencies) * 1e6
+        stats = {
+            "ticks": self.received,
+            "quotes": self.quotes,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "budget_misses": self.budget_misses,
+        }
+        if len(latencies):
+            stats.update({
+                "p50_us": float(np.percentile(latencies, 50)),
+                "p90_us": float(np.percentile(latencies, 90)),
+                "p99_us": float(np.percentile(latencies, 99)),
+                "mean_us": float(latencies.mean()),
+                "max_us": float(latencies.max()),
+            })
+        return stats
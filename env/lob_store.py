@@ -0,0 +1,135 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+class LOBStoreWriter:
+    """
+    Appends LOB frames to an on-disk store, one chunk at a time.
+
+    Every column except ``system_time`` is written as float64 into one
+    row-major ``values.bin`` matrix, so a step reads a single contiguous
+    row. ``system_time`` is kept apart as int64 nanoseconds.
+
+    meta.json, which makes the store openable, is only written once the
+    store is complete: a writer left by an exception never looks like a
+    shorter dataset.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # The data files of any previous store there are about to be overwritten
+        if os.path.exists(os.path.join(path, "meta.json")):
+            os.remove(os.path.join(path, "meta.json"))
+        self.columns = None
+        self.n_rows = 0
+        self.has_time = None
+        self._values = open(os.path.join(path, "values.bin"), "wb")
+        self._time = None
+
+    def append(self, frame):
+        columns = [col for col in frame.columns if col != "system_time"]
+        if self.columns is None:
+            self.columns = columns
+            self.has_time = "system_time" in frame.columns
+            if self.has_time:
+                self._time = open(os.path.join(self.path, "system_time.bin"), "wb")
+        elif columns != self.columns:
+            raise ValueError("All chunks of a LOB store must have the same columns")
+
+        np.ascontiguousarray(frame[columns].to_numpy(dtype=np.float64)).tofile(self._values)
+        if self.has_time:
+            times = pd.to_datetime(frame["system_time"]).to_numpy(dtype="datetime64[ns]")
+            times.view(np.int64).tofile(self._time)
+        self.n_rows += len(frame)
+
+    def close(self, complete=True):
+        """Closes the data files and, unless the store is left incomplete, commits it by writing meta.json."""
+        self._values.close()
+        if self._time is not None:
+            self._time.close()
+        if not complete:
+            return
+        meta = {"columns": self.columns or [], "n_rows": self.n_rows, "has_time": bool(self.has_time)}
+        # Written under a temporary name first so a crash never leaves a partial meta.json
+        meta_path = os.path.join(self.path, "meta.json")
+        tmp = "{}.{}.tmp".format(meta_path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(complete=exc_type is None)
+
+
+class LOBStore:
+    """
+    Read-only, memory-mapped LOB dataset.
+
+    Opening a store maps its files instead of reading them, so any number
+    of processes share one copy through the page cache. ``store[col]``
+    and ``store.values`` are views, and ``slice`` returns a sub-store
+    without copying.
+    """
+    def __init__(self, values, columns, system_time=None, path=None):
+        self.values = values
+        self.columns = list(columns)
+        self.system_time = system_time
+        self.path = path
+        self._index = {col: i for i, col in enumerate(self.columns)}
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        shape = (meta["n_rows"], len(meta["columns"]))
+        values = np.memmap(os.path.join(path, "values.bin"), dtype=np.float64, mode="r", shape=shape)
+        system_time = None
+        if meta["has_time"]:
+            system_time = np.memmap(
+                os.path.join(path, "system_time.bin"), dtype=np.int64, mode="r", shape=(meta["n_rows"],)
+            ).view("datetime64[ns]")
+        return cls(values, meta["columns"], system_time, path=path)
+
+    @classmethod
+    def from_frame(cls, frame, path):
+        with LOBStoreWriter(path) as writer:
+            writer.append(frame)
+        return cls.open(path)
+
+    @classmethod
+    def from_csv(cls, csv_path, path, chunksize=1_000_000):
+        """Converts a raw LOB CSV once, streaming it so it never has to fit in RAM."""
+        with LOBStoreWriter(path) as writer:
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+                writer.append(chunk)
+        return cls.open(path)
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __getitem__(self, column):
+        if column == "system_time":
+            return self.system_time
+        return self.values[:, self._index[column]]
+
+    def slice(self, start, stop):
+        system_time = None if self.system_time is None else self.system_time[start:stop]
+        return LOBStore(self.values[start:stop], self.columns, system_time, path=self.path)
+
+    def to_frame(self):
+        frame = pd.DataFrame(np.asarray(self.values), columns=self.columns)
+        if self.system_time is not None:
+            frame.insert(0, "system_time", np.asarray(self.system_time))
+        return frame
+
+
+if __name__ == "__main__":
+    # python -m env.lob_store data/BTC_1sec.csv data/BTC
+    LOBStore.from_csv(sys.argv[1], sys.argv[2])
@@ -0,0 +1,72 @@
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+from env.lob_store import LOBStore
+
+
+class LOBStream:
+    """
+    Re-iterable source of fixed-size LOB chunks for datasets larger than RAM.
+
+    ``source`` is a CSV path or a LOBStore. Each call to ``chunks`` starts a
+    fresh pass over the data and yields float64 matrices of at most
+    ``chunk_size`` rows in ``columns`` order, while a background thread
+    reads the next ``prefetch`` chunks ahead.
+    """
+    def __init__(self, source, chunk_size=100_000, prefetch=1):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.prefetch = prefetch
+        if isinstance(source, LOBStore):
+            self.columns = list(source.columns)
+        else:
+            header = pd.read_csv(source, nrows=0).columns
+            self.columns = [col for col in header if col != 'system_time']
+
+    def _read_chunks(self):
+        if isinstance(self.source, LOBStore):
+            for start in range(0, len(self.source), self.chunk_size):
+                yield np.array(self.source.values[start:start + self.chunk_size])
+        else:
+            for frame in pd.read_csv(self.source, chunksize=self.chunk_size):
+                yield frame[self.columns].to_numpy(dtype=np.float64)
+
+    def chunks(self):
+        buffer = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for chunk in self._read_chunks():
+                    if not put(chunk):
+                        return
+                put(done)
+            except Exception as exc:
+                put(exc)
+
+        worker = threading.Thread(target=produce, daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Unblock the producer when the consumer stops early (e.g. on reset)
+            stop.set()
@@ -1,10 +1,15 @@
 import pandas
 import pandas as pd
 import enum
+import sys
 
 import gymnasium as gym
 import numpy as np
 
+from env.fill_models import BestPriceFill
+from env.lob_store import LOBStore
+from env.lob_stream import LOBStream
+from env.recording import TransitionWriter
 
 
 class TypeOfReward(enum.Enum):
@@ -16,53 +21,178 @@ class TypeOfReward(enum.Enum):
 class BaseEnv(gym.Env):
     metadata = {'render.modes': ['human']}
     
-    def __init__(self, lob_data, initial_cash=500_000, initial_inventory=0, trade_volume=1, inventory_penalty=0.001, reward_type:TypeOfReward=TypeOfReward.REWARD_1):
+    def __init__(self, lob_data, initial_cash=500_000, initial_inventory=0, trade_volume=1, inventory_penalty=0.001, reward_type:TypeOfReward=TypeOfReward.REWARD_1, fill_model=None, features=None, episode_sampler=None):
         super(BaseEnv, self).__init__()
 
-        # lob_data: pd.DataFrame with flexible structure
-        self.lob_data = lob_data if isinstance(lob_data, pd.DataFrame) else pd.DataFrame(lob_data)
+        # lob_data: pd.DataFrame with flexible structure, a memory-mapped LOBStore or a chunked LOBStream
+        if isinstance(lob_data, (pd.DataFrame, LOBStore, LOBStream)):
+            self.lob_data = lob_data
+        else:
+            self.lob_data = pd.DataFrame(lob_data)
         self.initial_cash = initial_cash
         self.initial_inventory = initial_inventory
         self.trade_volume = trade_volume
         self.inventory_penalty = inventory_penalty
         self.reward_type = reward_type
 
-        self._reset_state()
-
         # Observation space inferred from lob_data columns
-        self.observation_columns = [col for col in lob_data.columns if col not in ['system_time']]
+        self.observation_columns = [col for col in self.lob_data.columns if col not in ['system_time']]
+        self._stream = self.lob_data if isinstance(self.lob_data, LOBStream) else None
+
+        # Precomputed feature columns (a FeaturePipeline), observed between the LOB columns and rolling_avg
+        self._features = None
+        self.feature_columns = []
+        self.feature_pipeline = features
+        if features is not None:
+            if self._stream is not None:
+                raise ValueError("features are precomputed over the whole tape, they need a DataFrame or LOBStore")
+            self._features, self.feature_columns = features.transform(self.lob_data)
+
         self.observation_space = gym.spaces.Box(
-            low=-np.inf, high=np.inf, shape=(len(self.observation_columns) + 1,), dtype=np.float32
+            low=-np.inf, high=np.inf, shape=(len(self.observation_columns) + len(self.feature_columns) + 1,), dtype=np.float32
         )
-        
-        self.rolling_avg = self.lob_data.iloc[0]['midpoint']
+
+        # Contiguous arrays read by the step path instead of per-step iloc lookups
+        self._chunks = None
+        self._warmup_t = 5
+        self._window_end = -1
+        if self._stream is not None:
+            # Only a bounded window of the stream is resident, installed by _reset_state
+            self._midpoint_col = self.observation_columns.index('midpoint')
+            self._spread_col = self.observation_columns.index('spread')
+        elif isinstance(self.lob_data, LOBStore):
+            # Views of the mapped files, shared with every other process using the store
+            self._obs_matrix = self.lob_data.values
+            self.midpoints = self.lob_data['midpoint']
+            self.spreads = self.lob_data['spread']
+        else:
+            self._obs_matrix = np.ascontiguousarray(self.lob_data[self.observation_columns].to_numpy(dtype=np.float64))
+            self.midpoints = np.ascontiguousarray(self.lob_data['midpoint'].to_numpy(dtype=np.float64))
+            self.spreads = np.ascontiguousarray(self.lob_data['spread'].to_numpy(dtype=np.float64))
+        if self._stream is None:
+            self._last_t = len(self.midpoints) - 1
+
+        # Decides how much of each quote is filled, see env/fill_models.py
+        self.fill_model = (fill_model if fill_model is not None else BestPriceFill()).bind(self)
+
+        # TransitionWriter every transition is streamed to while recording
+        self._recorder = None
+
+        # EpisodeSampler drawing the start of each episode, None to always replay the tape from its start
+        self.episode_sampler = episode_sampler.bind(self) if episode_sampler is not None else None
+
+        self._reset_state()
+
+        if self.episode_sampler is None:
+            self.rolling_avg = self.midpoints[0]
         
         self.declare_action_space()
 
 
     def _reset_state(self):
         self.t = 0
+        if self._stream is not None:
+            self._start_stream()
+        if self.episode_sampler is not None:
+            self.t = self.episode_sampler.sample(self.np_random)
+            self._last_t = self.t + self.episode_sampler.length
+            self.rolling_avg = self.episode_sampler.rolling_avg[self.t]
+        # Tape row the episode started at
+        self._episode_start = self.t
         self.cash = float(self.initial_cash)
         self.inventory = float(self.initial_inventory)
         self.prev_valuation = self._current_mark_to_market()
+        self.fill_model.reset()
+
+    def _set_window(self, window, t_offset):
+        self._obs_matrix = window
+        self.midpoints = window[:, self._midpoint_col]
+        self.spreads = window[:, self._spread_col]
+        self._last_t = sys.maxsize
+        self._window_end = len(window) - 1
+        # rolling_avg follows the midpoint over the first 5 steps of the whole stream
+        self._warmup_t = 5 - t_offset
+        self._t_offset = t_offset
+
+    def _start_stream(self):
+        if self._chunks is not None:
+            self._chunks.close()
+        self._chunks = self._stream.chunks()
+        self._set_window(next(self._chunks), 0)
+        if self._window_end == 0:
+            self._next_window()
+
+    def _next_window(self):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            # Stream exhausted, the current row is the last one of the episode
+            self._last_t = self.t
+            self._window_end = -1
+            return
+        # Carry the current row over so that t and t + 1 always sit in the same window
+        window = np.concatenate([self._obs_matrix[self.t:self.t + 1], chunk])
+        self._set_window(window, self._t_offset + self.t)
+        self.t = 0
+
+    def episode_time(self, t=None):
+        """Steps elapsed since the start of the episode at row(s) ``t`` of the tape (the current row by default)."""
+        t = self.t if t is None else t
+        if self._stream is not None:
+            # Rows are relative to the resident window of the stream
+            return self._t_offset + t
+        return t - self._episode_start
+
+    def episode_length(self):
+        """Steps in the current episode, sys.maxsize while it ends with a stream or feed of unknown length."""
+        if self._last_t == sys.maxsize:
+            return sys.maxsize
+        return self.episode_time(self._last_t)
 
     def _current_mark_to_market(self):
-        midpoint = self.lob_data.iloc[self.t]['midpoint']
-        return self.cash + self.inventory * midpoint
+        return self.cash + self.inventory * self.midpoints[self.t]
 
-    def reset(self, seed=0):
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        if seed is not None and self.episode_sampler is not None:
+            self.episode_sampler.restart()
         self._reset_state()
-        return self._get_obs(), {}
+        obs = self._get_obs()
+        if self._recorder is not None:
+            self._recorded_obs = obs
+        return obs, {}
+
+    def start_recording(self, path, **kwargs):
+        """
+        Streams every following (obs, action, reward, next_obs, done)
+        transition, whatever agent acts, to a TransitionWriter log in
+        ``path`` (see env/recording.py) until stop_recording().
+        """
+        self.stop_recording()
+        self._recorder = TransitionWriter(path, self.observation_space, self.action_space, **kwargs)
+        self._recorded_obs = self._get_obs()
+        return self._recorder
+
+    def stop_recording(self):
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
 
     def _get_obs(self):
-        # Dynamically extract observation based on columns
-        row = self.lob_data.iloc[self.t]
-        return np.array([row[col] for col in self.observation_columns] + [self.rolling_avg], dtype=np.float32)
+        return self._fill_obs(np.empty(self.observation_space.shape[0], dtype=np.float32), self.t, self.rolling_avg)
+
+    def _fill_obs(self, out, rows, rolling_avg):
+        """Writes the observations at LOB row(s) ``rows`` into ``out``."""
+        n_columns = self._obs_matrix.shape[1]
+        out[..., :n_columns] = self._obs_matrix[rows]
+        if self._features is not None:
+            out[..., n_columns:-1] = self._features[rows]
+        out[..., -1] = rolling_avg
+        return out
 
     def step(self, action):
         done = False
 
-        if self.t >= len(self.lob_data) - 1:
+        if self.t >= self._last_t:
             done = True
             reward = 0.0
             return self._get_obs(), reward, done, {}
@@ -70,37 +200,21 @@ class BaseEnv(gym.Env):
         bid_price, ask_price, invalid = self.get_bid_ask_prices(action)
 
         self.t += 1
-        next_row = self.lob_data.iloc[self.t]
-        next_best_bid = next_row['midpoint'] - next_row['spread'] / 2
-        next_best_ask = next_row['midpoint'] + next_row['spread'] / 2
+        next_midpoint = self.midpoints[self.t]
         
-        if self.t < 5:
-            self.rolling_avg = next_row['midpoint'] 
-        bought = 0
-        sold = 0
+        if self.t < self._warmup_t:
+            self.rolling_avg = next_midpoint 
 
-        # Determine if buy happened
-        can_buy = (bid_price > next_best_bid) and (self.cash >= bid_price * self.trade_volume) and not invalid
-        if can_buy:
-            self.cash -= bid_price * self.trade_volume
-            self.inventory += self.trade_volume
-            bought = (bid_price - self.rolling_avg) * self.trade_volume
-
-        # Determine if sell happened
-        can_sell = (ask_price < next_best_ask) and (self.inventory >= self.trade_volume) and not invalid
-        if can_sell:
-            self.cash += ask_price * self.trade_volume
-            self.inventory -= self.trade_volume
-            sold = (ask_price - self.rolling_avg) * self.trade_volume
+        buy_volume, sell_volume, bought, sold = self._match_fills(bid_price, ask_price, invalid)
             
-        self.rolling_avg += 0.001 * (next_row['midpoint'] - self.rolling_avg)
+        self.rolling_avg += 0.001 * (next_midpoint - self.rolling_avg)
 
         if self.reward_type == TypeOfReward.REWARD_1:
             pnl_change = sold + bought
             trading_rew = 5 * int(sold != 0) + 5 * int(bought != 0)
             reward = pnl_change + trading_rew
         else:
-            new_valuation = self.cash + self.inventory * next_row['midpoint']
+            new_valuation = self.cash + self.inventory * next_midpoint
             pnl_change = new_valuation - self.prev_valuation
             inv_penalty = 0
             if self.inventory > 150:
@@ -108,10 +222,43 @@ class BaseEnv(gym.Env):
             reward = pnl_change + inv_penalty
             self.prev_valuation = new_valuation
 
-        if self.t == len(self.lob_data) - 1:
-            done = True
+        if self.t == self._window_end:
+            self._next_window()
+
+        # A sampled episode ends on its time limit, not on a terminal state of the market
+        truncated = False
+        if self.t == self._last_t:
+            if self.episode_sampler is None:
+                done = True
+            else:
+                truncated = True
+
+        info = {'buy_volume': buy_volume, 'sell_volume': sell_volume}
+        obs = self._get_obs()
+        if self._recorder is not None:
+            self._recorder.add(self._recorded_obs, action, reward, obs, done)
+            self._recorded_obs = obs
+        return obs, reward, done, truncated, info
 
-        return self._get_obs(), reward, done, False, {}
+    def _match_fills(self, bid_price, ask_price, invalid):
+        """Fills the quotes at the new timestep t as decided by the fill model."""
+        buy_volume, sell_volume = self.fill_model.fill(self, bid_price, ask_price, invalid)
+        bought = 0
+        sold = 0
+
+        # Determine if buy happened
+        if buy_volume:
+            self.cash -= bid_price * buy_volume
+            self.inventory += buy_volume
+            bought = (bid_price - self.rolling_avg) * buy_volume
+
+        # Determine if sell happened
+        if sell_volume:
+            self.cash += ask_price * sell_volume
+            self.inventory -= sell_volume
+            sold = (ask_price - self.rolling_avg) * sell_volume
+
+        return buy_volume, sell_volume, bought, sold
 
     def render(self, mode='human'):
         print("Timestep:", self.t)
@@ -119,11 +266,38 @@ class BaseEnv(gym.Env):
         print("Inventory:", self.inventory)
         print("Current Valuation:", self._current_mark_to_market())
         if mode == 'human':
-            row = self.lob_data.iloc[self.t]
-            print("LOB Data at Timestep {}: {}".format(self.t, row.to_dict()))
+            row = dict(zip(self.observation_columns, self._obs_matrix[self.t]))
+            print("LOB Data at Timestep {}: {}".format(self.t, row))
             
     def get_bid_ask_prices(self, action):
         raise NotImplementedError("get_bid_ask_prices(self, action) has to be implemented")
+
+    def get_bid_ask_prices_batch(self, actions, t, rolling_avg, inventory, episode=None):
+        """
+        Quotes at tape rows ``t`` for a batch of states. ``episode`` is the
+        (steps elapsed, episode length) of each row, for quotes depending on
+        the time left; by default the rows are in this env's current episode.
+        """
+        raise NotImplementedError("get_bid_ask_prices_batch(self, actions, t, rolling_avg, inventory, episode=None) has to be implemented")
+
+    def quote_action(self, bid_price, ask_price):
+        """The action of this env quoting closest to (bid_price, ask_price) at the current step."""
+        raise NotImplementedError("quote_action(self, bid_price, ask_price) has to be implemented")
+
+    def _quote_level(self, bid_price, ask_price, levels):
+        """Level 0..levels of the discrete quote grid of get_bid_ask_prices closest to the two prices."""
+        midpoint = self.midpoints[self.t]
+        spread = self.spreads[self.t]
+        if self.reward_type == TypeOfReward.REWARD_1:
+            lower_spread = self.rolling_avg - (midpoint - spread)
+            upper_spread = (midpoint + spread) - self.rolling_avg
+            bid_fraction = (self.rolling_avg - bid_price) / lower_spread if lower_spread > 0 else 0.0
+            ask_fraction = (ask_price - self.rolling_avg) / upper_spread if upper_spread > 0 else 0.0
+        else:
+            bid_fraction = (midpoint - bid_price) / spread if spread > 0 else 0.0
+            ask_fraction = (ask_price - midpoint) / spread if spread > 0 else 0.0
+        # One level moves both quotes, so take the one closest to both
+        return int(np.clip(round((bid_fraction + ask_fraction) / 2 * levels), 0, levels))
     
     def declare_action_space(self):
         raise NotImplementedError("declare_action_space(self) has to be implemented")
\ No newline at end of file
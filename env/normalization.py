@@ -0,0 +1,117 @@
+import json
+
+import numpy as np
+
+
+class ObservationNormalizer:
+    """
+    Per-column scaling of BaseEnv observations.
+
+    ``fit`` computes the statistics over a training slice of an env's tape
+    in one pass: mean and std (method="standard", streamed over row
+    chunks) or median and inter-quantile range (method="robust").
+    ``transform`` then applies (obs - center) * scale, clipped to
+    +/- ``clip``, in place into a float32 buffer. The rolling_avg entry
+    follows the midpoint, so it is scaled with the midpoint's statistics.
+    """
+    def __init__(self, method="standard", quantiles=(0.25, 0.75), clip=10.0):
+        if method not in ("standard", "robust"):
+            raise ValueError("method must be 'standard' or 'robust'")
+        self.method = method
+        self.quantiles = tuple(quantiles)
+        self.clip = clip
+        self.columns = None
+        self.center = None
+        self.scale = None
+
+    @property
+    def fitted(self):
+        return self.center is not None
+
+    def fit(self, env, start=0, stop=None, chunk_rows=1_000_000):
+        """Statistics of env's observations over rows [start, stop) of its tape."""
+        if env._stream is not None:
+            raise ValueError("fit needs the whole tape in memory or in a LOBStore, not a LOBStream")
+        stop = env._last_t + 1 if stop is None else stop
+        matrices = [env._obs_matrix] + ([env._features] if env._features is not None else [])
+
+        if self.method == "standard":
+            center, std = self._moments(matrices, start, stop, chunk_rows)
+            spread = std
+        else:
+            stats = [np.quantile(np.asarray(matrix[start:stop, j], dtype=np.float64),
+                                 [self.quantiles[0], 0.5, self.quantiles[1]])
+                     for matrix in matrices for j in range(matrix.shape[1])]
+            stats = np.array(stats)
+            center, spread = stats[:, 1], stats[:, 2] - stats[:, 0]
+
+        # rolling_avg is last and is scaled like the midpoint
+        midpoint = env.observation_columns.index('midpoint')
+        center = np.append(center, center[midpoint])
+        spread = np.append(spread, spread[midpoint])
+        self.columns = list(env.observation_columns) + list(env.feature_columns) + ['rolling_avg']
+        self.center = center.astype(np.float32)
+        self.scale = np.divide(1.0, spread, out=np.ones_like(spread), where=spread > 0).astype(np.float32)
+        return self
+
+    @staticmethod
+    def _moments(matrices, start, stop, chunk_rows):
+        # Chunk moments merged with Chan et al.'s parallel update, all columns at once
+        n = 0
+        mean = None
+        m2 = None
+        for chunk_start in range(start, stop, chunk_rows):
+            chunk_stop = min(chunk_start + chunk_rows, stop)
+            chunk = np.hstack([np.asarray(matrix[chunk_start:chunk_stop], dtype=np.float64) for matrix in matrices])
+            k = len(chunk)
+            chunk_mean = chunk.mean(axis=0)
+            chunk_m2 = ((chunk - chunk_mean) ** 2).sum(axis=0)
+            if mean is None:
+                n, mean, m2 = k, chunk_mean, chunk_m2
+                continue
+            delta = chunk_mean - mean
+            total = n + k
+            mean = mean + delta * k / total
+            m2 = m2 + chunk_m2 + delta ** 2 * n * k / total
+            n = total
+        if mean is None:
+            raise ValueError("cannot fit on an empty slice")
+        return mean, np.sqrt(m2 / max(n - 1, 1))
+
+    def transform(self, obs, out=None):
+        """Normalized ``obs`` (one observation or a batch), written into ``out`` (``obs`` itself is fine)."""
+        if out is None:
+            out = np.empty(np.shape(obs), dtype=np.float32)
+        np.subtract(obs, self.center, out=out)
+        np.multiply(out, self.scale, out=out)
+        if self.clip is not None:
+            np.clip(out, -self.clip, self.clip, out=out)
+        return out
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "quantiles": list(self.quantiles),
+            "clip": self.clip,
+            "columns": self.columns,
+            "center": None if self.center is None else self.center.tolist(),
+            "scale": None if self.scale is None else self.scale.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        normalizer = cls(state["method"], state["quantiles"], state["clip"])
+        normalizer.columns = state["columns"]
+        if state["center"] is not None:
+            normalizer.center = np.array(state["center"], dtype=np.float32)
+            normalizer.scale = np.array(state["scale"], dtype=np.float32)
+        return normalizer
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
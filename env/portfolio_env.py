@@ -0,0 +1,223 @@
+import gymnasium as gym
+import numpy as np
+import pandas as pd
+
+from env.lob_store import LOBStore
+from env.models import TypeOfReward
+
+
+def tape_times(tape):
+    """``system_time`` of a DataFrame or LOBStore tape as int64 nanoseconds."""
+    if isinstance(tape, LOBStore):
+        if tape.system_time is None:
+            raise ValueError("the LOB store has no system_time to align on")
+        return np.asarray(tape.system_time).view(np.int64)
+    if "system_time" not in tape.columns:
+        raise ValueError("the LOB data has no system_time column to align on")
+    return pd.to_datetime(tape["system_time"]).to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def align_tapes(times):
+    """
+    As-of alignment of K tapes ticking at different times.
+
+    ``times`` holds the sorted timestamps of each tape. Returns the union
+    of the timestamps from the first one at which every tape has ticked,
+    and a (K, T) array of the row of each tape in force at each of them
+    (its last tick at or before it). The timestamps are merged once and
+    each tape is searched with searchsorted, so the cost is
+    O(sum(N) log(sum(N))) and no K-way cross product is ever built.
+    """
+    for tape in times:
+        if len(tape) == 0:
+            raise ValueError("cannot align an empty tape")
+        if (np.diff(tape) < 0).any():
+            raise ValueError("system_time must be sorted")
+    start = max(tape[0] for tape in times)
+    union = np.unique(np.concatenate(times))
+    union = union[union >= start]
+    rows = np.stack([np.searchsorted(tape, union, side="right") - 1 for tape in times])
+    return union, rows
+
+
+class PortfolioEnv(gym.Env):
+    """
+    Market making on K instruments at once with one shared cash account.
+
+    ``tapes`` maps each asset to its LOB DataFrame or LOBStore. The tapes
+    are aligned on ``system_time`` with align_tapes, so one step moves to
+    the next tick of any asset, the others keeping their last book. Each
+    asset is quoted like in a single-asset env of class ``env_cls``
+    (SimpleEnv, ASEnv, PPOEnv or DQNEnv): the action holds one action of
+    that env per asset, flattened, and is decoded for all assets at once.
+
+    Fills follow the BestPriceFill rule for every asset in one vectorized
+    pass. Buys are paid from the shared cash in asset order until it runs
+    out, sells need the asset's own inventory. The reward is the sum of
+    the per-asset rewards, which info["rewards"] reports; with REWARD_2
+    an asset's PnL is its position revaluation plus its own cash flows.
+
+    The observation concatenates, per asset, its LOB columns at the
+    current row and its rolling average midpoint.
+    """
+    metadata = {'render.modes': ['human']}
+
+    def __init__(self, tapes, env_cls, initial_cash=500_000, initial_inventory=0, trade_volume=1,
+                 inventory_penalty=0.001, reward_type: TypeOfReward = TypeOfReward.REWARD_1):
+        super().__init__()
+        self.assets = list(tapes)
+        tapes = [tapes[asset] if isinstance(tapes[asset], (pd.DataFrame, LOBStore)) else pd.DataFrame(tapes[asset])
+                 for asset in self.assets]
+        n_assets = len(tapes)
+        if n_assets == 0:
+            raise ValueError("a portfolio needs at least one tape")
+        if getattr(env_cls, "uses_tape_history", False):
+            raise ValueError("{} quotes from its own tape's history, which a portfolio does not keep per asset"
+                             .format(env_cls.__name__))
+
+        self.initial_cash = initial_cash
+        self.initial_inventory = np.broadcast_to(np.asarray(initial_inventory, dtype=np.float64), (n_assets,)).copy()
+        self.trade_volume = np.broadcast_to(np.asarray(trade_volume, dtype=np.float64), (n_assets,)).copy()
+        self.inventory_penalty = inventory_penalty
+        self.reward_type = reward_type
+
+        self.system_time, self._rows = align_tapes([tape_times(tape) for tape in tapes])
+        self._last_t = len(self.system_time) - 1
+
+        # Per-asset observation matrices, read at each asset's aligned row
+        self.observation_columns = []
+        self._obs_matrices = []
+        midpoints = []
+        spreads = []
+        for asset, tape, rows in zip(self.assets, tapes, self._rows):
+            if isinstance(tape, LOBStore):
+                columns = tape.columns
+                matrix = tape.values
+            else:
+                columns = [col for col in tape.columns if col != 'system_time']
+                matrix = np.ascontiguousarray(tape[columns].to_numpy(dtype=np.float64))
+            self.observation_columns.append(columns)
+            self._obs_matrices.append(matrix)
+            midpoints.append(matrix[rows, columns.index('midpoint')])
+            spreads.append(matrix[rows, columns.index('spread')])
+
+        # (T, K) aligned prices, the only arrays the step path reads
+        self.midpoints = np.ascontiguousarray(np.stack(midpoints, axis=1))
+        self.spreads = np.ascontiguousarray(np.stack(spreads, axis=1))
+
+        # Observation slot of each asset's LOB row, its rolling_avg right after it
+        self._obs_slices = []
+        avg_slots = []
+        start = 0
+        for columns in self.observation_columns:
+            self._obs_slices.append(slice(start, start + len(columns)))
+            avg_slots.append(start + len(columns))
+            start += len(columns) + 1
+        self._avg_slots = np.array(avg_slots)
+        self.observation_space = gym.spaces.Box(low=-np.inf, high=np.inf, shape=(start,), dtype=np.float32)
+
+        # Single-asset env over the flattened (T * K) aligned prices, so that its
+        # get_bid_ask_prices_batch decodes the quotes of all assets in one call:
+        # row t * K + k holds asset k at time t
+        flat = np.stack([self.midpoints, self.spreads], axis=-1).reshape(-1, 2)
+        self._decoder = env_cls(LOBStore(flat, ['midpoint', 'spread']), reward_type=reward_type)
+        self._asset_index = np.arange(n_assets)
+        self.action_space = self._portfolio_action_space(self._decoder.action_space, n_assets)
+
+        self._reset_state()
+
+    @staticmethod
+    def _portfolio_action_space(space, n_assets):
+        if isinstance(space, gym.spaces.Discrete):
+            return gym.spaces.MultiDiscrete([space.n] * n_assets)
+        if isinstance(space, gym.spaces.MultiDiscrete):
+            return gym.spaces.MultiDiscrete(np.tile(space.nvec, n_assets))
+        if isinstance(space, gym.spaces.Box):
+            return gym.spaces.Box(low=np.tile(space.low, n_assets), high=np.tile(space.high, n_assets),
+                                  dtype=space.dtype)
+        raise ValueError("unsupported action space {}".format(space))
+
+    def _reset_state(self):
+        self.t = 0
+        self.cash = float(self.initial_cash)
+        self.inventory = self.initial_inventory.copy()
+        self.rolling_avg = self.midpoints[0].copy()
+        self.prev_position_value = self.inventory * self.midpoints[0]
+
+    def _current_mark_to_market(self):
+        return self.cash + self.inventory @ self.midpoints[self.t]
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self._reset_state()
+        return self._get_obs(), {}
+
+    def _get_obs(self):
+        obs = np.empty(self.observation_space.shape[0], dtype=np.float32)
+        for matrix, rows, slot in zip(self._obs_matrices, self._rows, self._obs_slices):
+            obs[slot] = matrix[rows[self.t]]
+        obs[self._avg_slots] = self.rolling_avg
+        return obs
+
+    def step(self, action):
+        if self.t >= self._last_t:
+            return self._get_obs(), 0.0, True, False, {}
+
+        n_assets = len(self.assets)
+        actions = np.asarray(action)
+        if not isinstance(self._decoder.action_space, gym.spaces.Discrete):
+            actions = actions.reshape(n_assets, -1)
+        flat_rows = self.t * n_assets + self._asset_index
+        bid_price, ask_price, invalid = self._decoder.get_bid_ask_prices_batch(actions, flat_rows, self.rolling_avg,
+                                                                                  self.inventory)
+
+        self.t += 1
+        next_midpoint = self.midpoints[self.t]
+        next_spread = self.spreads[self.t]
+        next_best_bid = next_midpoint - next_spread / 2
+        next_best_ask = next_midpoint + next_spread / 2
+        volume = self.trade_volume
+
+        if self.t < 5:
+            self.rolling_avg[:] = next_midpoint
+
+        # Buys, paid from the shared cash in asset order while it lasts
+        wants_buy = (bid_price > next_best_bid) & ~invalid
+        cost = np.where(wants_buy, bid_price * volume, 0.0)
+        can_buy = wants_buy & (np.cumsum(cost) <= self.cash)
+        buy_volume = np.where(can_buy, volume, 0.0)
+        self.inventory += buy_volume
+        bought = (bid_price - self.rolling_avg) * buy_volume
+
+        # Sells, each from the asset's own inventory
+        can_sell = (ask_price < next_best_ask) & (self.inventory >= volume) & ~invalid
+        sell_volume = np.where(can_sell, volume, 0.0)
+        self.inventory -= sell_volume
+        sold = (ask_price - self.rolling_avg) * sell_volume
+
+        cash_flow = ask_price * sell_volume - bid_price * buy_volume
+        self.cash += cash_flow.sum()
+
+        self.rolling_avg += 0.001 * (next_midpoint - self.rolling_avg)
+
+        if self.reward_type == TypeOfReward.REWARD_1:
+            trading_rew = 5 * (sold != 0) + 5 * (bought != 0)
+            rewards = sold + bought + trading_rew
+        else:
+            position_value = self.inventory * next_midpoint
+            inv_penalty = np.where(
+                self.inventory > 150, -self.inventory_penalty * (self.inventory - 150) ** 2, 0.0
+            )
+            rewards = position_value - self.prev_position_value + cash_flow + inv_penalty
+            self.prev_position_value = position_value
+
+        done = self.t == self._last_t
+        info = {'rewards': rewards, 'buy_volume': buy_volume, 'sell_volume': sell_volume}
+        return self._get_obs(), float(rewards.sum()), done, False, info
+
+    def render(self, mode='human'):
+        print("Timestep:", self.t)
+        print("Time:", self.system_time[self.t].astype("datetime64[ns]"))
+        print("Cash:", self.cash)
+        print("Inventory:", dict(zip(self.assets, self.inventory)))
+        print("Current Valuation:", self._current_mark_to_market())
@@ -17,11 +17,12 @@ class PPOEnv(BaseEnv):
     def get_bid_ask_prices(self, action):
         bid_action, ask_action = action
         
-        current_row = self.lob_data.iloc[self.t]
+        midpoint = self.midpoints[self.t]
+        spread = self.spreads[self.t]
         
         if self.reward_type == TypeOfReward.REWARD_1:
-            upper_spread = (current_row['midpoint'] + current_row['spread']) - self.rolling_avg
-            lower_spread = self.rolling_avg - (current_row['midpoint'] - current_row['spread'])
+            upper_spread = (midpoint + spread) - self.rolling_avg
+            lower_spread = self.rolling_avg - (midpoint - spread)
             
             invalid = False
             if lower_spread < 0 or upper_spread < 0:
@@ -33,8 +34,35 @@ class PPOEnv(BaseEnv):
             return bid_price, ask_price, invalid
         
         else:
-            bid_price = current_row['midpoint'] - current_row['spread']*(bid_action/self.n)
-            ask_price = current_row['midpoint'] + current_row['spread']*(bid_action/self.n)
+            bid_price = midpoint - spread*(bid_action/self.n)
+            ask_price = midpoint + spread*(bid_action/self.n)
 
             return bid_price, ask_price, False
-    
+
+    def get_bid_ask_prices_batch(self, actions, t, rolling_avg, inventory, episode=None):
+        actions = np.asarray(actions)
+        bid_action, ask_action = actions[:, 0], actions[:, 1]
+
+        midpoint = self.midpoints[t]
+        spread = self.spreads[t]
+
+        if self.reward_type == TypeOfReward.REWARD_1:
+            upper_spread = (midpoint + spread) - rolling_avg
+            lower_spread = rolling_avg - (midpoint - spread)
+
+            invalid = (lower_spread < 0) | (upper_spread < 0)
+
+            bid_price = rolling_avg - lower_spread * (ask_action/self.n)
+            ask_price = rolling_avg + upper_spread * (ask_action/self.n)
+
+            return bid_price, ask_price, invalid
+
+        else:
+            bid_price = midpoint - spread*(bid_action/self.n)
+            ask_price = midpoint + spread*(bid_action/self.n)
+
+            return bid_price, ask_price, np.zeros(len(t), dtype=bool)
+
+    def quote_action(self, bid_price, ask_price):
+        level = self._quote_level(bid_price, ask_price, self.n)
+        return np.array([level, level])
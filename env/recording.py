@@ -0,0 +1,186 @@
+import collections
+import json
+import os
+
+import gymnasium as gym
+import numpy as np
+
+
+COLUMNS = ("obs", "action", "reward", "next_obs", "done")
+
+
+def _action_format(action_space):
+    """dtype and shape an action of ``action_space`` is stored with."""
+    if isinstance(action_space, gym.spaces.Discrete):
+        return np.int16, ()
+    if isinstance(action_space, gym.spaces.MultiDiscrete):
+        return np.int16, tuple(action_space.nvec.shape)
+    if isinstance(action_space, gym.spaces.Box):
+        return np.float32, tuple(action_space.shape)
+    raise ValueError("cannot record actions of {}".format(action_space))
+
+
+class TransitionWriter:
+    """
+    Appends (obs, action, reward, next_obs, done) transitions to a log
+    directory, ``chunk_rows`` transitions per chunk.
+
+    Observations and rewards are stored as float32, discrete actions as
+    int16, done as uint8. Each chunk column is a plain .npy file that
+    TransitionLog memory-maps, or, with compress=True, one compressed .npz
+    per chunk (smaller, but read back a chunk at a time). meta.json is
+    rewritten after every chunk, so a log cut short keeps its full chunks.
+    """
+    def __init__(self, path, observation_space, action_space, chunk_rows=100_000, compress=False):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, "meta.json")):
+            raise FileExistsError("{} already holds a transition log".format(path))
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+        self.obs_shape = tuple(observation_space.shape)
+        action_dtype, self.action_shape = _action_format(action_space)
+        self.action_space = action_space
+        self.chunks = []
+
+        self._buffers = {
+            "obs": np.empty((chunk_rows,) + self.obs_shape, dtype=np.float32),
+            "action": np.empty((chunk_rows,) + self.action_shape, dtype=action_dtype),
+            "reward": np.empty(chunk_rows, dtype=np.float32),
+            "next_obs": np.empty((chunk_rows,) + self.obs_shape, dtype=np.float32),
+            "done": np.empty(chunk_rows, dtype=np.uint8),
+        }
+        self._rows = 0
+
+    def add(self, obs, action, reward, next_obs, done):
+        row = self._rows
+        self._buffers["obs"][row] = obs
+        self._buffers["action"][row] = action
+        self._buffers["reward"][row] = reward
+        self._buffers["next_obs"][row] = next_obs
+        self._buffers["done"][row] = done
+        self._rows += 1
+        if self._rows == self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered transitions as a new chunk."""
+        if self._rows == 0:
+            return
+        name = "{:05d}".format(len(self.chunks))
+        columns = {column: self._buffers[column][:self._rows] for column in COLUMNS}
+        if self.compress:
+            np.savez_compressed(os.path.join(self.path, name + ".npz"), **columns)
+        else:
+            for column, values in columns.items():
+                np.save(os.path.join(self.path, "{}_{}.npy".format(name, column)), values)
+        self.chunks.append({"name": name, "rows": self._rows})
+        self._rows = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "obs_shape": list(self.obs_shape),
+            "action_shape": list(self.action_shape),
+            "action_dtype": np.dtype(self._buffers["action"].dtype).name,
+            "compress": self.compress,
+            "chunks": self.chunks,
+        }
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    def close(self):
+        self.flush()
+        if not self.chunks:
+            self._write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TransitionLog:
+    """
+    Read side of a TransitionWriter log, without loading it into RAM.
+
+    Uncompressed chunks are memory-mapped; compressed ones are
+    decompressed on demand, the last ``cache_chunks`` being kept.
+    sample() draws transitions uniformly over the whole log.
+    """
+    def __init__(self, path, cache_chunks=4):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.obs_shape = tuple(self.meta["obs_shape"])
+        self.action_shape = tuple(self.meta["action_shape"])
+        self.compress = self.meta["compress"]
+        rows = [chunk["rows"] for chunk in self.meta["chunks"]]
+        # Global index of the first transition of each chunk, and the total at the end
+        self.offsets = np.concatenate([[0], np.cumsum(rows)]).astype(np.int64)
+        self.cache_chunks = cache_chunks
+        self._cache = collections.OrderedDict()
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def chunk(self, i):
+        """The columns of chunk ``i`` as a {column: array} dict."""
+        columns = self._cache.get(i)
+        if columns is not None:
+            self._cache.move_to_end(i)
+            return columns
+        name = self.meta["chunks"][i]["name"]
+        if self.compress:
+            with np.load(os.path.join(self.path, name + ".npz")) as arrays:
+                columns = {column: arrays[column] for column in COLUMNS}
+        else:
+            columns = {column: np.load(os.path.join(self.path, "{}_{}.npy".format(name, column)), mmap_mode="r")
+                       for column in COLUMNS}
+        self._cache[i] = columns
+        if len(self._cache) > max(self.cache_chunks, 1):
+            self._cache.popitem(last=False)
+        return columns
+
+    def __iter__(self):
+        """Chunks one after the other, for a pass over the whole log."""
+        for i in range(len(self.meta["chunks"])):
+            yield self.chunk(i)
+
+    def get(self, indices):
+        """Transitions at global ``indices`` as a {column: array} dict, in the order given."""
+        indices = np.asarray(indices, dtype=np.int64)
+        chunk_ids = np.searchsorted(self.offsets, indices, side="right") - 1
+        first = self.chunk(int(chunk_ids[0])) if len(indices) else self.chunk(0)
+        batch = {column: np.empty((len(indices),) + values.shape[1:], dtype=values.dtype)
+                 for column, values in first.items()}
+        for chunk_id in np.unique(chunk_ids):
+            mask = chunk_ids == chunk_id
+            rows = indices[mask] - self.offsets[chunk_id]
+            # Sorted rows read the mapped files front to back
+            order = np.argsort(rows)
+            columns = self.chunk(int(chunk_id))
+            positions = np.flatnonzero(mask)[order]
+            for column, values in columns.items():
+                batch[column][positions] = values[rows[order]]
+        return batch
+
+    def sample(self, batch_size, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        return self.get(rng.integers(0, len(self), batch_size))
+
+
+class QuotingPolicy:
+    """
+    Makes a price-quoting agent (SimpleAgent, ASAgent) act in any env, e.g.
+    as the behaviour policy of a DQNEnv recording: its (bid, ask) quotes
+    are turned into the env's closest action by env.quote_action.
+    """
+    def __init__(self, agent, env):
+        self.agent = agent
+        self.env = env
+
+    def take_action(self, observation):
+        bid_price, ask_price = self.agent.take_action(observation)
+        return self.env.quote_action(bid_price, ask_price)
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+
+SAMPLING_MODES = ("uniform", "stratified", "volatility")
+
+
+def rolling_avg_path(midpoints, warmup_t=5, alpha=0.001):
+    """
+    rolling_avg of a BaseEnv stepped from the first row of the tape, at
+    every row: the midpoint over the warm-up rows, then its EMA of rate
+    ``alpha``. One O(N) pass, after which any start row is O(1).
+    """
+    midpoints = np.asarray(midpoints, dtype=np.float64)
+    path = midpoints.copy()
+    first = min(max(warmup_t - 1, 0), len(midpoints) - 1)
+    path[first:] = pd.Series(midpoints[first:]).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return path
+
+
+def forward_volatility(midpoints, length):
+    """Std of the log returns over the ``length`` steps following each start row (NaN past the last start)."""
+    returns = np.diff(np.log(np.asarray(midpoints, dtype=np.float64)))
+    sums = np.concatenate([[0.0], np.cumsum(returns)])
+    squares = np.concatenate([[0.0], np.cumsum(returns * returns)])
+    volatility = np.full(len(midpoints), np.nan)
+    starts = len(returns) - length + 1
+    if starts > 0:
+        mean = (sums[length:] - sums[:starts]) / length
+        variance = (squares[length:] - squares[:starts]) / length - mean * mean
+        volatility[:starts] = np.sqrt(np.maximum(variance, 0.0))
+    return volatility
+
+
+class EpisodeSampler:
+    """
+    Random-start, fixed-length episodes for a BaseEnv (``episode_sampler=``).
+
+    Every reset starts the episode at a row drawn from the env's np_random
+    and ends it ``length`` steps later, as a truncation. The start is drawn
+    uniformly over the tape ("uniform"), from each of ``strata`` equal
+    slices of it in turn, in a shuffled order per pass ("stratified"), or
+    from each of ``regimes`` volatility regimes in turn ("volatility"):
+    the start rows on a grid of ``stride`` are split into quantiles of the
+    realized volatility of the episode they would start, unless
+    ``regime_starts`` gives the start rows of each regime directly.
+
+    bind() precomputes the rolling_avg path of the whole tape once, so a
+    reset sets the env's state in O(1) whatever its start row.
+    """
+    def __init__(self, length, mode="uniform", strata=10, regimes=3, stride=None, regime_starts=None):
+        if mode not in SAMPLING_MODES:
+            raise ValueError("unknown episode sampling mode {!r}, expected one of {}".format(mode, SAMPLING_MODES))
+        if length < 1:
+            raise ValueError("episodes need at least one step")
+        self.length = int(length)
+        self.mode = mode
+        self.strata = strata
+        self.regimes = regimes
+        self.stride = stride
+        self.regime_starts = regime_starts
+        self.rolling_avg = None
+        self._order = []
+
+    def bind(self, env):
+        if env._stream is not None:
+            raise ValueError("sampling episode starts needs random access to the tape, not a LOBStream")
+        self.last_start = len(env.midpoints) - 1 - self.length
+        if self.last_start < 0:
+            raise ValueError("episodes of {} steps do not fit in a tape of {} rows".format(self.length, len(env.midpoints)))
+        self.rolling_avg = rolling_avg_path(env.midpoints, env._warmup_t)
+        if self.mode == "volatility":
+            if self.regime_starts is None:
+                self.regime_starts = self._volatility_regimes(env.midpoints)
+            self.regime_starts = [np.asarray(starts, dtype=np.int64) for starts in self.regime_starts]
+            if any(len(starts) == 0 for starts in self.regime_starts):
+                raise ValueError("every volatility regime needs at least one start row")
+            if any(((starts < 0) | (starts > self.last_start)).any() for starts in self.regime_starts):
+                raise ValueError("regime start rows must leave room for a whole episode")
+        self.restart()
+        return self
+
+    def _volatility_regimes(self, midpoints):
+        stride = self.stride or max(self.length // 10, 1)
+        starts = np.arange(0, self.last_start + 1, stride)
+        volatility = forward_volatility(midpoints, self.length)[starts]
+        edges = np.quantile(volatility, np.linspace(0, 1, self.regimes + 1)[1:-1])
+        regime = np.searchsorted(edges, volatility, side="right")
+        return [starts[regime == r] for r in range(self.regimes)]
+
+    def restart(self):
+        """Forgets the current pass over the strata or regimes, e.g. when the env is reseeded."""
+        self._order = []
+
+    def _next_group(self, rng, n_groups):
+        if not self._order:
+            self._order = list(rng.permutation(n_groups))
+        return self._order.pop()
+
+    def sample(self, rng):
+        """Start row of the next episode."""
+        if self.mode == "uniform":
+            return int(rng.integers(0, self.last_start + 1))
+        if self.mode == "stratified":
+            edges = np.linspace(0, self.last_start + 1, self.strata + 1).astype(np.int64)
+            stratum = self._next_group(rng, self.strata)
+            return int(rng.integers(edges[stratum], max(edges[stratum + 1], edges[stratum] + 1)))
+        starts = self.regime_starts[self._next_group(rng, len(self.regime_starts))]
+        return int(starts[rng.integers(0, len(starts))])
@@ -16,5 +16,12 @@ class SimpleEnv(BaseEnv):
         
     def get_bid_ask_prices(self, action):
         bid_price, ask_price = action
-        return bid_price, ask_price, False
-  
\ No newline at end of file
+        # Plain floats keep cash in float64 whatever dtype the agent quotes in
+        return float(bid_price), float(ask_price), False
+
+    def get_bid_ask_prices_batch(self, actions, t, rolling_avg, inventory, episode=None):
+        actions = np.asarray(actions, dtype=np.float64)
+        return actions[:, 0], actions[:, 1], np.zeros(len(t), dtype=bool)
+
+    def quote_action(self, bid_price, ask_price):
+        return np.array([bid_price, ask_price], dtype=np.float32)
@@ -0,0 +1,222 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from env.lob_store import LOBStore, LOBStoreWriter
+
+
+DEPTH_KINDS = ("notional", "cancel_notional", "limit_notional", "market_notional")
+
+# Largest phi ** -block an AR(1) block solved in closed form may reach
+_AR1_MAX_SCALE = 1e150
+
+
+def _ar1(innovations, phi, start):
+    """x_t = phi * x_{t-1} + innovations_t from x_{-1} = start, by blocks of closed-form sums."""
+    if phi == 0:
+        return np.array(innovations, dtype=np.float64)
+    out = np.empty(len(innovations))
+    block_rows = int(min(max(np.log(_AR1_MAX_SCALE) / -np.log(abs(phi)), 1), 4096)) if abs(phi) < 1 else 4096
+    powers = phi ** np.arange(1, block_rows + 1)
+    for first in range(0, len(innovations), block_rows):
+        block = innovations[first:first + block_rows]
+        p = powers[:len(block)]
+        # x_t = phi^(t+1) * start + sum_s phi^(t-s) * e_s
+        out[first:first + len(block)] = p * (start + np.cumsum(block / p))
+        start = out[first + len(block) - 1]
+    return out
+
+
+class SyntheticLOB:
+    """
+    Seeded synthetic LOB tapes in the column layout of the Kaggle 1-second
+    files, generated in vectorized chunks of any total length.
+
+    - midpoint: geometric random walk with stochastic volatility, the log
+      of the per-step volatility following an AR(1) around log(volatility)
+      with persistence ``vol_persistence`` and stationary std ``vol_of_vol``.
+    - spread: relative spread set by a Markov regime (``spread_regimes``
+      means, left with probability ``regime_switch`` per step), with
+      lognormal noise of std ``spread_noise``.
+    - buys / sells: notional of Hawkes order flow with an exponential
+      kernel (``flow_rate`` background events per step, ``flow_branching``
+      children per event after ``flow_decay`` steps on average), simulated
+      exactly through its cluster representation, generation by generation.
+    - with ``depth`` > 0, the {bids,asks}_{distance,notional,cancel_notional,
+      limit_notional,market_notional}_<level> columns QueueFill and the
+      depth features read, level 0 sitting at the best price.
+
+    A given seed and chunk_rows always give the same tape.
+    """
+    def __init__(self, start_price=50_000.0, volatility=1e-4, vol_of_vol=0.3, vol_persistence=0.999,
+                 spread_regimes=(2e-5, 6e-5), regime_switch=1e-3, spread_noise=0.3,
+                 flow_rate=0.5, flow_branching=0.6, flow_decay=5.0, trade_notional=1e4,
+                 depth=0, level_notional=5e4, start_time="2021-04-07", freq="1s", seed=0):
+        if not 0 <= flow_branching < 1:
+            raise ValueError("flow_branching must be in [0, 1) for the order flow to stay stationary")
+        self.start_price = start_price
+        self.volatility = volatility
+        self.vol_of_vol = vol_of_vol
+        self.vol_persistence = vol_persistence
+        self.spread_regimes = np.asarray(spread_regimes, dtype=np.float64)
+        self.regime_switch = regime_switch
+        self.spread_noise = spread_noise
+        self.flow_rate = flow_rate
+        self.flow_branching = flow_branching
+        self.flow_decay = flow_decay
+        self.trade_notional = trade_notional
+        self.depth = depth
+        self.level_notional = level_notional
+        self.start_time = pd.Timestamp(start_time)
+        self.freq = pd.Timedelta(freq)
+        self.seed = seed
+
+    @classmethod
+    def from_market_stats(cls, stats, **kwargs):
+        """
+        Generator calibrated on one asset's compute_market_stats result:
+        start price, return volatility and excess kurtosis (through the
+        volatility of volatility) and mean relative spread.
+        """
+        excess_kurtosis = max(stats["returns"]["kurtosis"], 0.0)
+        # Returns e^h * eps with h ~ N(m, s^2) have kurtosis 3 * e^(4 s^2)
+        vol_of_vol = np.sqrt(np.log1p(excess_kurtosis / 3) / 4)
+        relative_spread = stats["spread"]["relative_mean"]
+        params = {
+            "start_price": stats["price"]["mean"],
+            "volatility": stats["returns"]["std"],
+            "vol_of_vol": vol_of_vol,
+            "spread_regimes": (relative_spread * 2 / 3, relative_spread * 4 / 3),
+        }
+        params.update(kwargs)
+        return cls(**params)
+
+    def columns(self):
+        columns = ["system_time", "midpoint", "spread", "buys", "sells"]
+        for side in ("bids", "asks"):
+            columns += [f"{side}_distance_{level}" for level in range(self.depth)]
+            for kind in DEPTH_KINDS:
+                columns += [f"{side}_{kind}_{level}" for level in range(self.depth)]
+        return columns
+
+    def _log_vol_params(self):
+        phi = self.vol_persistence
+        # Mean of the log-vol so that E[r^2] = volatility^2 at stationarity
+        mean = np.log(self.volatility) - self.vol_of_vol ** 2
+        return phi, mean, self.vol_of_vol * np.sqrt(1 - phi ** 2)
+
+    def _regimes(self, rng, rows, regime):
+        """Regime of each row, moving to another regime at the jumps of a Bernoulli process."""
+        n_regimes = len(self.spread_regimes)
+        if n_regimes == 1:
+            return np.zeros(rows, dtype=np.int64), regime
+        switches = np.flatnonzero(rng.random(rows) < self.regime_switch)
+        # Regime of each segment between switches, each switch to one of the other regimes
+        segments = (regime + np.concatenate([[0], np.cumsum(rng.integers(1, n_regimes, len(switches)))])) % n_regimes
+        lengths = np.diff(np.concatenate([[0], switches, [rows]]))
+        return np.repeat(segments, lengths), int(segments[-1])
+
+    def _flow(self, rng, rows, pending):
+        """
+        Events per row of one side's Hawkes flow over rows [0, rows).
+        ``pending`` holds the events of earlier clusters that fall in or
+        after this chunk (times relative to its start), their offspring
+        already drawn. Returns the counts and the events left for the next
+        chunks.
+        """
+        immigrants = rng.poisson(self.flow_rate, rows)
+        generation = np.repeat(np.arange(rows, dtype=np.float64), immigrants) + rng.random(immigrants.sum())
+        events = [pending, generation]
+        while len(generation):
+            children = rng.poisson(self.flow_branching, len(generation))
+            generation = np.repeat(generation, children) + rng.exponential(self.flow_decay, children.sum())
+            events.append(generation)
+        times = np.concatenate(events)
+        counts = np.bincount(times[times < rows].astype(np.int64), minlength=rows)
+        return counts, times[times >= rows] - rows
+
+    def chunks(self, rows, chunk_rows=1_000_000):
+        """Yields DataFrames of at most ``chunk_rows`` rows until ``rows`` rows are produced."""
+        rng = np.random.default_rng(self.seed)
+        phi, vol_mean, vol_innovation = self._log_vol_params()
+        log_vol = vol_mean
+        log_price = np.log(self.start_price)
+        regime = 0
+        pending = {"buys": np.empty(0), "sells": np.empty(0)}
+        for start in range(0, rows, chunk_rows):
+            n = min(chunk_rows, rows - start)
+            log_vols = vol_mean + _ar1(vol_innovation * rng.standard_normal(n), phi, log_vol - vol_mean)
+            log_vol = log_vols[-1]
+            log_prices = log_price + np.cumsum(np.exp(log_vols) * rng.standard_normal(n))
+            log_price = log_prices[-1]
+            midpoint = np.exp(log_prices)
+
+            regimes, regime = self._regimes(rng, n, regime)
+            relative_spread = self.spread_regimes[regimes] * np.exp(
+                self.spread_noise * rng.standard_normal(n) - self.spread_noise ** 2 / 2)
+
+            frame = {
+                "system_time": self.start_time + self.freq * np.arange(start, start + n),
+                "midpoint": midpoint,
+                "spread": midpoint * relative_spread,
+            }
+            for side in ("buys", "sells"):
+                counts, pending[side] = self._flow(rng, n, pending[side])
+                frame[side] = counts * self.trade_notional * rng.lognormal(-0.125, 0.5, n)
+            if self.depth:
+                frame.update(self._depth_columns(rng, n, relative_spread, frame["buys"], frame["sells"]))
+            yield pd.DataFrame(frame, columns=self.columns())
+
+    def _depth_columns(self, rng, rows, relative_spread, buys, sells):
+        columns = {}
+        levels = np.arange(self.depth)
+        # Level gaps of about a tenth of the spread, each level deeper than the last
+        gaps = relative_spread[:, None] * 0.1 * (0.5 + rng.random((rows, self.depth)))
+        gaps[:, 0] = relative_spread / 2
+        for side, sign, hits in (("bids", -1, sells), ("asks", 1, buys)):
+            distance = sign * np.cumsum(gaps, axis=1)
+            notional = rng.exponential(self.level_notional * (1 + levels / 2), (rows, self.depth))
+            market = np.zeros((rows, self.depth))
+            market[:, 0] = np.minimum(hits, notional[:, 0])
+            values = {
+                "distance": distance,
+                "notional": notional,
+                "cancel_notional": notional * rng.random((rows, self.depth)) * 0.2,
+                "limit_notional": rng.exponential(self.level_notional * 0.1, (rows, self.depth)),
+                "market_notional": market,
+            }
+            for kind in ("distance",) + DEPTH_KINDS:
+                for level in levels:
+                    columns[f"{side}_{kind}_{level}"] = values[kind][:, level]
+        return columns
+
+    def to_frame(self, rows, chunk_rows=1_000_000):
+        return pd.concat(self.chunks(rows, chunk_rows), ignore_index=True)
+
+    def to_store(self, path, rows, chunk_rows=1_000_000):
+        """Writes ``rows`` rows chunk by chunk into a LOBStore at ``path``, never holding more than a chunk."""
+        with LOBStoreWriter(path) as writer:
+            for chunk in self.chunks(rows, chunk_rows):
+                writer.append(chunk)
+        return LOBStore.open(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic LOB tape as a LOB store.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--depth", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--calibrate", help="a LOB CSV whose market stats the tape should match")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        from utils.market_stats import compute_market_stats
+
+        stats = compute_market_stats({"data": pd.read_csv(args.calibrate, usecols=["midpoint", "spread"])})["data"]
+        generator = SyntheticLOB.from_market_stats(stats, depth=args.depth, seed=args.seed)
+    else:
+        generator = SyntheticLOB(depth=args.depth, seed=args.seed)
+    generator.to_store(args.path, args.rows, args.chunk_rows)
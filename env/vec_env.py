@@ -0,0 +1,165 @@
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from env.fill_models import BestPriceFill
+from env.models import TypeOfReward
+
+
+class BatchEnv(VecEnv):
+    """
+    Native SB3 VecEnv running ``n_envs`` independent BaseEnv episodes at once.
+
+    The wrapped ``env`` is only used as a template: its LOB arrays, action
+    decoder and trading parameters are shared, while cash, inventory,
+    rolling_avg and t are held as length-N arrays and advanced together in
+    one vectorized step. Each episode starts at its own offset into the
+    tape and is reset to that offset when it reaches the end, keeping its
+    rolling_avg as BaseEnv.reset does, or, when ``env`` has an
+    episode_sampler, runs for its length from a start row the sampler
+    draws anew at every reset.
+    """
+    state_attributes = ("t", "cash", "inventory", "rolling_avg", "prev_valuation")
+
+    def __init__(self, env, n_envs=1, start_offsets=None):
+        if env._stream is not None:
+            raise ValueError("BatchEnv needs the whole tape in memory or in a LOBStore, not a LOBStream")
+        if type(env.fill_model) is not BestPriceFill:
+            raise ValueError("BatchEnv only implements the BestPriceFill fill model")
+        self.env = env
+        super().__init__(n_envs, env.observation_space, env.action_space)
+
+        if start_offsets is None:
+            # Spread the episodes evenly over the tape
+            start_offsets = np.arange(n_envs) * (env._last_t // n_envs)
+        self.start_offsets = np.asarray(start_offsets, dtype=np.int64)
+        if self.start_offsets.shape != (n_envs,):
+            raise ValueError("start_offsets must hold one offset per environment")
+        if (self.start_offsets < 0).any() or (self.start_offsets >= env._last_t).any():
+            raise ValueError("start_offsets must lie within the LOB data")
+
+        self.sampler = env.episode_sampler
+        self._rng = np.random.default_rng()
+        # Rows at which each episode starts and ends
+        self.episode_start = self.start_offsets.copy()
+        self.last_t = np.full(n_envs, len(env.midpoints) - 1, dtype=np.int64)
+
+        self.t = self.start_offsets.copy()
+        self.cash = np.full(n_envs, float(env.initial_cash))
+        self.inventory = np.full(n_envs, float(env.initial_inventory))
+        self.rolling_avg = env.midpoints[self.t].copy()
+        self.prev_valuation = self.cash + self.inventory * env.midpoints[self.t]
+        self._actions = None
+        if self.sampler is not None:
+            self._reset_episodes(np.ones(n_envs, dtype=bool))
+
+    def _reset_episodes(self, mask):
+        if self.sampler is None:
+            # Like BaseEnv.reset, rolling_avg carries over from the previous episode
+            self.t[mask] = self.start_offsets[mask]
+        else:
+            starts = np.array([self.sampler.sample(self._rng) for _ in range(mask.sum())], dtype=np.int64)
+            self.t[mask] = starts
+            self.episode_start[mask] = starts
+            self.last_t[mask] = starts + self.sampler.length
+            self.rolling_avg[mask] = self.sampler.rolling_avg[starts]
+        self.cash[mask] = float(self.env.initial_cash)
+        self.inventory[mask] = float(self.env.initial_inventory)
+        self.prev_valuation[mask] = self.cash[mask] + self.inventory[mask] * self.env.midpoints[self.t[mask]]
+
+    def _get_obs(self):
+        obs = np.empty((self.num_envs, self.observation_space.shape[0]), dtype=np.float32)
+        return self.env._fill_obs(obs, self.t, self.rolling_avg)
+
+    def reset(self):
+        seeds = getattr(self, "_seeds", None)
+        if self.sampler is not None and seeds and seeds[0] is not None:
+            self._rng = np.random.default_rng(seeds[0])
+            self.sampler.restart()
+        self._reset_episodes(np.ones(self.num_envs, dtype=bool))
+        if hasattr(self, "_reset_seeds"):
+            self._reset_seeds()
+            self._reset_options()
+        return self._get_obs()
+
+    def step_async(self, actions):
+        self._actions = actions
+
+    def step_wait(self):
+        env = self.env
+        volume = env.trade_volume
+
+        episode = (self.t - self.episode_start, self.last_t - self.episode_start)
+        bid_price, ask_price, invalid = env.get_bid_ask_prices_batch(self._actions, self.t, self.rolling_avg, self.inventory,
+                                                                     episode)
+
+        self.t += 1
+        next_midpoint = env.midpoints[self.t]
+        next_spread = env.spreads[self.t]
+        next_best_bid = next_midpoint - next_spread / 2
+        next_best_ask = next_midpoint + next_spread / 2
+
+        warmup = self.t < 5
+        self.rolling_avg[warmup] = next_midpoint[warmup]
+
+        # Determine which buys happened
+        can_buy = (bid_price > next_best_bid) & (self.cash >= bid_price * volume) & ~invalid
+        self.cash -= np.where(can_buy, bid_price * volume, 0.0)
+        self.inventory += np.where(can_buy, volume, 0)
+        bought = np.where(can_buy, (bid_price - self.rolling_avg) * volume, 0.0)
+
+        # Determine which sells happened
+        can_sell = (ask_price < next_best_ask) & (self.inventory >= volume) & ~invalid
+        self.cash += np.where(can_sell, ask_price * volume, 0.0)
+        self.inventory -= np.where(can_sell, volume, 0)
+        sold = np.where(can_sell, (ask_price - self.rolling_avg) * volume, 0.0)
+
+        self.rolling_avg += 0.001 * (next_midpoint - self.rolling_avg)
+
+        if env.reward_type == TypeOfReward.REWARD_1:
+            trading_rew = 5 * (sold != 0) + 5 * (bought != 0)
+            rewards = sold + bought + trading_rew
+        else:
+            new_valuation = self.cash + self.inventory * next_midpoint
+            inv_penalty = np.where(
+                self.inventory > 150, -env.inventory_penalty * (self.inventory - 150) ** 2, 0.0
+            )
+            rewards = new_valuation - self.prev_valuation + inv_penalty
+            self.prev_valuation = new_valuation
+
+        dones = self.t >= self.last_t
+        obs = self._get_obs()
+        infos = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = obs[i].copy()
+                # Sampled episodes end on their time limit, so SB3 bootstraps their last value
+                infos[i]["TimeLimit.truncated"] = self.sampler is not None
+            self._reset_episodes(dones)
+            obs[dones] = self._get_obs()[dones]
+
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        indices = self._get_indices(indices)
+        if attr_name in self.state_attributes:
+            values = getattr(self, attr_name)
+            return [values[i] for i in indices]
+        return [getattr(self.env, attr_name) for _ in indices]
+
+    def set_attr(self, attr_name, value, indices=None):
+        indices = list(self._get_indices(indices))
+        if attr_name in self.state_attributes:
+            getattr(self, attr_name)[indices] = value
+        else:
+            setattr(self.env, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # Episodes share one template env, so the method is called once per index on it
+        method = getattr(self.env, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,15 @@
+import pytest
+
+from env.synthetic import SyntheticLOB
+
+
+@pytest.fixture(scope="session")
+def tape():
+    """Short synthetic LOB tape in the Kaggle column layout."""
+    return SyntheticLOB(seed=0).to_frame(3000)
+
+
+@pytest.fixture(scope="session")
+def depth_tape():
+    """Synthetic tape with the depth and order-flow columns QueueFill and the depth features read."""
+    return SyntheticLOB(depth=3, seed=1).to_frame(2000)
@@ -0,0 +1,70 @@
+import asyncio
+
+import numpy as np
+
+from agent.AS_agent import ASAgent
+from env.as_env import ASParamEnv
+from env.avellaneda_stoikov import avellaneda_stoikov_quotes, time_to_horizon
+from env.live import LiveSession, replay_feed
+from env.lob_store import LOBStore
+from env.lob_stream import LOBStream
+from env.sampling import EpisodeSampler
+from env.simple_env import SimpleEnv
+from env.vec_env import BatchEnv
+
+
+def _expected_quotes(env, action, t, inventory, elapsed, length):
+    gamma, kappa = env.as_parameters(action)
+    return avellaneda_stoikov_quotes(env.midpoints[t], inventory, gamma, kappa, env._variance[t],
+                                     time_to_horizon(elapsed, length))
+
+
+def test_sampled_episode_starts_with_the_whole_horizon(tape):
+    env = ASParamEnv(tape, episode_sampler=EpisodeSampler(1000))
+    env.reset(seed=3)
+    assert env.t > 0
+    assert env.episode_time() == 0
+    assert env.episode_length() == 1000
+
+    action = np.array([0.2, -0.4])
+    bid, ask, _ = env.get_bid_ask_prices(action)
+    expected_bid, expected_ask = _expected_quotes(env, action, env.t, env.inventory, 0, 1000)
+    assert np.isclose(bid, expected_bid) and np.isclose(ask, expected_ask)
+
+
+def test_batch_env_quotes_each_episode_on_its_own_horizon(tape):
+    env = ASParamEnv(tape, episode_sampler=EpisodeSampler(500))
+    batch = BatchEnv(env, n_envs=4)
+    batch.seed(0)
+    batch.reset()
+    actions = np.random.default_rng(0).uniform(-1, 1, (4, 2))
+    for _ in range(37):
+        batch.step(actions)
+
+    elapsed = batch.t - batch.episode_start
+    assert (elapsed == 37).all()
+    bid, ask, _ = env.get_bid_ask_prices_batch(actions, batch.t, batch.rolling_avg, batch.inventory,
+                                               (elapsed, batch.last_t - batch.episode_start))
+    expected_bid, expected_ask = _expected_quotes(env, actions, batch.t, batch.inventory, 37, 500)
+    np.testing.assert_allclose(bid, expected_bid)
+    np.testing.assert_allclose(ask, expected_ask)
+
+
+def test_agent_horizon_follows_the_episode_of_a_stream(tape, tmp_path):
+    store = LOBStore.from_frame(tape, str(tmp_path / "store"))
+    env = SimpleEnv(LOBStream(store, chunk_size=100))
+    agent = ASAgent(env, sigma=1.0, T=1000)
+    obs, _ = env.reset()
+    for _ in range(250):
+        obs, *_ = env.step(agent.take_action(obs))
+    assert env.episode_time() == 250
+
+    risk, _ = agent.quote_terms(env.t, env.episode_time())
+    assert np.isclose(risk, agent.gamma * time_to_horizon(250, 1000))
+
+
+def test_live_session_counts_the_ticks_of_the_feed(tape):
+    env = SimpleEnv(tape.iloc[:50])
+    agent = ASAgent(env, sigma=1.0, T=10_000)
+    asyncio.run(LiveSession(env, agent).run(replay_feed(tape), max_ticks=300))
+    assert env.episode_time() == 299
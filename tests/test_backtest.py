@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from agent.AS_agent import ASAgent
+from agent.simple_agent import SimpleAgent
+from env.as_env import ASEnv
+from env.models import TypeOfReward
+from env.simple_env import SimpleEnv
+from utils.backtest import backtest
+from utils.functions import test_agent as run_agent
+from utils.metrics import TRACE_KEYS
+
+
+def _agents(env_cls, env):
+    if env_cls is SimpleEnv:
+        return [SimpleAgent(env, bid, ask) for bid, ask in ((0.5, 0.5), (0.1, 0.9), (1.0, 0.2))]
+    return [ASAgent(env, gamma=gamma, kappa=kappa) for gamma, kappa in ((0.1, 1.5), (0.01, 0.5), (1.0, 5.0))]
+
+
+@pytest.mark.parametrize("env_cls", [SimpleEnv, ASEnv])
+@pytest.mark.parametrize("reward_type", list(TypeOfReward))
+def test_backtest_replays_test_agent(tape, env_cls, reward_type):
+    # 700 steps over a 300-row tape, so that both cross two resets
+    frame = tape.iloc[:300]
+    steps = 700
+    env = env_cls(frame, initial_cash=200_000, initial_inventory=2, reward_type=reward_type)
+    agents = _agents(env_cls, env)
+    traces = backtest(env, agents, steps=steps)
+    metrics = backtest(env, agents, steps=steps, record=False)
+    for i, agent in enumerate(agents):
+        env = env_cls(frame, initial_cash=200_000, initial_inventory=2, reward_type=reward_type)
+        agent.env = env
+        expected = run_agent(env, agent, steps=steps)
+        assert expected["metrics"]["trades"] > 0
+        for key in TRACE_KEYS:
+            values = traces[key] if traces[key].ndim == 1 else traces[key][:, i]
+            np.testing.assert_allclose(values, expected[key], rtol=1e-9, err_msg=key)
+        for key, value in expected["metrics"].items():
+            np.testing.assert_allclose(metrics[key][i], value, rtol=1e-9, err_msg=key)
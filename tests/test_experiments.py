@@ -0,0 +1,23 @@
+import pandas as pd
+
+from utils.experiments import make_agent, run_experiments
+
+
+def test_rerunning_the_grid_replaces_its_rows(tmp_path, tape):
+    tape.to_csv(tmp_path / "SYN_1sec.csv", index=False)
+    config = {"data_path": str(tmp_path), "assets": ["SYN"], "timesteps": 200, "initial_cash": 100_000,
+              "initial_inventory": 0, "trade_volume": 1, "inventory_penalty": 0.001,
+              "reward_types": ["REWARD_1"], "agents": ["Simple", "A-S"], "seeds": [0, 1], "train_timesteps": 0}
+    for _ in range(2):
+        _, failures = run_experiments(config, output_dir=tmp_path / "results", max_workers=2)
+        assert not failures
+    rows = pd.read_csv(tmp_path / "results" / "performance_metrics_reward1.csv")
+    assert len(rows) == 4
+    assert not rows.duplicated(["Agent", "Seed"]).any()
+
+
+def test_rl_agents_train_for_the_configured_timesteps(tape):
+    from env.dqn_env import DQNEnv
+
+    agent = make_agent("DQN", DQNEnv(tape), seed=0, train_timesteps=64)
+    assert agent.model.num_timesteps == 64
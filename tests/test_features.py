@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from env.features import DEFAULT_FEATURES, FeaturePipeline
+
+# Short windows so that the 2000-row tape runs through many of them, and the rolling sums re-sum
+SHORT_FEATURES = [
+    {"name": "ema", "column": "midpoint", "span": 20},
+    {"name": "ema", "column": "spread", "span": 5},
+    {"name": "volatility", "window": 30},
+    {"name": "relative_spread", "window": 25},
+    {"name": "flow_imbalance", "window": 10},
+    {"name": "depth_imbalance", "levels": 3},
+    {"name": "returns", "horizons": [1, 7, 50]},
+]
+
+
+def _online(pipeline, frame):
+    columns = [col for col in frame.columns if col != "system_time"]
+    online = pipeline.online(columns)
+    rows = frame[columns].to_numpy(dtype=np.float64)
+    return np.array([online.update(row).copy() for row in rows]), online.names
+
+
+@pytest.mark.parametrize("features", [SHORT_FEATURES, DEFAULT_FEATURES + [{"name": "depth_imbalance", "levels": 3}]])
+def test_online_features_equal_the_batch_transform(depth_tape, features):
+    pipeline = FeaturePipeline(features)
+    expected, names = pipeline.transform(depth_tape)
+    actual, online_names = _online(pipeline, depth_tape)
+    assert online_names == names
+    # The warm-up rows (0 in both) included
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-7)
+
+
+def test_online_features_need_their_input_columns(tape):
+    with pytest.raises(ValueError, match="bids_notional_0"):
+        FeaturePipeline([{"name": "depth_imbalance", "levels": 3}]).online(["midpoint", "spread", "buys", "sells"])
+
+
+def test_cache_hits_only_on_the_same_data_and_config(depth_tape, tmp_path, monkeypatch):
+    calls = []
+    compute = FeaturePipeline.compute
+
+    def counting_compute(self, data):
+        calls.append(len(data))
+        return compute(self, data)
+    monkeypatch.setattr(FeaturePipeline, "compute", counting_compute)
+
+    cache_dir = str(tmp_path / "cache")
+    pipeline = FeaturePipeline(SHORT_FEATURES, cache_dir=cache_dir)
+    matrix, names = pipeline.transform(depth_tape)
+    assert len(calls) == 1 and len(os.listdir(cache_dir)) == 2
+
+    # Hit: the same columns and config, from another pipeline instance, are memory-mapped
+    cached, cached_names = FeaturePipeline(SHORT_FEATURES, cache_dir=cache_dir).transform(depth_tape.copy())
+    assert len(calls) == 1
+    assert isinstance(cached, np.memmap) and cached_names == names
+    np.testing.assert_array_equal(cached, matrix)
+    # Columns no feature reads are not part of the key
+    assert pipeline.cache_key(depth_tape.assign(bids_distance_0=0.0)) == pipeline.cache_key(depth_tape)
+
+    # Misses: a changed input value, a shorter tape, another config
+    changed = depth_tape.copy()
+    changed.loc[1000, "spread"] *= 2
+    pipeline.transform(changed)
+    pipeline.transform(depth_tape.iloc[:1500])
+    FeaturePipeline(SHORT_FEATURES[:-1], cache_dir=cache_dir).transform(depth_tape)
+    assert calls == [2000, 2000, 1500, 2000]
+    assert len(os.listdir(cache_dir)) == 8
+    assert not [name for name in os.listdir(cache_dir) if name.endswith(".tmp")]
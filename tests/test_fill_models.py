@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from env.fill_models import QueueFill
+from env.simple_env import SimpleEnv
+
+MIDPOINT = 100.0
+BID, ASK = 99.9, 100.1
+
+
+def _book(rows, bid_market=(), bid_cancel=(), bid_queue=5.0, deep_market=()):
+    """
+    A flat two-level book around a 100 midpoint, the best bid at 99.9
+    holding ``bid_queue`` units. ``bid_market`` / ``bid_cancel`` are the
+    units traded / cancelled at the best bid on each row, ``deep_market``
+    those traded at the level below it.
+    """
+    def per_row(values):
+        return np.pad(np.asarray(values, dtype=np.float64), (0, rows - len(values)))
+
+    frame = {"midpoint": np.full(rows, MIDPOINT), "spread": np.full(rows, 0.2)}
+    for side, sign in (("bids", -1), ("asks", 1)):
+        for level in range(2):
+            distance = sign * 0.001 * (level + 1)
+            price = MIDPOINT * (1 + distance)
+            frame[f"{side}_distance_{level}"] = np.full(rows, distance)
+            frame[f"{side}_notional_{level}"] = np.full(rows, (bid_queue if side == "bids" else 5.0) * price)
+            market = np.zeros(rows)
+            cancel = np.zeros(rows)
+            if side == "bids":
+                market = per_row(bid_market if level == 0 else deep_market) * price
+                cancel = per_row(bid_cancel if level == 0 else ()) * price
+            frame[f"{side}_market_notional_{level}"] = market
+            frame[f"{side}_cancel_notional_{level}"] = cancel
+    return pd.DataFrame(frame)
+
+
+def _fills(env, rows, bid=BID, ask=ASK):
+    """Volumes bought at each row 1..rows - 1, quoting the same prices throughout."""
+    env.reset()
+    bought = []
+    for t in range(1, rows):
+        env.t = t
+        buy, sell = env.fill_model.fill(env, bid, ask, False)
+        assert sell == 0
+        bought.append(buy)
+    return bought
+
+
+def test_a_quote_fills_only_once_the_queue_ahead_has_traded():
+    # 5 units ahead, 3 traded per tick: nothing, then the 1 unit left after the queue, then the rest
+    env = SimpleEnv(_book(5, bid_market=[0, 3, 3, 3]), trade_volume=2, fill_model=QueueFill())
+    assert _fills(env, 5) == pytest.approx([0, 1, 1, 0])
+
+
+def test_a_partially_filled_quote_keeps_its_place_and_remaining_volume():
+    env = SimpleEnv(_book(4, bid_market=[0, 6, 10]), trade_volume=4, fill_model=QueueFill())
+    # 1 unit fills after the 5 ahead, then the 3 left out of the 10 traded next
+    assert _fills(env, 4) == pytest.approx([1, 3, 0])
+    # Renewed once fully filled, at the back of the queue again
+    assert env.fill_model._orders[0][1:] == pytest.approx([4, 5])
+
+
+def test_cancellations_shorten_the_queue_ahead_pro_rata():
+    # Half the level (ahead of the order) cancels: 2.5 units ahead are left before 3 trade
+    env = SimpleEnv(_book(3, bid_market=[0, 0, 3], bid_cancel=[0, 5]), trade_volume=1, fill_model=QueueFill())
+    bought = _fills(env, 3)
+    assert bought[0] == 0 and bought[1] == pytest.approx(0.5)
+
+
+def test_trading_through_the_price_fills_the_whole_quote():
+    env = SimpleEnv(_book(2, deep_market=[0, 1]), trade_volume=3, fill_model=QueueFill())
+    assert _fills(env, 2) == [3]
+
+
+def test_buys_are_capped_by_the_cash():
+    env = SimpleEnv(_book(2, deep_market=[0, 1]), trade_volume=3, initial_cash=BID * 0.5, fill_model=QueueFill())
+    assert _fills(env, 2) == [pytest.approx(0.5)]
+
+
+def test_reset_sends_the_quote_to_the_back_of_the_queue():
+    env = SimpleEnv(_book(3, bid_market=[0, 3, 3]), trade_volume=2, fill_model=QueueFill())
+    env.reset()
+    env.t = 1
+    env.fill_model.fill(env, BID, ASK, False)
+    assert env.fill_model._orders[0][2] == pytest.approx(2)
+    env.fill_model.reset()
+    assert env.fill_model._orders == [[None, 0.0, 0.0], [None, 0.0, 0.0]]
+    # Rejoining behind the 5 units of the book: the next 3 traded do not reach it
+    env.t = 2
+    assert env.fill_model.fill(env, BID, ASK, False) == (0, 0)
+    # env.reset() does the same
+    env.reset()
+    assert env.fill_model._orders == [[None, 0.0, 0.0], [None, 0.0, 0.0]]
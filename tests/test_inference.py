@@ -0,0 +1,71 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from agent.dqn_agent import DQNAgent
+from agent.inference import NumpyPolicy, PolicyServer, run_local_clients
+from agent.ppo_agent import PPOAgent
+from env.as_env import ASParamEnv
+from env.dqn_env import DQNEnv
+from env.ppo_env import PPOEnv
+from env.sampling import EpisodeSampler
+
+
+def _observations(env, n=64):
+    env.reset()
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(env.midpoints) - 1, n)
+    out = np.empty((n, env.observation_space.shape[0]), dtype=np.float32)
+    return env._fill_obs(out, rows, env.midpoints[rows] * (1 + 1e-4 * rng.standard_normal(n)))
+
+
+@pytest.fixture(scope="module", params=["DQN", "PPO", "PPO-Box"])
+def agent(request, tape):
+    if request.param == "DQN":
+        return DQNAgent(DQNEnv(tape), seed=0, timesteps=0)
+    if request.param == "PPO":
+        return PPOAgent(PPOEnv(tape), seed=0, timesteps=0)
+    return PPOAgent(ASParamEnv(tape, episode_sampler=EpisodeSampler(500)), seed=0, timesteps=256)
+
+
+def test_numpy_policy_predicts_the_model_actions(agent):
+    observations = _observations(agent.env)
+    expected, _ = agent.model.predict(observations, deterministic=True)
+    policy = NumpyPolicy.from_agent(agent, deterministic=True)
+    actions = policy.predict(observations)
+    assert actions.shape == expected.shape
+    np.testing.assert_allclose(actions, expected, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(policy.predict(observations[0]), expected[0], rtol=1e-5, atol=1e-6)
+
+
+def test_saved_policy_predicts_the_same_actions(agent, tmp_path):
+    observations = _observations(agent.env)
+    policy = NumpyPolicy.from_agent(agent, deterministic=True)
+    policy.save(tmp_path / "policy.npz")
+    loaded = NumpyPolicy.load(tmp_path / "policy.npz")
+    np.testing.assert_array_equal(loaded.predict(observations), policy.predict(observations))
+
+
+def test_sampled_continuous_actions_stay_in_bounds(tape):
+    agent = PPOAgent(ASParamEnv(tape), seed=0, timesteps=0)
+    policy = NumpyPolicy.from_agent(agent, seed=0)
+    observations = _observations(agent.env, 512)
+    actions = policy.predict(observations)
+    space = agent.model.action_space
+    assert actions.shape == (512,) + space.shape
+    assert (actions >= space.low).all() and (actions <= space.high).all()
+    assert not np.allclose(actions, policy.predict(observations, deterministic=True))
+
+
+def test_policy_server_answers_every_client(agent):
+    policy = NumpyPolicy.from_agent(agent, deterministic=True)
+    observations = _observations(agent.env, 24).reshape(4, 6, -1)
+
+    async def serve():
+        async with PolicyServer(policy, max_batch_size=4) as server:
+            return await run_local_clients(server, observations), server.latency_stats()
+
+    actions, stats = asyncio.run(serve())
+    assert stats["requests"] == 24
+    np.testing.assert_array_equal(actions, policy.predict(observations.reshape(24, -1)).reshape(actions.shape))
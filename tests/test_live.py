@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import numpy as np
+
+from agent.simple_agent import SimpleAgent
+from env.features import FeaturePipeline
+from env.fill_models import QueueFill
+from env.live import LiveSession, replay_feed
+from env.simple_env import SimpleEnv
+
+
+FEATURES = [
+    {"name": "ema", "column": "midpoint", "span": 20},
+    {"name": "volatility", "window": 50},
+    {"name": "relative_spread", "window": 30},
+    {"name": "flow_imbalance", "window": 10},
+    {"name": "depth_imbalance", "levels": 3},
+    {"name": "returns", "horizons": [1, 5]},
+]
+
+
+def _columns(frame):
+    return [col for col in frame.columns if col != "system_time"]
+
+
+def test_online_features_match_the_precomputed_ones(depth_tape):
+    pipeline = FeaturePipeline(FEATURES)
+    expected, names = pipeline.compute(depth_tape)
+    online = pipeline.online(_columns(depth_tape))
+    assert online.names == names
+    rows = depth_tape[_columns(depth_tape)].to_numpy()
+    computed = np.array([online.update(row).copy() for row in rows])
+    np.testing.assert_allclose(computed, expected, rtol=1e-5, atol=1e-7)
+
+
+def test_lockstep_session_replays_the_offline_episode(depth_tape):
+    def make_env(data):
+        return SimpleEnv(data, initial_inventory=10, fill_model=QueueFill(), features=FeaturePipeline(FEATURES))
+
+    env = make_env(depth_tape)
+    agent = SimpleAgent(env, 0.3, 0.3)
+    obs, _ = env.reset()
+    for _ in range(len(depth_tape) - 1):
+        obs, *_ = env.step(agent.take_action(obs))
+
+    live_env = make_env(depth_tape.iloc[:50])
+    asyncio.run(LiveSession(live_env, SimpleAgent(live_env, 0.3, 0.3)).run(replay_feed(depth_tape)))
+    assert live_env.cash == env.cash and live_env.inventory == env.inventory
+    np.testing.assert_array_equal(live_env._get_obs(), obs)
+
+
+def test_coalesced_ticks_enter_the_features_once(depth_tape):
+    pipeline = FeaturePipeline(FEATURES)
+    expected, _ = pipeline.compute(depth_tape)
+    env = SimpleEnv(depth_tape.iloc[:50], features=pipeline)
+    session = LiveSession(env, SimpleAgent(env))
+    rows = depth_tape[_columns(depth_tape)].to_numpy()
+
+    session._advance(rows[0])
+    session._action = SimpleAgent(env).take_action(env._get_obs())
+    now = time.perf_counter()
+    arrival, row, fill_row = session._on_ticks([(now, rows[1]), (now, rows[2]), (now, rows[3])])
+    session._advance(row, fill_row)
+
+    n_columns = len(env.observation_columns)
+    np.testing.assert_allclose(env._get_obs()[n_columns:-1], expected[3], rtol=1e-5, atol=1e-7)
+    buys = env.observation_columns.index("buys")
+    assert env._obs_matrix[env.t, buys] == rows[1:4, buys].sum()
+    assert session.coalesced == 2
@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pytest
+
+from env.lob_store import LOBStore, LOBStoreWriter
+from env.lob_stream import LOBStream
+from env.simple_env import SimpleEnv
+
+
+def test_store_round_trips_a_frame(tape, tmp_path):
+    store = LOBStore.from_frame(tape, str(tmp_path / "store"))
+    assert len(store) == len(tape)
+    np.testing.assert_array_equal(store["midpoint"], tape["midpoint"].to_numpy())
+    assert (store.to_frame()["system_time"] == tape["system_time"]).all()
+
+
+def test_interrupted_writer_leaves_no_store(tape, tmp_path):
+    path = str(tmp_path / "store")
+    with pytest.raises(RuntimeError):
+        with LOBStoreWriter(path) as writer:
+            writer.append(tape.iloc[:2])
+            raise RuntimeError("conversion interrupted")
+    assert not os.path.exists(os.path.join(path, "meta.json"))
+    with pytest.raises(FileNotFoundError):
+        LOBStore.open(path)
+
+
+def test_rewriting_a_store_drops_its_old_meta(tape, tmp_path):
+    path = str(tmp_path / "store")
+    LOBStore.from_frame(tape, path)
+    with pytest.raises(RuntimeError):
+        with LOBStoreWriter(path) as writer:
+            writer.append(tape.iloc[:2])
+            raise RuntimeError("conversion interrupted")
+    assert not os.path.exists(os.path.join(path, "meta.json"))
+
+
+def _episode(env, steps):
+    obs, _ = env.reset()
+    rewards = []
+    for _ in range(steps):
+        midpoint, spread = obs[0], obs[1]
+        obs, reward, *_ = env.step(np.array([midpoint - spread / 3, midpoint + spread / 3], dtype=np.float32))
+        rewards.append(reward)
+    return np.array(rewards), env.cash, env.inventory
+
+
+def test_store_and_stream_replay_the_frame_episode(tape, tmp_path):
+    store = LOBStore.from_frame(tape, str(tmp_path / "store"))
+    steps = len(tape) - 1
+    expected = _episode(SimpleEnv(tape, initial_inventory=10), steps)
+    for data in (store, LOBStream(store, chunk_size=128)):
+        rewards, cash, inventory = _episode(SimpleEnv(data, initial_inventory=10), steps)
+        np.testing.assert_allclose(rewards, expected[0])
+        assert cash == expected[1] and inventory == expected[2]
+
+
+def _transitions(env):
+    """Full episode of fixed quotes, then one step past its end: every obs, reward and done."""
+    obs, _ = env.reset()
+    observations, rewards, dones = [obs], [], []
+    done = False
+    while not done:
+        midpoint, spread = obs[0], obs[1]
+        obs, reward, done, *_ = env.step(np.array([midpoint - spread / 3, midpoint + spread / 3], dtype=np.float32))
+        observations.append(obs)
+        rewards.append(reward)
+        dones.append(done)
+    # Stepping a finished episode leaves it where it is
+    obs, reward, done, *_ = env.step(np.array([obs[0] - 1, obs[0] + 1], dtype=np.float32))
+    observations.append(obs)
+    rewards.append(reward)
+    dones.append(done)
+    return np.array(observations), np.array(rewards), np.array(dones), env.cash, env.inventory
+
+
+# 200 rows: chunks that divide the tape exactly, leave a one-row last chunk, a partial one, or hold it all
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 100, 199, 200, 1000])
+@pytest.mark.parametrize("from_csv", [False, True])
+def test_stream_episode_equals_the_frame_episode(tape, tmp_path, chunk_size, from_csv):
+    frame = tape.iloc[:200].reset_index(drop=True)
+    if from_csv:
+        source = str(tmp_path / "tape.csv")
+        frame.to_csv(source, index=False)
+    else:
+        source = LOBStore.from_frame(frame, str(tmp_path / "store"))
+    frame_env = SimpleEnv(frame, initial_inventory=10)
+    env = SimpleEnv(LOBStream(source, chunk_size=chunk_size), initial_inventory=10)
+    # Twice, as reset restarts the stream from its first chunk (rolling_avg carries over on both)
+    for _ in range(2):
+        expected = _transitions(frame_env)
+        observations, rewards, dones, cash, inventory = _transitions(env)
+        assert len(rewards) == len(frame)
+        np.testing.assert_array_equal(observations, expected[0])
+        np.testing.assert_allclose(rewards, expected[1])
+        # The episode ends on the last row of the stream, not before
+        np.testing.assert_array_equal(dones, expected[2])
+        assert dones[-2] and not dones[:-2].any()
+        assert (cash, inventory) == expected[3:]
+        assert env.episode_time() == len(frame) - 1 == env.episode_length()
+
+
+def test_reset_mid_stream_restarts_from_the_first_row(tape, tmp_path):
+    store = LOBStore.from_frame(tape.iloc[:200], str(tmp_path / "store"))
+    env = SimpleEnv(LOBStream(store, chunk_size=16))
+    first, _ = env.reset()
+    for _ in range(50):
+        env.step(np.array([first[0] - 1, first[0] + 1], dtype=np.float32))
+    assert env.episode_time() == 50
+    obs, _ = env.reset()
+    # rolling_avg (the last column) carries over across resets
+    np.testing.assert_array_equal(obs[:-1], first[:-1])
+    assert env.episode_time() == 0
@@ -0,0 +1,68 @@
+import numpy as np
+
+from env.synthetic import SyntheticLOB
+from utils.market_stats import MarketStats, ValueCounter, compute_market_stats
+
+
+def test_streaming_stats_match_pandas(tape):
+    stats = compute_market_stats({"tape": tape}, chunk_size=700)["tape"]
+    returns = tape["midpoint"].pct_change().dropna()
+    assert stats["count"] == len(tape)
+    np.testing.assert_allclose(stats["returns"]["std"], returns.std())
+    np.testing.assert_allclose(stats["returns"]["skew"], returns.skew())
+    np.testing.assert_allclose(stats["returns"]["kurtosis"], returns.kurt())
+    np.testing.assert_allclose(stats["returns"]["autocorr"], returns.autocorr())
+    # Spreads are counted at 8 decimals, exact for tick-sized spreads
+    np.testing.assert_allclose(stats["spread"]["median"], tape["spread"].median(), atol=1e-8)
+
+
+def test_returns_outside_the_histogram_are_counted():
+    # Returns far wider than the default (-0.01, 0.01) range
+    tape = SyntheticLOB(volatility=0.02, seed=2).to_frame(5000)
+    returns = tape["midpoint"].pct_change().dropna().to_numpy()
+    result = compute_market_stats({"tape": tape}, chunk_size=1000)["tape"]["returns"]
+    counts, edges = result["hist"]
+    assert result["hist_underflow"] == np.count_nonzero(returns < edges[0]) > 0
+    assert result["hist_overflow"] == np.count_nonzero(returns > edges[-1]) > 0
+    assert counts.sum() + result["hist_underflow"] + result["hist_overflow"] == result["count"]
+
+
+def test_traces_stay_bounded_on_long_tapes():
+    stats = MarketStats(window=10, trace_points=500)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        midpoint = 100 * np.exp(np.cumsum(1e-4 * rng.standard_normal(5000)))
+        stats.update(midpoint, midpoint * 1e-4)
+    traces = stats.result()["traces"]
+    assert 500 <= len(traces["index"]) <= 1000
+    # Still the points on a regular grid of trace_every steps from the first row
+    np.testing.assert_array_equal(traces["index"], np.arange(0, stats.n, stats.trace_every))
+    fixed = MarketStats(window=10, trace_every=7)
+    fixed.update(100 + rng.random(100), np.ones(100))
+    np.testing.assert_array_equal(fixed.result()["traces"]["index"], np.arange(0, 100, 7))
+
+
+def test_continuous_spreads_stay_bounded_with_an_approximate_median():
+    tape = SyntheticLOB(seed=3).to_frame(60_000, chunk_rows=10_000)
+    stats = MarketStats(window=10)
+    counter = stats.spread_values
+    counter.max_values = 5_000
+    for midpoint, spread in ((tape["midpoint"][i:i + 10_000], tape["spread"][i:i + 10_000])
+                             for i in range(0, len(tape), 10_000)):
+        stats.update(midpoint, spread)
+    assert not counter.exact and len(counter.values) == 0
+    spread = stats.result()["spread"]
+    np.testing.assert_allclose(spread["median"], tape["spread"].median(), rtol=2.5e-3)
+    counts, edges = spread["hist"]
+    assert counts.sum() == len(tape)
+    assert edges[0] == tape["spread"].min() and edges[-1] == tape["spread"].max()
+
+
+def test_tick_sized_spreads_are_counted_exactly():
+    rng = np.random.default_rng(0)
+    spread = rng.integers(1, 20, 10_001) * 0.01
+    counter = ValueCounter(max_values=100)
+    for i in range(0, len(spread), 1000):
+        counter.update(spread[i:i + 1000])
+    assert counter.exact
+    assert counter.median == np.median(spread)
@@ -0,0 +1,37 @@
+import numpy as np
+
+from agent.simple_agent import SimpleAgent
+from env.simple_env import SimpleEnv
+from env.synthetic import SyntheticLOB
+from utils.functions import _trace_columns, test_agent as run_agent
+from utils.metrics import TRACE_KEYS, MetricsAccumulator
+
+
+def test_traces_are_placed_on_the_steps_they_record(tape):
+    env = SimpleEnv(tape)
+    results = run_agent(env, SimpleAgent(env), steps=100, trace_every=3)
+    steps = {key: _trace_columns(results, key)[0][0] for key in TRACE_KEYS}
+    np.testing.assert_array_equal(steps["cash"], np.arange(0, 100, 3))
+    np.testing.assert_array_equal(steps["wealth"], np.arange(3, 101, 3))
+    # Wealth after a step matches cash, inventory and midpoint recorded at that step
+    common, in_state, in_wealth = np.intersect1d(steps["cash"], steps["wealth"], return_indices=True)
+    assert len(common) == 33
+    wealth = results["cash"][in_state] + results["inventory"][in_state] * results["midpoint"][in_state]
+    np.testing.assert_allclose(results["wealth"][in_wealth], wealth)
+
+
+def test_accumulator_reports_the_steps_of_its_traces():
+    accumulator = MetricsAccumulator(trace=True, trace_every=2)
+    accumulator.start(100.0, 0.0, 10.0)
+    for _ in range(5):
+        accumulator.update(100.0, 0.0, 0.0, 10.0)
+    np.testing.assert_array_equal(accumulator.trace_steps("midpoint"), [0, 2, 4])
+    np.testing.assert_array_equal(accumulator.trace_steps("rewards"), [2, 4])
+    np.testing.assert_array_equal(_trace_columns(accumulator, "rewards")[0][0], [2, 4])
+
+
+def test_stepping_past_the_end_of_the_tape_is_a_no_op():
+    # A one-row tape: every step returns the 4-tuple of BaseEnv's end of tape, without info
+    env = SimpleEnv(SyntheticLOB().to_frame(1))
+    metrics = run_agent(env, SimpleAgent(env), steps=3, keep_history=False)["metrics"]
+    assert metrics["pnl"] == 0 and metrics["trades"] == 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from agent.dqn_agent import DQNAgent
+from agent.ppo_agent import PPOAgent
+from env.dqn_env import DQNEnv
+from env.normalization import ObservationNormalizer
+from env.ppo_env import PPOEnv
+from utils.functions import test_agent as run_agent
+
+
+@pytest.mark.parametrize("method", ["standard", "robust"])
+def test_normalizer_centers_and_scales_the_training_tape(tape, method):
+    env = PPOEnv(tape)
+    normalizer = ObservationNormalizer(method, clip=None).fit(env)
+    rows = np.arange(len(tape))
+    obs = env._fill_obs(np.empty((len(rows), env.observation_space.shape[0]), dtype=np.float32), rows,
+                        env.midpoints[rows])
+    scaled = normalizer.transform(obs).astype(np.float64)
+    midpoint = env.observation_columns.index("midpoint")
+    center = scaled[:, midpoint].mean() if method == "standard" else np.median(scaled[:, midpoint])
+    assert abs(center) < 1e-3
+    # rolling_avg, last, is scaled with the midpoint's statistics
+    assert normalizer.center[-1] == normalizer.center[midpoint]
+
+
+@pytest.mark.parametrize("agent_cls, env_cls", [(PPOAgent, PPOEnv), (DQNAgent, DQNEnv)])
+def test_normalized_agent_predicts_on_transformed_raw_observations(tape, agent_cls, env_cls):
+    env = env_cls(tape)
+    agent = agent_cls(env, seed=0, timesteps=64, normalizer=ObservationNormalizer())
+    # The model trains on normalized observations, the env itself stays raw
+    train_obs = agent.model.get_env().reset()
+    assert np.abs(train_obs).max() <= agent.normalizer.clip
+    raw, _ = env.reset()
+    assert raw[env.observation_columns.index("midpoint")] == np.float32(env.midpoints[env.t])
+
+    # Greedy actions, so that PPO's are comparable too
+    agent.deterministic = True
+    for _ in range(20):
+        expected, _ = agent.model.predict(agent.normalizer.transform(raw), deterministic=True)
+        np.testing.assert_array_equal(agent.take_action(raw), expected)
+        raw, _, _, _, _ = env.step(env.action_space.sample())
+
+
+def test_evaluating_a_normalized_agent_records_tape_prices(tape):
+    env = DQNEnv(tape)
+    agent = DQNAgent(env, seed=0, timesteps=0, normalizer=ObservationNormalizer())
+    results = run_agent(env, agent, steps=50)
+    np.testing.assert_array_equal(results["midpoint"], env.midpoints[:51])
+    assert results["metrics"]["initial_wealth"] == env.initial_cash + env.initial_inventory * env.midpoints[0]
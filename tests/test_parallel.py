@@ -0,0 +1,30 @@
+import os
+
+from utils.parallel import run_pool
+
+
+def _square_or_die(x, flag_dir):
+    # Kills its worker the first time it sees x == 3 (or every time with flag_dir None)
+    if x == 3:
+        flag = None if flag_dir is None else os.path.join(flag_dir, "died")
+        if flag is None or not os.path.exists(flag):
+            if flag is not None:
+                open(flag, "w").close()
+            os._exit(1)
+    return x * x
+
+
+def test_tasks_pending_when_a_worker_dies_are_rerun(tmp_path):
+    results = {task[0]: (result, error) for task, result, error in
+               run_pool(_square_or_die, [(x, str(tmp_path)) for x in range(8)], max_workers=2)}
+    assert results == {x: (x * x, None) for x in range(8)}
+
+
+def test_a_task_that_keeps_killing_its_worker_is_reported():
+    results = {task[0]: (result, error) for task, result, error in
+               run_pool(_square_or_die, [(x, None) for x in range(8)], max_workers=2, max_restarts=1)}
+    assert set(results) == set(range(8))
+    result, error = results[3]
+    assert result is None and "worker process died" in error
+    # The others finished in some pool or were lost with task 3, never silently dropped
+    assert all(result == x * x if error is None else result is None for x, (result, error) in results.items())
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from agent.simple_agent import SimpleAgent
+from env.simple_env import SimpleEnv
+from utils.backtest import backtest
+from utils.param_search import METRICS, grid, successive_halving
+
+SPACE = {"bid_spread_fraction": [0.1, 0.5, 0.9], "ask_spread_fraction": [0.2, 0.6, 1.0]}
+
+
+def _search(tape, **kwargs):
+    env = SimpleEnv(tape.iloc[:400], initial_inventory=10)
+    # 3 rungs of 30, 90 and 270 steps
+    return successive_halving(env, SimpleAgent, grid(SPACE), steps=270, eta=3, min_steps=30,
+                              batch_size=2, max_workers=2, **kwargs)
+
+
+def test_successive_halving_promotes_the_best_third(tape):
+    results = _search(tape)
+    assert results.groupby("rung").size().tolist() == [9, 3, 1]
+    assert results.groupby("rung")["steps"].unique().map(list).tolist() == [[30], [90], [270]]
+
+    params = list(SPACE)
+    for rung in (0, 1):
+        ranked = results[results.rung == rung].sort_values("roi", ascending=False)
+        promoted = results[results.rung == rung + 1]
+        assert set(map(tuple, promoted[params].to_numpy())) == set(map(tuple, ranked[params].to_numpy()[:len(promoted)]))
+
+    # Every row holds the metrics of the backtest of its config on its prefix
+    env = SimpleEnv(tape.iloc[:400], initial_inventory=10)
+    for _, row in results.iterrows():
+        metrics = backtest(env, [SimpleAgent(env, row.bid_spread_fraction, row.ask_spread_fraction)],
+                           steps=int(row.steps), record=False)
+        np.testing.assert_allclose(row[METRICS].to_numpy(dtype=float), [metrics[key][0] for key in METRICS])
+
+
+def _entries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_successive_halving_resumes_from_its_checkpoint(tape, tmp_path):
+    checkpoint = tmp_path / "search.jsonl"
+    expected = _search(tape, checkpoint=str(checkpoint))
+    entries = _entries(checkpoint)
+    assert [entry["rung"] for entry in entries] == [0] * 9 + [1] * 3 + [2]
+
+    # Interrupted during rung 1: resuming only evaluates what is missing
+    with open(checkpoint, "w") as f:
+        for entry in entries[:10]:
+            f.write(json.dumps(entry) + "\n")
+    resumed = _search(tape, checkpoint=str(checkpoint))
+    resumed_entries = _entries(checkpoint)
+    assert resumed_entries[:10] == entries[:10]
+    assert sorted((entry["rung"], json.dumps(entry["params"], sort_keys=True)) for entry in resumed_entries) == \
+        sorted((entry["rung"], json.dumps(entry["params"], sort_keys=True)) for entry in entries)
+
+    def _sorted(frame):
+        return frame.sort_values(["rung"] + list(SPACE)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(_sorted(resumed), _sorted(expected))
+
+    # A complete checkpoint evaluates nothing
+    again = _search(tape, checkpoint=str(checkpoint))
+    assert _entries(checkpoint) == resumed_entries
+    pd.testing.assert_frame_equal(_sorted(again), _sorted(expected))
@@ -0,0 +1,39 @@
+import gymnasium as gym
+import numpy as np
+import pytest
+
+from env.dqn_env import DQNEnv
+from env.models import TypeOfReward
+from env.portfolio_env import PortfolioEnv, align_tapes
+from env.ppo_env import PPOEnv
+from env.simple_env import SimpleEnv
+
+
+@pytest.mark.parametrize("env_cls", [SimpleEnv, PPOEnv, DQNEnv])
+@pytest.mark.parametrize("reward_type", list(TypeOfReward))
+def test_single_asset_portfolio_matches_the_single_env(tape, env_cls, reward_type):
+    single = env_cls(tape, reward_type=reward_type)
+    portfolio = PortfolioEnv({"SYN": tape}, env_cls, reward_type=reward_type)
+    obs, _ = single.reset()
+    np.testing.assert_allclose(portfolio.reset()[0], obs)
+    portfolio.action_space.seed(0)
+    fills = 0
+    for _ in range(500):
+        action = portfolio.action_space.sample()
+        # A Discrete action becomes a MultiDiscrete one of one asset
+        obs, reward, done, _, info = single.step(action[0] if isinstance(single.action_space, gym.spaces.Discrete)
+                                                 else action)
+        portfolio_obs, portfolio_reward, portfolio_done, _, portfolio_info = portfolio.step(action)
+        np.testing.assert_allclose(portfolio_obs, obs, rtol=1e-6)
+        np.testing.assert_allclose(portfolio_reward, reward, rtol=1e-9, atol=1e-9)
+        assert portfolio_done == done
+        assert portfolio.cash == pytest.approx(single.cash) and portfolio.inventory[0] == single.inventory
+        assert portfolio_info["buy_volume"][0] == info["buy_volume"]
+        fills += info["buy_volume"] + info["sell_volume"] > 0
+    assert fills > 0
+
+
+def test_tapes_are_aligned_as_of_their_last_tick():
+    times, rows = align_tapes([np.array([0, 10, 20, 30]), np.array([5, 25])])
+    np.testing.assert_array_equal(times, [5, 10, 20, 25, 30])
+    np.testing.assert_array_equal(rows, [[0, 1, 2, 2, 3], [0, 0, 0, 1, 1]])
@@ -0,0 +1,19 @@
+import pytest
+
+from agent import DQNAgent, PPOAgent
+from env.dqn_env import DQNEnv
+from env.ppo_env import PPOEnv
+from utils.functions import test_agent as run_agent
+from utils.profiling import Profiler
+
+
+@pytest.mark.parametrize("agent_cls, env_cls", [(PPOAgent, PPOEnv), (DQNAgent, DQNEnv)])
+def test_forward_phase_times_every_quote(tape, agent_cls, env_cls):
+    env = env_cls(tape)
+    agent = agent_cls(env, seed=0, timesteps=0)
+    with Profiler().attach(env).attach_agent(agent) as profiler:
+        run_agent(env, agent, steps=25, keep_history=False)
+    phases = profiler.summary()["phases"]
+    assert phases["policy"]["calls"] == 25
+    assert phases["forward"]["calls"] == 25
+    assert phases["step"]["calls"] == 25
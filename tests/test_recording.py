@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from agent.AS_agent import ASAgent
+from agent.dqn_agent import DQNAgent
+from env.as_env import ASEnv
+from env.dqn_env import DQNEnv
+from env.normalization import ObservationNormalizer
+from env.ppo_env import PPOEnv
+from env.recording import QuotingPolicy, TransitionLog
+
+
+def _record(env, path, steps, **kwargs):
+    """Steps ``env`` with random actions while recording, returning the transitions it produced."""
+    env.action_space.seed(0)
+    obs, _ = env.reset()
+    env.start_recording(path, **kwargs)
+    expected = {column: [] for column in ("obs", "action", "reward", "next_obs", "done")}
+    for _ in range(steps):
+        action = env.action_space.sample()
+        next_obs, reward, done, _, _ = env.step(action)
+        for column, value in zip(expected, (obs, action, reward, next_obs, done)):
+            expected[column].append(value)
+        obs = env.reset()[0] if done else next_obs
+    env.stop_recording()
+    return {column: np.array(values) for column, values in expected.items()}
+
+
+@pytest.mark.parametrize("env_cls", [DQNEnv, PPOEnv])
+@pytest.mark.parametrize("compress", [False, True])
+def test_log_holds_the_env_transitions(tape, tmp_path, env_cls, compress):
+    # 450 steps over a 300-row tape: an episode end, and chunks of 128 with a partial last one
+    env = env_cls(tape.iloc[:300])
+    expected = _record(env, tmp_path / "log", 450, chunk_rows=128, compress=compress)
+    log = TransitionLog(tmp_path / "log", cache_chunks=1)
+    assert len(log) == 450 and [chunk["rows"] for chunk in log.meta["chunks"]] == [128, 128, 128, 66]
+    assert expected["done"].sum() == 1
+
+    # Read back in a shuffled order, across every chunk
+    indices = np.random.default_rng(0).permutation(450)
+    recorded = log.get(indices)
+    for column, values in expected.items():
+        np.testing.assert_array_equal(recorded[column], values[indices].astype(recorded[column].dtype), err_msg=column)
+    np.testing.assert_array_equal(np.concatenate([chunk["reward"] for chunk in log]),
+                                  expected["reward"].astype(np.float32))
+
+
+def test_pretraining_on_a_recorded_log_updates_the_q_network(tape, tmp_path):
+    # A-S quotes as the behaviour policy of a DQNEnv
+    env = DQNEnv(tape)
+    behaviour = QuotingPolicy(ASAgent(ASEnv(tape)), env)
+    obs, _ = env.reset()
+    env.start_recording(tmp_path / "as", chunk_rows=500)
+    for _ in range(1200):
+        obs, _, done, _, _ = env.step(behaviour.take_action(obs))
+    env.stop_recording()
+    log = TransitionLog(tmp_path / "as")
+    assert len(np.unique(log.get(np.arange(len(log)))["action"])) > 1
+
+    agent = DQNAgent(DQNEnv(tape), seed=0, timesteps=0, normalizer=ObservationNormalizer())
+    before = [p.detach().clone() for p in agent.model.q_net.parameters()]
+    agent.pretrain([tmp_path / "as"], gradient_steps=20, batch_size=32, seed=0)
+    after = list(agent.model.q_net.parameters())
+    assert any((a != b).any() for a, b in zip(before, after))
+    # The online buffer is left untouched
+    assert agent.model.replay_buffer.size() == 0
@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from agent.dqn_agent import DQNAgent
+from agent.ppo_agent import PPOAgent
+from env.dqn_env import DQNEnv
+from env.normalization import ObservationNormalizer
+from env.ppo_env import PPOEnv
+
+
+def _observations(env, n=32):
+    env.reset()
+    rows = np.arange(n) * 10
+    out = np.empty((n, env.observation_space.shape[0]), dtype=np.float32)
+    return env._fill_obs(out, rows, env.midpoints[rows])
+
+
+def _weights(agent):
+    return [p.detach().clone() for p in agent.model.policy.parameters()]
+
+
+def _greedy_actions(agent, observations):
+    agent.deterministic = True
+    return np.stack([agent.take_action(obs) for obs in observations])
+
+
+@pytest.fixture(scope="module")
+def dqn(tape):
+    # learning_starts is 1000: train past it so that the weights and the buffer both moved
+    return DQNAgent(DQNEnv(tape), seed=0, timesteps=1200, normalizer=ObservationNormalizer())
+
+
+def test_saved_dqn_agent_is_restored(dqn, tape, tmp_path):
+    dqn.save(tmp_path)
+    loaded = DQNAgent.load(tmp_path, DQNEnv(tape))
+    assert loaded.model.num_timesteps == dqn.model.num_timesteps == 1200
+    assert loaded.model.replay_buffer.size() == dqn.model.replay_buffer.size() > 0
+    np.testing.assert_array_equal(loaded.model.replay_buffer.observations[:100],
+                                  dqn.model.replay_buffer.observations[:100])
+    np.testing.assert_array_equal(loaded.normalizer.center, dqn.normalizer.center)
+    np.testing.assert_array_equal(loaded.normalizer.scale, dqn.normalizer.scale)
+    observations = _observations(loaded.env)
+    np.testing.assert_array_equal(_greedy_actions(loaded, observations), _greedy_actions(dqn, observations))
+
+
+def test_saved_ppo_agent_is_restored(tape, tmp_path):
+    agent = PPOAgent(PPOEnv(tape), seed=0, timesteps=64)
+    agent.save(tmp_path)
+    loaded = PPOAgent.load(tmp_path, PPOEnv(tape))
+    assert loaded.normalizer is None
+    assert loaded.model.num_timesteps == agent.model.num_timesteps
+    observations = _observations(loaded.env)
+    np.testing.assert_array_equal(_greedy_actions(loaded, observations), _greedy_actions(agent, observations))
+
+
+def test_load_resumes_from_the_latest_checkpoint(tape, tmp_path):
+    agent = DQNAgent(DQNEnv(tape), seed=0, timesteps=0)
+    agent.train(1100, checkpoint_dir=tmp_path, checkpoint_every=500)
+    assert os.path.exists(tmp_path / "DQNAgent_1000_steps.zip")
+    loaded = DQNAgent.load(tmp_path, DQNEnv(tape))
+    assert loaded.model.num_timesteps == 1000
+    # Written by the callback of step 1000, before that step's transition is stored
+    assert 999 <= loaded.model.replay_buffer.size() <= 1000
+
+
+def test_loading_another_agent_class_fails(dqn, tmp_path):
+    dqn.save(tmp_path)
+    with pytest.raises(ValueError):
+        PPOAgent.load(tmp_path, PPOEnv(dqn.env.lob_data))
+
+
+def test_fine_tuning_continues_from_the_trained_weights(tape):
+    agent = DQNAgent(DQNEnv(tape.iloc[:1500]), seed=0, timesteps=1100)
+    before = _weights(agent)
+    buffer_size = agent.model.replay_buffer.size()
+    normalizer = agent.normalizer
+    fresh = _weights(DQNAgent(DQNEnv(tape.iloc[:1500]), seed=0, timesteps=0))
+
+    new_env = DQNEnv(tape.iloc[1500:].reset_index(drop=True))
+    agent.fine_tune(new_env, 200)
+    after = _weights(agent)
+    assert agent.env is new_env
+    assert agent.model.num_timesteps == 1300
+    # The replay buffer kept the old transitions and the weights moved on from the trained ones
+    assert agent.model.replay_buffer.size() == buffer_size + 200
+    assert agent.normalizer is normalizer
+    assert any(not torch.equal(a, b) for a, b in zip(before, after))
+    step = sum((a - b).abs().sum() for a, b in zip(after, before))
+    from_fresh = sum((a - b).abs().sum() for a, b in zip(after, fresh))
+    assert step < from_fresh
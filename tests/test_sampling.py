@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from env.sampling import EpisodeSampler, forward_volatility, rolling_avg_path
+from env.simple_env import SimpleEnv
+from env.vec_env import BatchEnv
+
+
+def _starts(env, resets, seed):
+    env.reset(seed=seed)
+    starts = [env.t]
+    for _ in range(resets - 1):
+        env.reset()
+        starts.append(env.t)
+    return starts
+
+
+def test_rolling_avg_path_follows_the_env_from_the_first_row(tape):
+    env = SimpleEnv(tape.iloc[:800])
+    env.reset()
+    path = rolling_avg_path(env.midpoints, env._warmup_t)
+    action = np.array([0.0, 1e6])
+    while env.t < 799:
+        env.step(action)
+        assert env.rolling_avg == pytest.approx(path[env.t], rel=1e-12)
+
+
+def test_sampled_episodes_start_on_the_path_and_end_truncated(tape):
+    sampler = EpisodeSampler(100)
+    env = SimpleEnv(tape, episode_sampler=sampler)
+    env.reset(seed=0)
+    start = env.t
+    assert env.rolling_avg == sampler.rolling_avg[start]
+    for step in range(100):
+        _, _, done, truncated, _ = env.step(np.array([0.0, 1e6]))
+        assert not done and truncated == (step == 99)
+    assert env.t == start + 100
+
+
+@pytest.mark.parametrize("mode", ["uniform", "stratified", "volatility"])
+def test_seeded_resets_draw_the_same_episodes(tape, mode):
+    env = SimpleEnv(tape, episode_sampler=EpisodeSampler(200, mode=mode))
+    starts = _starts(env, 12, seed=7)
+    assert _starts(env, 12, seed=7) == starts
+    assert _starts(SimpleEnv(tape, episode_sampler=EpisodeSampler(200, mode=mode)), 12, seed=7) == starts
+    assert _starts(env, 12, seed=8) != starts
+
+
+def test_stratified_passes_visit_every_stratum_once(tape):
+    sampler = EpisodeSampler(200, mode="stratified", strata=5)
+    env = SimpleEnv(tape, episode_sampler=sampler)
+    edges = np.linspace(0, sampler.last_start + 1, 6)
+    starts = _starts(env, 10, seed=1)
+    for first in (0, 5):
+        strata = np.searchsorted(edges, starts[first:first + 5], side="right") - 1
+        assert sorted(strata) == list(range(5))
+
+
+def test_volatility_regimes_are_visited_in_turn(tape):
+    sampler = EpisodeSampler(200, mode="volatility", regimes=3)
+    env = SimpleEnv(tape, episode_sampler=sampler)
+    starts = _starts(env, 6, seed=2)
+    regime_of = {int(start): r for r, group in enumerate(sampler.regime_starts) for start in group}
+    for first in (0, 3):
+        assert sorted(regime_of[start] for start in starts[first:first + 3]) == [0, 1, 2]
+    # Regimes sorted by the realized volatility of their episodes
+    volatility = forward_volatility(env.midpoints, 200)
+    means = [volatility[group].mean() for group in sampler.regime_starts]
+    assert means == sorted(means)
+
+
+def test_batch_env_seeding_is_reproducible(tape):
+    def starts(seed):
+        batch = BatchEnv(SimpleEnv(tape, episode_sampler=EpisodeSampler(100)), n_envs=4)
+        batch.seed(seed)
+        batch.reset()
+        return batch.t.copy()
+
+    np.testing.assert_array_equal(starts(3), starts(3))
+    assert (starts(3) != starts(4)).any()
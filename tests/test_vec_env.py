@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from env.models import TypeOfReward
+from env.ppo_env import PPOEnv
+from env.sampling import EpisodeSampler
+from env.simple_env import SimpleEnv
+from env.vec_env import BatchEnv
+
+
+def _random_actions(env, n, seed=0):
+    env.action_space.seed(seed)
+    return [env.action_space.sample() for _ in range(n)]
+
+
+@pytest.mark.parametrize("env_cls", [SimpleEnv, PPOEnv])
+@pytest.mark.parametrize("reward_type", list(TypeOfReward))
+def test_batch_env_replays_the_single_env_across_episodes(tape, env_cls, reward_type):
+    # A short tape, so that the run crosses several episode boundaries
+    single = env_cls(tape.iloc[:120], reward_type=reward_type)
+    batch = BatchEnv(env_cls(tape.iloc[:120], reward_type=reward_type), n_envs=1)
+    obs, _ = single.reset()
+    np.testing.assert_allclose(batch.reset()[0], obs)
+    for action in _random_actions(single, 300):
+        obs, reward, done, _, _ = single.step(action)
+        batch_obs, batch_reward, batch_done, infos = batch.step(np.asarray([action]))
+        assert batch_done[0] == done
+        np.testing.assert_allclose(batch_reward[0], reward, rtol=1e-6)
+        if done:
+            np.testing.assert_allclose(infos[0]["terminal_observation"], obs)
+            obs, _ = single.reset()
+        np.testing.assert_allclose(batch_obs[0], obs)
+        assert batch.cash[0] == single.cash and batch.inventory[0] == single.inventory
+
+
+def test_batch_env_matches_a_dummy_vec_env_of_sampled_episodes(tape):
+    n_envs = 3
+    batch = BatchEnv(PPOEnv(tape, episode_sampler=EpisodeSampler(50)), n_envs=n_envs)
+    dummy = DummyVecEnv([lambda: PPOEnv(tape, episode_sampler=EpisodeSampler(50)) for _ in range(n_envs)])
+    batch.seed(4)
+    batch.reset()
+    dummy.seed(4)
+    dummy.reset()
+    # Same episodes once the starts of each env are set alike, the samplers drawing from different generators
+    for i, env in enumerate(dummy.envs):
+        env.unwrapped.t = env.unwrapped._episode_start = batch.t[i]
+        env.unwrapped._last_t = batch.last_t[i]
+        env.unwrapped.rolling_avg = batch.rolling_avg[i]
+    actions = _random_actions(batch.env, 49 * n_envs)
+    for step in range(49):
+        action = np.stack(actions[step * n_envs:(step + 1) * n_envs])
+        batch_obs, batch_rewards, _, _ = batch.step(action)
+        dummy_obs, dummy_rewards, _, _ = dummy.step(action)
+        np.testing.assert_allclose(batch_obs, dummy_obs, rtol=1e-6)
+        np.testing.assert_allclose(batch_rewards, dummy_rewards, rtol=1e-5)
+    _, _, dones, infos = batch.step(np.stack(actions[:n_envs]))
+    assert dones.all() and all(info["TimeLimit.truncated"] for info in infos)
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from utils.walk_forward import make_windows, summarize
+
+
+def test_windows_are_consecutive_and_inside_the_tape():
+    windows = make_windows(1000, 400, 100, step=150)
+    assert windows == [(0, 400, 400, 500), (150, 550, 550, 650), (300, 700, 700, 800), (450, 850, 850, 950)]
+
+
+def test_summary_counts_windows_and_spreads_roi_over_time():
+    rows = pd.DataFrame([
+        {"asset": "BTC", "agent": "PPO", "seed": seed, "window": window, "roi": roi, "initial_wealth": 100.0,
+         "final_wealth": 100.0 + roi, "pnl": roi, "max_drawdown": 1.0 + window, "avg_inventory": 0.0,
+         "max_inventory": 0.0}
+        for window, rois in enumerate([(1.0, 3.0), (5.0, 7.0)])
+        for seed, roi in enumerate(rois)
+    ])
+    row = summarize(rows).iloc[0]
+    assert row["Windows"] == 2
+    # Seed averages 2 and 6 per window, not the spread of the four runs
+    assert row["ROI Std (%)"] == "2.00"
+    assert row["ROI (%)"] == "4.00"
+    assert row["Worst Drawdown (%)"] == "2.00"
@@ -0,0 +1,190 @@
+import numpy as np
+
+from env.as_env import ASEnv
+from env.fill_models import BestPriceFill
+from env.models import TypeOfReward
+from env.simple_env import SimpleEnv
+from utils.metrics import MetricsAccumulator
+
+
+def _tape_indices(env, steps):
+    """
+    Row indices test_agent visits over ``steps`` steps, resets included.
+
+    Returns the env row before each step, the row the agent observes (the
+    terminal row right after a reset, since test_agent keeps the last obs)
+    and a mask of steps preceded by a reset.
+    """
+    last_t = env._last_t
+    k = np.arange(steps)
+    t = k % last_t
+    after_reset = (t == 0) & (k > 0)
+    obs_row = np.where(after_reset, last_t, t)
+    return t, obs_row, after_reset
+
+
+def _rolling_avg_path(env, next_t):
+    """rolling_avg before each step and the value used for that step's fills."""
+    midpoints = env.midpoints
+    before = np.empty(len(next_t))
+    at_fill = np.empty(len(next_t))
+    rolling_avg = env.rolling_avg
+    warmup_t = env._warmup_t
+    for k, t in enumerate(next_t.tolist()):
+        before[k] = rolling_avg
+        midpoint = midpoints[t]
+        if t < warmup_t:
+            rolling_avg = midpoint
+        at_fill[k] = rolling_avg
+        rolling_avg += 0.001 * (midpoint - rolling_avg)
+    return before, at_fill
+
+
+def backtest(env, agents, steps=10, record=True, chunk_size=4096):
+    """
+    Vectorized equivalent of test_agent for the rule-based agents.
+
+    ``agents`` is one agent or a list of agents of the same class, each
+    evaluated independently on ``env``'s tape (a SimpleEnv or ASEnv over a
+    DataFrame or LOBStore). Quotes come from the agent class' batch_quotes
+    for a block of ``chunk_size`` steps at a time; the fills, whose cash and
+    inventory limits depend on the path, are then scanned step by step with
+    every agent advanced in one array operation. Agents whose quotes depend
+    on their inventory (ASAgent) provide batch_quote_terms instead, the
+    per-block terms being turned into quotes in the scan by
+    quotes_from_terms. The paths are identical to running test_agent on
+    each agent.
+
+    With record=True the test_agent dictionary is returned with one column
+    per agent (squeezed when a single agent is given). With record=False
+    only the summary figures of utils.functions.performance_metrics are
+    kept, accumulated online by a MetricsAccumulator over all agents.
+    """
+    if not isinstance(env, (SimpleEnv, ASEnv)):
+        raise ValueError("backtest only supports the price-quoting SimpleEnv and ASEnv")
+    if env._stream is not None:
+        raise ValueError("backtest needs the whole tape in memory or in a LOBStore, not a LOBStream")
+    if env.episode_sampler is not None:
+        raise ValueError("backtest replays the tape from its start, not sampled episodes")
+    if type(env.fill_model) is not BestPriceFill:
+        raise ValueError("backtest only implements the BestPriceFill fill model")
+    single = not isinstance(agents, (list, tuple))
+    agents = [agents] if single else list(agents)
+    agent_cls = type(agents[0])
+    if any(type(agent) is not agent_cls for agent in agents):
+        raise ValueError("backtest agents must all be of the same class")
+
+    env.reset()
+    n = len(agents)
+    volume = env.trade_volume
+    reward_1 = env.reward_type == TypeOfReward.REWARD_1
+
+    t, obs_row, after_reset = _tape_indices(env, steps)
+    next_t = t + 1
+    rolling_before, rolling_at_fill = _rolling_avg_path(env, next_t)
+    next_midpoint = env.midpoints[next_t]
+    next_spread = env.spreads[next_t]
+    next_best_bid = next_midpoint - next_spread / 2
+    next_best_ask = next_midpoint + next_spread / 2
+
+    initial_cash = float(env.initial_cash)
+    initial_inventory = float(env.initial_inventory)
+    initial_valuation = initial_cash + initial_inventory * env.midpoints[0]
+    cash = np.full(n, initial_cash)
+    inventory = np.full(n, initial_inventory)
+    prev_valuation = np.full(n, initial_valuation)
+    cumulative_reward = np.zeros(n)
+
+    if record:
+        cash_path = np.empty((steps + 1, n))
+        inventory_path = np.empty((steps + 1, n))
+        reward_path = np.empty((steps, n))
+        cumulative_path = np.empty((steps, n))
+        wealth_path = np.empty((steps, n))
+        cash_path[0] = cash
+        inventory_path[0] = inventory
+    else:
+        accumulator = MetricsAccumulator(n)
+        accumulator.start(cash, inventory, env.midpoints[0])
+
+    notional = np.empty(n)
+    next_best_bid = next_best_bid.tolist()
+    next_best_ask = next_best_ask.tolist()
+    next_midpoint = next_midpoint.tolist()
+    rolling_at_fill = rolling_at_fill.tolist()
+    after_reset = after_reset.tolist()
+
+    n_obs = env.observation_space.shape[0]
+    stateful = hasattr(agent_cls, "batch_quote_terms")
+    for start in range(0, steps, chunk_size):
+        stop = min(start + chunk_size, steps)
+        observations = np.empty((stop - start, n_obs), dtype=np.float32)
+        env._fill_obs(observations, obs_row[start:stop], rolling_before[start:stop])
+        if stateful:
+            terms = agent_cls.batch_quote_terms(agents, observations, t[start:stop])
+        else:
+            bids, asks = agent_cls.batch_quotes(agents, observations)
+            bids = np.broadcast_to(bids, (stop - start, n)).astype(np.float64)
+            asks = np.broadcast_to(asks, (stop - start, n)).astype(np.float64)
+
+        for k in range(start, stop):
+            if after_reset[k]:
+                cash[:] = initial_cash
+                inventory[:] = initial_inventory
+                prev_valuation[:] = initial_valuation
+            if stateful:
+                bid, ask = agent_cls.quotes_from_terms([term[k - start] for term in terms], inventory)
+            else:
+                bid = bids[k - start]
+                ask = asks[k - start]
+            rolling_avg = rolling_at_fill[k]
+
+            np.multiply(bid, volume, out=notional)
+            can_buy = (bid > next_best_bid[k]) & (cash >= notional)
+            np.multiply(notional, can_buy, out=notional)
+            cash -= notional
+            inventory += volume * can_buy
+
+            can_sell = (ask < next_best_ask[k]) & (inventory >= volume)
+            np.multiply(ask, volume, out=notional)
+            np.multiply(notional, can_sell, out=notional)
+            cash += notional
+            inventory -= volume * can_sell
+
+            if reward_1:
+                bought = (bid - rolling_avg) * volume * can_buy
+                sold = (ask - rolling_avg) * volume * can_sell
+                reward = sold + bought + 5 * (sold != 0) + 5 * (bought != 0)
+            else:
+                new_valuation = cash + inventory * next_midpoint[k]
+                reward = new_valuation - prev_valuation
+                over = inventory > 150
+                if over.any():
+                    reward = reward + np.where(over, -env.inventory_penalty * (inventory - 150) ** 2, 0)
+                prev_valuation = new_valuation
+            cumulative_reward += reward
+
+            if record:
+                cash_path[k + 1] = cash
+                inventory_path[k + 1] = inventory
+                reward_path[k] = reward
+                cumulative_path[k] = cumulative_reward
+                wealth_path[k] = cash + next_midpoint[k] * inventory
+            else:
+                accumulator.update(cash, inventory, reward, next_midpoint[k], can_buy, can_sell)
+
+    if record:
+        midpoint_path = np.concatenate([[env.midpoints[0]], next_midpoint])
+        results = {
+            "cash": cash_path,
+            "inventory": inventory_path,
+            "rewards": reward_path,
+            "cumulative_rewards": cumulative_path,
+            "midpoint": midpoint_path,
+            "wealth": wealth_path,
+        }
+        if single:
+            results = {key: value if value.ndim == 1 else value[:, 0] for key, value in results.items()}
+        return results
+
+    return accumulator.metrics(squeeze=single)
@@ -0,0 +1,204 @@
+import argparse
+import csv
+import json
+import os
+import traceback
+
+import numpy as np
+import pandas as pd
+
+from env.as_env import ASEnv
+from env.dqn_env import DQNEnv
+from env.lob_store import LOBStore
+from env.models import TypeOfReward
+from env.ppo_env import PPOEnv
+from env.simple_env import SimpleEnv
+from agent.AS_agent import ASAgent
+from agent.simple_agent import SimpleAgent
+from utils.functions import METRIC_COLUMNS, format_metrics_row, performance_metrics, test_agent
+from utils.parallel import run_pool
+
+
+# Agent name -> environment class, in the order of performance_metrics_*.csv
+AGENTS = {
+    "Simple": SimpleEnv,
+    "A-S": ASEnv,
+    "PPO": PPOEnv,
+    "DQN": DQNEnv,
+}
+
+DEFAULT_DATA_FILE = "{asset}_1sec.csv"
+# Training steps of the RL agents when the config has no "train_timesteps"
+DEFAULT_TRAIN_TIMESTEPS = 100_000
+
+# LOB data shared read-only by every worker of the pool
+_LOB_DATA = {}
+
+
+def load_config(path):
+    with open(path) as f:
+        summary = json.load(f)
+    config = dict(summary.get("config", summary))
+    config.setdefault("reward_types", [reward.name for reward in TypeOfReward])
+    config.setdefault("agents", list(AGENTS))
+    config.setdefault("seeds", [config.get("random_seed", 0)])
+    config.setdefault("train_timesteps", DEFAULT_TRAIN_TIMESTEPS)
+    return config
+
+
+def load_lob_data(config, asset):
+    data_file = config.get("data_files", {}).get(asset, DEFAULT_DATA_FILE.format(asset=asset))
+    csv_path = os.path.join(config["data_path"], data_file)
+    if "store_path" not in config:
+        return pd.read_csv(csv_path)
+
+    # Convert the CSV once, every later run and worker just maps the store
+    store_path = os.path.join(config["store_path"], asset)
+    if not os.path.exists(os.path.join(store_path, "meta.json")):
+        return LOBStore.from_csv(csv_path, store_path)
+    return LOBStore.open(store_path)
+
+
+def make_env(config, lob_data, reward_type, agent_name):
+    """The environment of ``agent_name`` over ``lob_data`` with the config's trading parameters."""
+    return AGENTS[agent_name](
+        lob_data,
+        initial_cash=config["initial_cash"],
+        initial_inventory=config["initial_inventory"],
+        trade_volume=config["trade_volume"],
+        inventory_penalty=config["inventory_penalty"],
+        reward_type=TypeOfReward[reward_type],
+    )
+
+
+def make_agent(agent_name, env, seed, model_dir=None, train_timesteps=DEFAULT_TRAIN_TIMESTEPS):
+    """
+    Builds the agent of one grid cell. RL agents are trained for
+    ``train_timesteps`` steps; those found saved in ``model_dir`` are
+    loaded instead of retrained, newly trained ones are saved there.
+    """
+    if agent_name == "Simple":
+        return SimpleAgent(env)
+    if agent_name == "A-S":
+        return ASAgent(env)
+
+    # RL agents are imported here so rule-based sweeps never load torch
+    import torch
+
+    # One process per core already, keep torch from oversubscribing them
+    torch.set_num_threads(1)
+    if agent_name == "PPO":
+        from agent.ppo_agent import PPOAgent as agent_cls
+    else:
+        from agent.dqn_agent import DQNAgent as agent_cls
+    if model_dir is not None and os.path.exists(os.path.join(model_dir, "model.zip")):
+        return agent_cls.load(model_dir, env)
+    agent = agent_cls(env, seed=seed, timesteps=train_timesteps)
+    if model_dir is not None:
+        agent.save(model_dir)
+    return agent
+
+
+def _init_worker(config):
+    # With fork the workers inherit _LOB_DATA, otherwise each one loads it once
+    for asset in config["assets"]:
+        if asset not in _LOB_DATA:
+            _LOB_DATA[asset] = load_lob_data(config, asset)
+
+
+def run_cell(config, asset, reward_type, agent_name, seed):
+    """Trains and evaluates one (asset, reward_type, agent, seed) cell of the grid."""
+    np.random.seed(seed)
+    env = make_env(config, _LOB_DATA[asset], reward_type, agent_name)
+    model_dir = None
+    if "model_path" in config:
+        model_dir = os.path.join(config["model_path"], f"{asset}_{reward_type}_{agent_name}_{seed}")
+    agent = make_agent(agent_name, env, seed, model_dir, config["train_timesteps"])
+    results = test_agent(env, agent, steps=config["timesteps"], keep_history=False)
+    return performance_metrics(results)
+
+
+def _run_cell_safe(config, cell):
+    try:
+        return cell, run_cell(config, *cell), None
+    except Exception:
+        return cell, None, traceback.format_exc()
+
+
+def _metrics_path(output_dir, reward_type):
+    return os.path.join(output_dir, f"performance_metrics_reward{TypeOfReward[reward_type].value + 1}.csv")
+
+
+def _append_row(path, row):
+    new_file = not os.path.exists(path)
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=METRIC_COLUMNS + ["Seed"])
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def run_experiments(config, output_dir="results", max_workers=None):
+    """
+    Runs the asset x reward x agent x seed grid on a process pool
+    (utils.parallel.run_pool).
+
+    Each finished cell is appended to output_dir/performance_metrics_reward{n}.csv
+    as soon as it completes, the files of a previous run being replaced. Failed
+    cells are logged to output_dir/failures.json and do not stop the sweep.
+    RL agents train for config["train_timesteps"] steps and are evaluated over
+    config["timesteps"].
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # A rerun replaces the rows of the previous one instead of appending duplicates
+    for reward_type in config["reward_types"]:
+        path = _metrics_path(output_dir, reward_type)
+        if os.path.exists(path):
+            os.remove(path)
+    cells = [
+        (asset, reward_type, agent_name, seed)
+        for reward_type in config["reward_types"]
+        for asset in config["assets"]
+        for agent_name in config["agents"]
+        for seed in config["seeds"]
+    ]
+
+    # Load once in the parent so forked workers share the pages instead of re-reading the data
+    _init_worker(config)
+    max_workers = max_workers or config.get("max_workers")
+
+    summary = {"config": config}
+    failures = []
+    # Cells pending when a worker dies are rerun on a fresh pool, see run_pool
+    tasks = [(config, cell) for cell in cells]
+    for (_, cell), result, pool_error in run_pool(_run_cell_safe, tasks, max_workers, _init_worker, (config,)):
+        _, metrics, error = result if result is not None else (cell, None, pool_error)
+        asset, reward_type, agent_name, seed = cell
+        if error is not None:
+            failures.append({"cell": list(cell), "error": error})
+            print(f"FAILED {cell}:\n{error}")
+            continue
+
+        reward_n = TypeOfReward[reward_type].value + 1
+        row = format_metrics_row(asset, agent_name, metrics)
+        row["Seed"] = seed
+        _append_row(_metrics_path(output_dir, reward_type), row)
+        summary.setdefault(f"{asset.lower()}_reward{reward_n}", {})[f"{agent_name}/{seed}"] = metrics
+        print(f"Finished {cell}: ROI {metrics['roi']:.2f}%")
+
+    with open(os.path.join(output_dir, "experiment_summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    if failures:
+        with open(os.path.join(output_dir, "failures.json"), "w") as f:
+            json.dump(failures, f, indent=2)
+    return summary, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the market making experiment grid in parallel.")
+    parser.add_argument("config", nargs="?", default="experiment_summary.json")
+    parser.add_argument("--output", default="results")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    run_experiments(load_config(args.config), output_dir=args.output, max_workers=args.workers)
@@ -1,89 +1,144 @@
-import matplotlib.pyplot as plt
+import numpy as np
 
-def test_agent(env, agent, steps=10):
-    obs, _ = env.reset()
-    cash_list = [env.cash]
-    inventory_list = [env.inventory]
-    reward_list = []
-    cumulative_reward_list = []
-    midpoint_list = [obs[0]]  # Store the midpoint
-    wealth = []
+from utils.metrics import START_KEYS, MetricsAccumulator, trace_steps
+
+
+METRIC_COLUMNS = [
+    "Asset", "Agent", "Initial Wealth ($)", "Final Wealth ($)", "P&L ($)",
+    "ROI (%)", "Max Drawdown (%)", "Avg Inventory", "Max Inventory",
+]
 
-    cumulative_reward = 0
 
-    for _ in range(steps):
+def test_agent(env, agent, steps=10, keep_history=True, trace_every=1):
+    """
+    Runs agent in env for the given number of steps.
+
+    steps=None runs a single episode until it is done, e.g. over a whole
+    LOBStream. Metrics are accumulated online and returned under
+    "metrics"; the cash, inventory, rewards, cumulative_rewards, midpoint
+    and wealth traces are only recorded with keep_history=True, every
+    trace_every steps, so memory stays constant without them. cash,
+    inventory and midpoint start with the state before the first step,
+    the other traces with the state after step trace_every.
+    """
+    accumulator = MetricsAccumulator(trace=keep_history, capacity=steps, trace_every=trace_every)
+    obs, _ = env.reset()
+    # Midpoints are read from the tape, observations may be normalized or carry other columns first
+    accumulator.start(env.cash, env.inventory, env.midpoints[env.t])
+
+    step = 0
+    while steps is None or step < steps:
         action = agent.take_action(obs)
-        obs, reward, done, _, _ = env.step(action)
-        cash_list.append(env.cash)
-        inventory_list.append(env.inventory)
-        reward_list.append(reward)
-        cumulative_reward += reward
-        cumulative_reward_list.append(cumulative_reward)
-        midpoint_list.append(obs[0])
-        wealth.append(env.cash + obs[0] * env.inventory)
-
-        if done:
+        result = env.step(action)
+        if len(result) == 4:
+            # BaseEnv.step called at the end of the tape: no transition, no info
+            obs, reward, done, info = result
+            truncated = False
+        else:
+            obs, reward, done, truncated, info = result
+        accumulator.update(env.cash, env.inventory, reward, env.midpoints[env.t], info.get('buy_volume', 0), info.get('sell_volume', 0))
+        step += 1
+
+        if done or truncated:
+            if steps is None:
+                break
             env.reset()
 
+    results = accumulator.traces()
+    if keep_history:
+        results["trace_every"] = trace_every
+    results["metrics"] = accumulator.metrics()
+    return results
+
+
+def performance_metrics(results):
+    """Summarizes a test_agent run into the performance_metrics_*.csv figures."""
+    if "metrics" in results:
+        return results["metrics"]
+    initial_wealth = results["cash"][0] + results["inventory"][0] * float(results["midpoint"][0])
+    wealth = np.asarray([initial_wealth] + list(results["wealth"]), dtype=np.float64)
+    peak = np.maximum.accumulate(wealth)
+    inventory = np.asarray(results["inventory"], dtype=np.float64)
+
+    final_wealth = wealth[-1]
     return {
-        "cash": cash_list,
-        "inventory": inventory_list,
-        "rewards": reward_list,
-        "cumulative_rewards": cumulative_reward_list,
-        "midpoint": midpoint_list,
-        "wealth": wealth
+        "initial_wealth": float(initial_wealth),
+        "final_wealth": float(final_wealth),
+        "pnl": float(final_wealth - initial_wealth),
+        "roi": float((final_wealth - initial_wealth) / initial_wealth * 100),
+        "max_drawdown": float(((peak - wealth) / peak).max() * 100),
+        "avg_inventory": float(inventory.mean()),
+        "max_inventory": float(inventory.max()),
     }
-    
 
-def plot(results, labels, no_reward=False):
-    # Plot results
-    plt.figure(figsize=(14, 10))
+
+def format_metrics_row(asset, agent_name, metrics):
+    """Formats performance_metrics output as a row of performance_metrics_*.csv."""
+    return {
+        "Asset": asset,
+        "Agent": agent_name,
+        "Initial Wealth ($)": f"{metrics['initial_wealth']:,.0f}",
+        "Final Wealth ($)": f"{metrics['final_wealth']:,.0f}",
+        "P&L ($)": f"{metrics['pnl']:,.0f}",
+        "ROI (%)": f"{metrics['roi']:.2f}",
+        "Max Drawdown (%)": f"{metrics['max_drawdown']:.2f}",
+        "Avg Inventory": f"{metrics['avg_inventory']:.1f}",
+        "Max Inventory": f"{metrics['max_inventory']:.0f}",
+    }
     
+
+def _trace_columns(result, key):
+    """(step, column) pairs of one trace of a test_agent result or MetricsAccumulator, one per run."""
+    if isinstance(result, MetricsAccumulator):
+        trace_every = result.trace_every
+        result = result.traces()
+    else:
+        trace_every = result.get("trace_every", 1)
+    values = result[key]
+    x = trace_steps(key, len(values), trace_every)
+    if np.ndim(values) == 2:
+        return [(x, values[:, i]) for i in range(values.shape[1])]
+    return [(x, values)]
+
+
+def plot(results, labels, no_reward=False, method="minmax"):
+    """
+    Cash, inventory, cumulative reward and wealth of test_agent runs.
+
+    ``results`` holds test_agent dictionaries (their traces may be
+    memory-mapped) or MetricsAccumulators. Each trace is downsampled to
+    the width of its axes with utils.plotting ("minmax" or "lttb"), so
+    drawing time does not depend on the episode length.
+    """
+    # Imported here so that evaluation code importing this module never loads matplotlib
+    import matplotlib.pyplot as plt
+
+    from utils.plotting import plot_trace
+
     assert len(results) == len(labels)
 
-    plt.subplot(4, 1, 1)
-    for r, la in zip(results, labels):
-        plt.plot(r['cash'], marker=',', label=la)
-    plt.title("Agent's Cash Over Time")
-    plt.ylabel("Cash ($)")
-    plt.grid(True)
-    plt.legend()
-
-    # Inventory over time
-    plt.subplot(4, 1, 2)
-    for r, la in zip(results, labels):
-        plt.plot(r['inventory'], marker=',', label=la)
-    plt.title("Agent's Inventory Over Time")
-    plt.ylabel("Inventory (units)")
-    plt.grid(True)
-    plt.legend()
-
-    next = 3
+    panels = [("cash", "Agent's Cash Over Time", "Cash ($)"),
+              ("inventory", "Agent's Inventory Over Time", "Inventory (units)")]
     if not no_reward:
-        # Cumulative reward over time
-        plt.subplot(4, 1, 3)
+        panels.append(("cumulative_rewards", "Agent's Cumulative Reward Over Time", "Reward ($)"))
+    panels.append(("wealth", "Wealth Over Time", "Wealth ($)"))
+
+    fig, axes = plt.subplots(len(panels), 1, figsize=(14, 10))
+    for ax, (key, title, ylabel) in zip(axes, panels):
         for r, la in zip(results, labels):
-            plt.plot(r['cumulative_rewards'], marker=',', label=la)
-        plt.title("Agent's Cumulative Reward Over Time")
-        plt.xlabel("Timestep")
-        plt.ylabel("Reward ($)")
-        plt.grid(True)
-        plt.legend()
-        next += 1
-
-    # Midpoint price over time
-    start_wealth = results[0]["wealth"][0]
-    baseline = [start_wealth] * len(results[0]["wealth"])
-    
-    plt.subplot(4, 1, next)
-    for r, la in zip(results, labels):
-        plt.plot(r['wealth'], marker=',', label=la)
-    plt.plot(baseline, marker=',', label="initial wealth")
-    plt.title("Wealth Over Time")
-    plt.xlabel("Timestep")
-    plt.ylabel("Wealth ($)")
-    plt.grid(True)
-    plt.legend()
+            for x, values in _trace_columns(r, key):
+                plot_trace(ax, values, x, method=method, label=la)
+        if key == "wealth":
+            # The wealth trace starts after the first step, the cash, inventory and midpoint ones before it
+            (_, cash), (_, inventory), (_, midpoint) = (_trace_columns(results[0], k)[0] for k in START_KEYS)
+            start_wealth = cash[0] + inventory[0] * midpoint[0]
+            ax.axhline(start_wealth, color="gray", linestyle="--", label="initial wealth")
+        ax.set_title(title)
+        if key in ("cumulative_rewards", "wealth"):
+            ax.set_xlabel("Timestep")
+        ax.set_ylabel(ylabel)
+        ax.grid(True)
+        ax.legend()
 
     plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    plt.show()
@@ -0,0 +1,120 @@
+import numpy as np
+
+
+TRACE_KEYS = ["cash", "inventory", "rewards", "cumulative_rewards", "midpoint", "wealth"]
+# Traces that also hold the state before the first step, recorded by start()
+START_KEYS = ("cash", "inventory", "midpoint")
+
+
+def trace_steps(key, length, trace_every=1):
+    """Step index of each of the ``length`` recorded points of trace ``key``."""
+    first = 0 if key in START_KEYS else trace_every
+    return first + trace_every * np.arange(length)
+
+
+class MetricsAccumulator:
+    """
+    Online evaluation metrics for ``n`` runs advanced in lockstep.
+
+    P&L, ROI, max drawdown, average and max inventory, cumulative reward
+    and trade counts are updated in constant memory at every step. Full
+    traces are optional: with trace=True every ``trace_every``-th step is
+    written into preallocated NumPy buffers (grown by doubling when no
+    ``capacity`` is given).
+    """
+    def __init__(self, n=1, trace=False, capacity=None, trace_every=1):
+        self.n = n
+        self.trace = trace
+        self.trace_every = trace_every
+        self.steps = 0
+        self._capacity = capacity or 1024
+        self._buffers = None
+        self._length = {key: 0 for key in TRACE_KEYS}
+
+    def start(self, cash, inventory, midpoint):
+        """Records the state before the first step."""
+        inventory = np.broadcast_to(np.asarray(inventory, dtype=np.float64), (self.n,))
+        self.initial_wealth = np.broadcast_to(cash + float(midpoint) * inventory, (self.n,)).copy()
+        self.wealth = self.initial_wealth.copy()
+        self.peak = self.initial_wealth.copy()
+        self.max_drawdown = np.zeros(self.n)
+        self.inventory_sum = inventory.copy()
+        self.max_inventory = inventory.copy()
+        self.cumulative_reward = np.zeros(self.n)
+        self.buys = np.zeros(self.n, dtype=np.int64)
+        self.sells = np.zeros(self.n, dtype=np.int64)
+        self.steps = 0
+        if self.trace:
+            rows = self._capacity // self.trace_every + 1
+            self._buffers = {key: np.empty((rows, self.n)) for key in TRACE_KEYS}
+            self._length = {key: 0 for key in TRACE_KEYS}
+            self._append("cash", cash)
+            self._append("inventory", inventory)
+            self._append("midpoint", midpoint)
+
+    def _append(self, key, value):
+        buffer = self._buffers[key]
+        length = self._length[key]
+        if length == len(buffer):
+            buffer = self._buffers[key] = np.concatenate([buffer, np.empty_like(buffer)])
+        buffer[length] = value
+        self._length[key] = length + 1
+
+    def update(self, cash, inventory, reward, midpoint, bought=0, sold=0):
+        """Adds one step: the state after it, its reward and whether each run bought / sold."""
+        wealth = cash + float(midpoint) * inventory
+        self.wealth = wealth
+        np.maximum(self.peak, wealth, out=self.peak)
+        np.maximum(self.max_drawdown, (self.peak - wealth) / self.peak, out=self.max_drawdown)
+        self.inventory_sum += inventory
+        np.maximum(self.max_inventory, inventory, out=self.max_inventory)
+        self.cumulative_reward += reward
+        self.buys += np.asarray(bought) != 0
+        self.sells += np.asarray(sold) != 0
+        self.steps += 1
+
+        if self.trace and self.steps % self.trace_every == 0:
+            self._append("cash", cash)
+            self._append("inventory", inventory)
+            self._append("rewards", reward)
+            self._append("cumulative_rewards", self.cumulative_reward)
+            self._append("midpoint", midpoint)
+            self._append("wealth", wealth)
+
+    def metrics(self, squeeze=True):
+        """The performance_metrics_*.csv figures, as floats for a single run or arrays over runs."""
+        final_wealth = np.broadcast_to(self.wealth, (self.n,))
+        metrics = {
+            "initial_wealth": self.initial_wealth,
+            "final_wealth": final_wealth,
+            "pnl": final_wealth - self.initial_wealth,
+            "roi": (final_wealth - self.initial_wealth) / self.initial_wealth * 100,
+            "max_drawdown": self.max_drawdown * 100,
+            "avg_inventory": self.inventory_sum / (self.steps + 1),
+            "max_inventory": self.max_inventory,
+            "cumulative_reward": self.cumulative_reward,
+            "buys": self.buys,
+            "sells": self.sells,
+            "trades": self.buys + self.sells,
+        }
+        if squeeze and self.n == 1:
+            return {key: value[0].item() for key, value in metrics.items()}
+        return metrics
+
+    def traces(self):
+        """Recorded traces in the test_agent layout, one column per run (1-D for a single run)."""
+        if not self.trace:
+            return {}
+        traces = {key: self._buffers[key][:self._length[key]] for key in TRACE_KEYS}
+        if self.n == 1:
+            traces = {key: value[:, 0] for key, value in traces.items()}
+        return traces
+
+    def trace_steps(self, key):
+        """Step index of each recorded point of trace ``key``."""
+        return trace_steps(key, self._length[key], self.trace_every)
+
+    def row(self, asset, agent_name):
+        """A performance_metrics_*.csv row for a single run."""
+        from utils.functions import format_metrics_row
+        return format_metrics_row(asset, agent_name, self.metrics())
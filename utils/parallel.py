@@ -0,0 +1,40 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+def run_pool(fn, tasks, max_workers=None, initializer=None, initargs=(), max_restarts=2):
+    """
+    Runs fn(*task) for every task on a process pool (forked where
+    possible), yielding (task, result, error) as the tasks finish.
+
+    Exceptions raised by fn propagate. When a worker process dies (killed,
+    out of memory, a crash in native code) the pool breaks and every task
+    still pending fails with it, whichever one killed the worker: those
+    tasks are resubmitted to a fresh pool, at most ``max_restarts`` times.
+    Tasks still unfinished after that are yielded with result None and an
+    error message.
+    """
+    context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+    max_workers = max_workers or os.cpu_count()
+    pending = list(tasks)
+    for _ in range(max_restarts + 1):
+        unfinished = []
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                 initializer=initializer, initargs=initargs) as pool:
+            futures = {pool.submit(fn, *task): task for task in pending}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    unfinished.append(task)
+                    continue
+                yield task, result, None
+        if not unfinished:
+            return
+        pending = unfinished
+    error = "a worker process died while running this task, in {} pools in a row".format(max_restarts + 1)
+    for task in pending:
+        yield task, None, error
@@ -0,0 +1,126 @@
+import itertools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.backtest import backtest
+from utils.parallel import run_pool
+
+
+METRICS = ["roi", "max_drawdown", "avg_inventory", "max_inventory", "pnl", "final_wealth"]
+
+# Env shared read-only by the workers of the pool
+_ENV = None
+
+
+def grid(space):
+    """All combinations of a {name: [values]} space."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_configs(space, n, seed=0):
+    """
+    n random draws from a space of {name: (low, high)}, {name: (low, high, "log")}
+    or {name: [choices]}.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            columns[name] = [spec[i] for i in rng.integers(0, len(spec), n)]
+        elif len(spec) == 3 and spec[2] == "log":
+            columns[name] = np.exp(rng.uniform(np.log(spec[0]), np.log(spec[1]), n)).tolist()
+        else:
+            columns[name] = rng.uniform(spec[0], spec[1], n).tolist()
+    return [{name: columns[name][i] for name in space} for i in range(n)]
+
+
+def _config_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def _init_worker(env):
+    global _ENV
+    if _ENV is None:
+        _ENV = env
+
+
+def _evaluate_batch(agent_cls, batch, steps):
+    agents = [agent_cls(_ENV, **params) for params in batch]
+    metrics = backtest(_ENV, agents, steps=steps, record=False)
+    return [
+        {"params": params, "metrics": {key: float(metrics[key][i]) for key in METRICS}}
+        for i, params in enumerate(batch)
+    ]
+
+
+def _load_checkpoint(path):
+    done = {}
+    if path is not None and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                done[(entry["rung"], _config_key(entry["params"]))] = entry
+    return done
+
+
+def successive_halving(env, agent_cls, configs, steps, eta=3, min_steps=None, metric="roi",
+                       batch_size=256, max_workers=None, checkpoint=None):
+    """
+    Successive-halving search of rule-based agent parameters on one shared tape.
+
+    Every rung evaluates the surviving configs as batches of the vectorized
+    backtest on a prefix of the tape, keeps the best 1/eta by ``metric``
+    (higher is better) and grows the prefix by eta, up to ``steps`` on the
+    last rung. Batches run on a process pool sized to the machine's cores;
+    batches pending when a worker dies are rerun on a fresh pool (see
+    utils.parallel.run_pool) and the search stops with a RuntimeError if
+    they keep failing, the checkpoint keeping what was done.
+
+    Every evaluated (rung, config) is appended to the ``checkpoint`` JSONL
+    file, so an interrupted search resumes where it stopped. Returns a
+    DataFrame with one row per evaluation, parameters and metrics as
+    columns.
+    """
+    global _ENV
+    min_steps = min_steps or max(steps // eta ** 3, 1)
+    n_rungs = max(int(np.floor(np.log(steps / min_steps) / np.log(eta))) + 1, 1)
+    rung_steps = [int(steps / eta ** (n_rungs - 1 - rung)) for rung in range(n_rungs)]
+
+    done = _load_checkpoint(checkpoint)
+    _ENV = env
+    max_workers = max_workers or os.cpu_count()
+
+    rows = []
+    survivors = list(configs)
+    for rung, rung_length in enumerate(rung_steps):
+        results = [done[(rung, _config_key(params))] for params in survivors
+                   if (rung, _config_key(params)) in done]
+        todo = [params for params in survivors if (rung, _config_key(params)) not in done]
+
+        # Smaller batches than the pool would leave cores idle
+        size = min(batch_size, max(len(todo) // max_workers, 1))
+        batches = [(agent_cls, todo[i:i + size], rung_length) for i in range(0, len(todo), size)]
+        for _, entries, error in run_pool(_evaluate_batch, batches, max_workers, _init_worker, (env,)):
+            if error is not None:
+                raise RuntimeError("successive halving stopped at rung {}: {}".format(rung, error))
+            for entry in entries:
+                entry["rung"] = rung
+                entry["steps"] = rung_length
+            results.extend(entries)
+            if checkpoint is not None:
+                with open(checkpoint, "a") as f:
+                    for entry in entries:
+                        f.write(json.dumps(entry) + "\n")
+
+        for entry in results:
+            rows.append({"rung": rung, "steps": rung_length, **entry["params"], **entry["metrics"]})
+
+        results.sort(key=lambda entry: (-entry["metrics"][metric], _config_key(entry["params"])))
+        if rung < n_rungs - 1:
+            survivors = [entry["params"] for entry in results[:max(len(results) // eta, 1)]]
+
+    return pd.DataFrame(rows)
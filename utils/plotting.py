@@ -0,0 +1,157 @@
+import numpy as np
+
+
+# Buckets processed per pass, so memory-mapped traces are read in bounded slices
+_CHUNK_BUCKETS = 4096
+
+
+def _bucket_width(n, buckets):
+    return max(int(np.ceil(n / buckets)), 1)
+
+
+def minmax_downsample(y, x=None, buckets=1000):
+    """
+    Keeps the minimum and maximum of each of ``buckets`` equal slices of
+    ``y``, in their original order, so spikes and the envelope of the
+    trace survive. Returns (x, y) of at most 2 * buckets points; NaNs are
+    ignored and all-NaN slices dropped.
+    """
+    # Memory-mapped arrays are only sliced, never read whole
+    y = y if isinstance(y, np.ndarray) else np.asarray(y)
+    x = x if x is None or isinstance(x, np.ndarray) else np.asarray(x)
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.arange(n) if x is None else np.asarray(x), np.asarray(y, dtype=np.float64)
+
+    width = _bucket_width(n, buckets)
+    n_buckets = int(np.ceil(n / width))
+    xs = []
+    ys = []
+    for first in range(0, n_buckets, _CHUNK_BUCKETS):
+        start = first * width
+        stop = min((first + _CHUNK_BUCKETS) * width, n)
+        block = np.asarray(y[start:stop], dtype=np.float64)
+        rows = int(np.ceil(len(block) / width))
+        padded = np.full(rows * width, np.nan)
+        padded[:len(block)] = block
+        padded = padded.reshape(rows, width)
+
+        valid = ~np.isnan(padded).all(axis=1)
+        low = np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+        high = np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+        # The two extremes of each bucket, the earlier one first
+        positions = np.sort(np.stack([low, high], axis=1), axis=1)[valid]
+        positions = (positions + (np.flatnonzero(valid) * width)[:, None]).ravel() + start
+        positions = positions[np.r_[True, np.diff(positions) != 0]]
+        xs.append(positions if x is None else np.asarray(x[positions]))
+        ys.append(np.asarray(y[positions], dtype=np.float64))
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+def lttb_downsample(y, x=None, points=1000):
+    """
+    Largest-Triangle-Three-Buckets downsampling of ``y`` to ``points``
+    points: the first and last samples, plus the sample of each bucket
+    forming the largest triangle with the previous pick and the mean of
+    the next bucket. Keeps the visual shape of smooth traces better than
+    striding. Returns (x, y).
+    """
+    n = len(y)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+    if n <= points or points < 3:
+        return x, np.asarray(y, dtype=np.float64)
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    out_x = np.empty(points)
+    out_y = np.empty(points)
+    out_x[0], out_y[0] = x[0], y[0]
+    out_x[-1], out_y[-1] = x[-1], y[-1]
+    # Each bucket is read once: averaged as the next bucket, then searched
+    next_x = x[edges[0]:edges[1]]
+    next_y = np.asarray(y[edges[0]:edges[1]], dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        for i in range(points - 2):
+            bucket_x, bucket_y = next_x, next_y
+            if i + 2 < len(edges):
+                next_x = x[edges[i + 1]:edges[i + 2]]
+                next_y = np.asarray(y[edges[i + 1]:edges[i + 2]], dtype=np.float64)
+                mean_x = next_x.mean()
+                mean_y = next_y[~np.isnan(next_y)].mean() if not np.isnan(next_y).all() else np.nan
+            else:
+                mean_x, mean_y = x[-1], y[-1]
+            area = np.abs((out_x[i] - mean_x) * (bucket_y - out_y[i]) - (out_x[i] - bucket_x) * (mean_y - out_y[i]))
+            # NaN areas (NaN samples, or a NaN previous pick) lose to any real one
+            area[np.isnan(area)] = -1.0
+            pick = int(np.argmax(area))
+            out_x[i + 1], out_y[i + 1] = bucket_x[pick], bucket_y[pick]
+    return out_x, out_y
+
+
+def downsample(y, x=None, points=2000, method="minmax"):
+    """(x, y) of at most ``points`` points keeping the shape of the trace, by "minmax" or "lttb"."""
+    if method == "minmax":
+        return minmax_downsample(y, x, buckets=max(points // 2, 1))
+    if method == "lttb":
+        return lttb_downsample(y, x, points=points)
+    raise ValueError("unknown downsampling method {}".format(method))
+
+
+def axes_points(ax):
+    """Points a trace needs on ``ax``: two per horizontal pixel."""
+    return 2 * max(int(ax.get_window_extent().width), 1)
+
+
+def plot_trace(ax, y, x=None, method="minmax", points=None, **kwargs):
+    """ax.plot of a trace of any length, downsampled to the resolution of ``ax`` first."""
+    points = points or axes_points(ax)
+    x, y = downsample(y, x, points=points, method=method)
+    return ax.plot(x, y, **kwargs)
+
+
+class StreamingHistogram:
+    """
+    Fixed-bin histogram filled from chunks, so that its cost and memory
+    do not depend on how many values are streamed through it.
+    """
+    def __init__(self, bins=100, value_range=None, edges=None):
+        if edges is None:
+            if value_range is None:
+                raise ValueError("a StreamingHistogram needs its value_range or its edges up front")
+            edges = np.linspace(value_range[0], value_range[1], bins + 1)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.counts += np.histogram(values[~np.isnan(values)], bins=self.edges)[0]
+        return self
+
+    @classmethod
+    def from_trace(cls, values, bins=100, value_range=None, chunk_size=1_000_000):
+        """Histogram of a (possibly memory-mapped) array, read chunk by chunk (twice without value_range)."""
+        if value_range is None:
+            low, high = np.inf, -np.inf
+            for start in range(0, len(values), chunk_size):
+                chunk = np.asarray(values[start:start + chunk_size], dtype=np.float64)
+                if not np.isnan(chunk).all():
+                    low, high = min(low, np.nanmin(chunk)), max(high, np.nanmax(chunk))
+            value_range = (low, high)
+        histogram = cls(bins, value_range)
+        for start in range(0, len(values), chunk_size):
+            histogram.update(values[start:start + chunk_size])
+        return histogram
+
+
+def plot_histogram(ax, counts, edges, density=False, total=None, **kwargs):
+    """
+    Draws precomputed bin counts as filled steps, without touching the
+    underlying values. With density=True the counts are normalized by
+    ``total``, e.g. to include the values outside the edges, or by their
+    own sum by default.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    if density:
+        total = counts.sum() if total is None else total
+        counts = counts / (total * np.diff(edges)) if total else counts
+    kwargs.setdefault("fill", True)
+    return ax.stairs(counts, edges, **kwargs)
@@ -0,0 +1,202 @@
+import json
+import sys
+import time
+
+import pandas as pd
+
+
+# Hot-path methods timed on an env, and the phase each one is reported under
+ENV_PHASES = {
+    "step": "step",
+    "get_bid_ask_prices": "quote",
+    "_match_fills": "fill",
+    "_get_obs": "obs",
+}
+
+# Phases whose net memory block allocations are counted. The others run nested
+# inside them and sys.getallocatedblocks walks the whole heap, too slow to call
+# around every inner phase without distorting the outer timings
+ALLOCATION_PHASES = ("step", "policy", "train")
+
+# Four log-spaced buckets per power of two of nanoseconds
+_BUCKETS = 256
+
+
+def _bucket(ns):
+    if ns < 8:
+        return max(ns, 0)
+    bits = ns.bit_length()
+    return min((bits - 2) * 4 + ((ns >> (bits - 3)) & 3), _BUCKETS - 1)
+
+
+def _bucket_bounds(bucket):
+    if bucket < 8:
+        return bucket, bucket + 1
+    bits = bucket // 4 + 2
+    low = (4 + bucket % 4) << (bits - 3)
+    return low, low + (1 << (bits - 3))
+
+
+class PhaseStats:
+    """Timing histogram and allocation count of one instrumented phase."""
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.allocated_blocks = 0
+        self.buckets = [0] * _BUCKETS
+
+    def add(self, ns, blocks):
+        self.calls += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.allocated_blocks += blocks
+        self.buckets[_bucket(ns)] += 1
+
+    def quantile(self, q):
+        """Approximate quantile in nanoseconds, the midpoint of its histogram bucket."""
+        if self.calls == 0:
+            return float("nan")
+        rank = q * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                low, high = _bucket_bounds(bucket)
+                return min((low + high) / 2, self.max_ns)
+        return float(self.max_ns)
+
+    def summary(self):
+        calls = max(self.calls, 1)
+        return {
+            "calls": self.calls,
+            "total_s": self.total_ns / 1e9,
+            "mean_us": self.total_ns / calls / 1e3,
+            "p50_us": self.quantile(0.5) / 1e3,
+            "p90_us": self.quantile(0.9) / 1e3,
+            "p99_us": self.quantile(0.99) / 1e3,
+            "max_us": self.max_ns / 1e3,
+            "alloc_blocks_per_call": self.allocated_blocks / calls,
+        }
+
+
+class Profiler:
+    """
+    Per-phase timing of the env step and agent hot paths.
+
+    attach() replaces the profiled methods of one env or agent instance by
+    timed wrappers; detach() removes them again, so an env that is not
+    attached runs its plain class methods at no cost. Every call records
+    its wall time in a log-bucketed histogram. With count_allocations=True
+    the step, policy and train calls also record the net number of memory
+    blocks they allocated (sys.getallocatedblocks, measured outside the
+    timed interval as it is slow on a large heap).
+
+    Env phases are step, quote (get_bid_ask_prices), fill (matching the
+    quotes against the book) and obs; for an agent, policy (take_action),
+    forward (the SB3 policy's network pass in predict) and train (SB3's
+    gradient updates).
+    """
+    def __init__(self, count_allocations=False):
+        self.count_allocations = count_allocations
+        self.phases = {}
+        self._attached = []
+        self._start = time.perf_counter()
+
+    def _timed(self, phase, method):
+        stats = self.phases.setdefault(phase, PhaseStats())
+        clock = time.perf_counter_ns
+
+        if not (self.count_allocations and phase in ALLOCATION_PHASES):
+            def timed(*args, **kwargs):
+                start = clock()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    stats.add(clock() - start, 0)
+            return timed
+
+        blocks = sys.getallocatedblocks
+
+        def timed_allocations(*args, **kwargs):
+            start_blocks = blocks()
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                stats.add(elapsed, blocks() - start_blocks)
+        return timed_allocations
+
+    def _wrap(self, obj, methods):
+        for name, phase in methods.items():
+            if name in vars(obj):
+                raise ValueError("{}.{} is already instrumented".format(type(obj).__name__, name))
+            setattr(obj, name, self._timed(phase, getattr(obj, name)))
+            self._attached.append((obj, name))
+
+    def attach(self, env):
+        """Times the step phases of ``env``. Returns the profiler."""
+        self._wrap(env, ENV_PHASES)
+        return self
+
+    def attach_agent(self, agent):
+        """Times an agent's take_action and, for the SB3 agents, the policy forward pass and training."""
+        self._wrap(agent, {"take_action": "policy"})
+        model = getattr(agent, "model", None)
+        if model is not None:
+            # predict() runs the network through _predict, not forward
+            self._wrap(model.policy, {"_predict": "forward"})
+            self._wrap(model, {"train": "train"})
+        return self
+
+    def detach(self):
+        """Restores the plain methods on everything attached."""
+        for obj, name in self._attached:
+            delattr(obj, name)
+        self._attached = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detach()
+
+    def reset(self):
+        """Clears the statistics, e.g. after a warm-up, keeping the instrumentation."""
+        for stats in self.phases.values():
+            stats.clear()
+        self._start = time.perf_counter()
+
+    def summary(self):
+        """Per-phase statistics, plus the steps per second since the profiler started."""
+        elapsed = time.perf_counter() - self._start
+        steps = self.phases["step"].calls if "step" in self.phases else 0
+        return {
+            "elapsed_s": elapsed,
+            "steps": steps,
+            "steps_per_sec": steps / elapsed if elapsed > 0 else float("nan"),
+            "phases": {phase: stats.summary() for phase, stats in self.phases.items()},
+        }
+
+    def to_frame(self):
+        """One row per phase."""
+        phases = self.summary()["phases"]
+        return pd.DataFrame([{"phase": phase, **stats} for phase, stats in phases.items()])
+
+    def to_json(self, path):
+        summary = self.summary()
+        summary["histograms_ns"] = {
+            phase: {str(_bucket_bounds(bucket)[0]): count
+                    for bucket, count in enumerate(stats.buckets) if count}
+            for phase, stats in self.phases.items()
+        }
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    def to_csv(self, path):
+        self.to_frame().to_csv(path, index=False)
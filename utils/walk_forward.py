@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import traceback
+
+import numpy as np
+import pandas as pd
+
+from env.models import TypeOfReward
+from utils.experiments import DEFAULT_TRAIN_TIMESTEPS, load_config, load_lob_data, make_agent, make_env
+from utils.functions import METRIC_COLUMNS, format_metrics_row, test_agent
+from utils.parallel import run_pool
+
+
+WINDOW_COLUMNS = ["Window", "Train Start", "Train Stop", "Test Start", "Test Stop", "Seed"]
+SUMMARY_COLUMNS = METRIC_COLUMNS + ["Windows", "ROI Std (%)", "Worst Drawdown (%)"]
+RL_AGENTS = ("PPO", "DQN")
+
+# LOB stores shared read-only by every worker of the pool
+_LOB_DATA = {}
+
+
+def make_windows(n_rows, train_size, test_size, step=None):
+    """(train_start, train_stop, test_start, test_stop) row ranges, each test window right after its train window."""
+    step = step or test_size
+    windows = []
+    start = 0
+    while start + train_size + test_size <= n_rows:
+        windows.append((start, start + train_size, start + train_size, start + train_size + test_size))
+        start += step
+    return windows
+
+
+def _init_worker(config):
+    # Stores are memory maps: forked workers share them, others just map the files again
+    for asset in config["assets"]:
+        if asset not in _LOB_DATA:
+            _LOB_DATA[asset] = load_lob_data(config, asset)
+
+
+def _run_chain(config, asset, reward_type, agent_name, seed, windows, fine_tune_steps):
+    """
+    Trains and tests one agent over consecutive windows. With several
+    windows the agent trained on the previous one is fine-tuned on the
+    next train window (warm start) instead of being trained from scratch.
+    """
+    store = _LOB_DATA[asset]
+    results = []
+    agent = None
+    for window, (train_start, train_stop, test_start, test_stop) in windows:
+        np.random.seed(seed)
+        # Zero-copy views of the mapped store
+        test_env = make_env(config, store.slice(test_start, test_stop), reward_type, agent_name)
+        if agent_name not in RL_AGENTS:
+            # Rule-based agents have nothing to train and quote from the env they trade in
+            agent = make_agent(agent_name, test_env, seed)
+        else:
+            train_env = make_env(config, store.slice(train_start, train_stop), reward_type, agent_name)
+            if agent is None:
+                agent = make_agent(agent_name, train_env, seed,
+                                   train_timesteps=config.get("train_timesteps", DEFAULT_TRAIN_TIMESTEPS))
+            else:
+                agent.fine_tune(train_env, fine_tune_steps)
+
+        metrics = test_agent(test_env, agent, steps=None, keep_history=False)["metrics"]
+        results.append((window, metrics))
+    return results
+
+
+def _run_chain_safe(config, task):
+    try:
+        return task, _run_chain(config, *task), None
+    except Exception:
+        return task, None, traceback.format_exc()
+
+
+def summarize(rows):
+    """
+    Aggregate rows per (asset, agent) from the per-window metrics, in the
+    performance_metrics_*.csv format. The metrics are averaged over all
+    windows and seeds; the ROI spread is the std across windows of the
+    ROI averaged over seeds, so that it measures the variation over time.
+    """
+    summary = []
+    for (asset, agent_name), group in rows.groupby(["asset", "agent"], sort=False):
+        metrics = {key: group[key].mean() for key in ("initial_wealth", "final_wealth", "pnl", "roi",
+                                                      "max_drawdown", "avg_inventory", "max_inventory")}
+        window_roi = group.groupby("window")["roi"].mean()
+        row = format_metrics_row(asset, agent_name, metrics)
+        row["Windows"] = len(window_roi)
+        row["ROI Std (%)"] = f"{window_roi.std(ddof=0):.2f}"
+        row["Worst Drawdown (%)"] = f"{group['max_drawdown'].max():.2f}"
+        summary.append(row)
+    return pd.DataFrame(summary, columns=SUMMARY_COLUMNS)
+
+
+def run_walk_forward(config, train_size, test_size, step=None, warm_start=False, fine_tune_steps=100_000,
+                     output_dir="results/walk_forward", max_workers=None):
+    """
+    Walk-forward evaluation of the config's agents.
+
+    Each asset's tape is split into train windows of ``train_size`` rows,
+    each followed by a test window of ``test_size`` rows, moving by
+    ``step`` (test_size by default). Agents are trained on a train window
+    and tested on the test window after it. Windows are independent and
+    run in parallel, unless warm_start is set: each agent is then
+    fine-tuned from one window to the next in a single process, the
+    agents and seeds still running in parallel.
+
+    The LOB data is used as memory-mapped stores (converted once into
+    output_dir/store when the config has no store_path), so every window
+    is a zero-copy slice. Writes walk_forward_reward{n}.csv with one row
+    per window and walk_forward_summary_reward{n}.csv with the averages
+    over windows, both in the performance_metrics_*.csv format.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    config = dict(config)
+    config.setdefault("store_path", os.path.join(output_dir, "store"))
+
+    _init_worker(config)
+    tasks = []
+    for asset in config["assets"]:
+        windows = list(enumerate(make_windows(len(_LOB_DATA[asset]), train_size, test_size, step)))
+        if not windows:
+            raise ValueError(f"{asset} has fewer than train_size + test_size rows")
+        chains = [windows] if warm_start else [[window] for window in windows]
+        for reward_type in config["reward_types"]:
+            for agent_name in config["agents"]:
+                for seed in config["seeds"]:
+                    for chain in chains:
+                        tasks.append((asset, reward_type, agent_name, seed, chain, fine_tune_steps))
+
+    max_workers = max_workers or config.get("max_workers")
+    rows = []
+    failures = []
+    # Chains pending when a worker dies are rerun on a fresh pool, see run_pool
+    pool_tasks = [(config, task) for task in tasks]
+    for (_, task), result, pool_error in run_pool(_run_chain_safe, pool_tasks, max_workers, _init_worker, (config,)):
+        _, results, error = result if result is not None else (task, None, pool_error)
+        asset, reward_type, agent_name, seed, chain, _ = task
+        if error is not None:
+            failures.append({"task": [asset, reward_type, agent_name, seed, [w for w, _ in chain]], "error": error})
+            print(f"FAILED {asset} {reward_type} {agent_name} seed {seed}:\n{error}")
+            continue
+        bounds = dict(chain)
+        for window, metrics in results:
+            rows.append({"asset": asset, "reward_type": reward_type, "agent": agent_name, "seed": seed,
+                         "window": window, "bounds": bounds[window], **metrics})
+
+    rows = pd.DataFrame(rows)
+    tables = {}
+    for reward_type in config["reward_types"]:
+        reward_n = TypeOfReward[reward_type].value + 1
+        reward_rows = rows[rows["reward_type"] == reward_type].sort_values(["asset", "window", "agent", "seed"]) \
+            if len(rows) else rows
+        windows = []
+        for _, row in reward_rows.iterrows():
+            formatted = format_metrics_row(row["asset"], row["agent"], row)
+            formatted.update(zip(WINDOW_COLUMNS, [row["window"], *row["bounds"], row["seed"]]))
+            windows.append(formatted)
+        windows = pd.DataFrame(windows, columns=METRIC_COLUMNS + WINDOW_COLUMNS)
+        summary = summarize(reward_rows) if len(reward_rows) else pd.DataFrame(columns=SUMMARY_COLUMNS)
+        windows.to_csv(os.path.join(output_dir, f"walk_forward_reward{reward_n}.csv"), index=False)
+        summary.to_csv(os.path.join(output_dir, f"walk_forward_summary_reward{reward_n}.csv"), index=False)
+        tables[reward_type] = (windows, summary)
+    if failures:
+        with open(os.path.join(output_dir, "failures.json"), "w") as f:
+            json.dump(failures, f, indent=2)
+    return tables, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward train/test evaluation over long LOB histories.")
+    parser.add_argument("config", nargs="?", default="experiment_summary.json")
+    parser.add_argument("--train", type=int, required=True, help="rows per train window")
+    parser.add_argument("--test", type=int, required=True, help="rows per test window")
+    parser.add_argument("--step", type=int, default=None, help="rows between windows (default: --test)")
+    parser.add_argument("--warm-start", action="store_true", help="fine-tune each agent from window to window")
+    parser.add_argument("--fine-tune-steps", type=int, default=100_000)
+    parser.add_argument("--output", default="results/walk_forward")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    run_walk_forward(load_config(args.config), args.train, args.test, step=args.step, warm_start=args.warm_start,
+                     fine_tune_steps=args.fine_tune_steps, output_dir=args.output, max_workers=args.workers)